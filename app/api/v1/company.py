@@ -1,15 +1,21 @@
 from __future__ import annotations
 
-import tempfile
-from pathlib import Path
+from typing import Optional
 
-from fastapi import APIRouter, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 
-from app.config import get_settings
+from app.parsers import IndASXBRLParser
 from app.schemas import CompanyCreate, CompanyResponse, ParsedStatementResponse
 from app.services.company_service import create_company, get_company_by_cin
+from app.services.derived_metrics import statement_ratios
+from app.services.parse_budget import UPLOAD_BUDGET, ParseBudgetExceeded
+from app.services.parse_cache import get_parse_cache
+from app.services.parse_options import STATEMENTS_ONLY
+from app.services.single_flight import get_single_flight
 from app.services.validation_service import AccountingValidationError
-from app.services.xbrl_service import XBRLExtractionService
+from app.services.xbrl_service import IncrementalExtraction, XBRLExtractionService
+from app.utils.uploads import UPLOAD_REQUEST_BODY, MultipartFileStream, UploadTooLargeError
 
 router = APIRouter()
 
@@ -35,41 +41,53 @@ def get_company(cin: str) -> CompanyResponse:
     "/{cin}/filings/preview",
     response_model=ParsedStatementResponse,
     summary="Upload an MCA XBRL filing and preview standardized statements.",
+    openapi_extra=UPLOAD_REQUEST_BODY,
 )
-def preview_filing(cin: str, file: UploadFile = File(...)) -> ParsedStatementResponse:
-    company = get_company_by_cin(cin)
+async def preview_filing(cin: str, request: Request) -> ParsedStatementResponse:
+    company = await run_in_threadpool(get_company_by_cin, cin)
     if not company:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Company not found")
 
-    if not file.filename.lower().endswith(".xml") and not file.filename.lower().endswith(".xbrl"):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only XBRL/XML files are supported")
+    try:
+        upload = MultipartFileStream(request.headers.get("content-type", ""))
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
-    settings = get_settings()
-    parser_service = XBRLExtractionService()
-    target_dir = Path(settings.data_dir) / "uploads" / company.cin
-    target_dir.mkdir(parents=True, exist_ok=True)
+    # A preview shows statement values and ratios only, so it parses with the narrow projection.
+    parser_service = XBRLExtractionService(
+        parser=IndASXBRLParser(budget=UPLOAD_BUDGET, options=STATEMENTS_ONLY),
+        cache=get_parse_cache(),
+    )
 
-    tmp_path: Path | None = None
-    with tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename).suffix, dir=target_dir) as tmp:
-        contents = file.file.read()
-        tmp.write(contents)
-        tmp_path = Path(tmp.name)
+    def start_extraction(filename: Optional[str]) -> IncrementalExtraction:
+        if not filename or not filename.lower().endswith((".xml", ".xbrl")):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only XBRL/XML files are supported")
+        return parser_service.incremental(name=filename)
 
     try:
-        assert tmp_path is not None
-        bundle = parser_service.extract(tmp_path)
+        extraction = await upload.feed_into(request.stream(), start_extraction)
+        if extraction is None:
+            start_extraction(upload.filename)
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file is empty")
+        # Concurrent previews of the same upload share one extraction and validation.
+        key = ("preview", extraction.digest, parser_service.cache_namespace, extraction.name)
+        bundle = await get_single_flight().run(key, lambda: run_in_threadpool(extraction.close))
+    except UploadTooLargeError as exc:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc)) from exc
+    except ParseBudgetExceeded as exc:
+        # Too much content is 413; pathological structure (nesting) is unprocessable.
+        code = status.HTTP_422_UNPROCESSABLE_ENTITY if exc.limit == "max_depth" else status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        raise HTTPException(status_code=code, detail=str(exc)) from exc
     except AccountingValidationError as exc:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
-    finally:
-        try:
-            if tmp_path is not None:
-                tmp_path.unlink(missing_ok=True)
-        except OSError:
-            pass
 
     return ParsedStatementResponse(
         balance_sheet={k: float(v) for k, v in bundle.balance_sheet.items()},
         income_statement={k: float(v) for k, v in bundle.income_statement.items()},
         cash_flow={k: float(v) for k, v in bundle.cash_flow.items()},
         metadata=bundle.metadata,
+        ratios={
+            k: float(v)
+            for k, v in statement_ratios(bundle.balance_sheet, bundle.income_statement, bundle.cash_flow).items()
+        },
     )
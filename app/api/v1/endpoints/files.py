@@ -1,51 +1,138 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-import tempfile
 from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
 from pathlib import Path
-from typing import Final
+from typing import Final, Optional
 
-from fastapi import APIRouter, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
 from fastapi.responses import StreamingResponse
 
-from app.services.excel_generator import ExcelGenerator
-from app.services.validation_service import ValidationService
-from app.services.xbrl_parser import XBRLParserService
+from app.parsers.xbrl_parser import INDAS_ENGINES
+from app.services.conversion_pool import get_conversion_pool
+from app.services.derived_metrics import get_metric_engine, metrics_json
+from app.services.filing_store import FilingWriter, get_filing_store
+from app.services.parse_budget import UPLOAD_BUDGET, ParseBudgetExceeded
+from app.services.parse_cache import get_parse_cache
+from app.services.parse_options import STATEMENTS_ONLY
+from app.services.single_flight import get_single_flight
+from app.services.xbrl_parser import PARSER_ENGINES, IncrementalParse, XBRLParserService, XBRLParseResult
+from app.utils.constants import MAX_UPLOAD_BYTES
+from app.utils.uploads import UPLOAD_REQUEST_BODY, MultipartFileStream, UploadTooLargeError
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-ALLOWED_EXTENSIONS: Final[set[str]] = {".xml", ".xbrl"}
-MAX_FILE_SIZE_BYTES: Final[int] = 15 * 1024 * 1024  # 15 MB ceiling
+ALLOWED_EXTENSIONS: Final[set[str]] = {".xml", ".xbrl", ".html", ".htm", ".xhtml"}
+MAX_FILE_SIZE_BYTES: Final[int] = MAX_UPLOAD_BYTES  # 15 MB ceiling
 
+@lru_cache()
+def _upload_parser() -> XBRLParserService:
+    return XBRLParserService(cache=get_parse_cache(), budget=UPLOAD_BUDGET)
 
-@router.post("/xbrl-to-excel", summary="Convert an uploaded XBRL file into an Excel workbook")
-async def convert_xbrl_to_excel(file: UploadFile = File(...)) -> StreamingResponse:
-    filename = file.filename or "uploaded.xbrl"
-    extension = Path(filename).suffix.lower()
-    if extension not in ALLOWED_EXTENSIONS:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only .xml or .xbrl files are supported")
 
-    contents = await file.read()
-    if not contents:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file is empty")
-    if len(contents) > MAX_FILE_SIZE_BYTES:
-        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File exceeds maximum size of 15 MB")
+@lru_cache()
+def _metrics_parser() -> XBRLParserService:
+    # Metrics read statement values and contexts only; skip the audit trail and unmapped facts.
+    return XBRLParserService(cache=get_parse_cache(), budget=UPLOAD_BUDGET, options=STATEMENTS_ONLY)
 
-    parser = XBRLParserService()
-    validator = ValidationService()
-    excel_generator = ExcelGenerator()
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=extension) as tmp:
-        tmp.write(contents)
-        temp_path = Path(tmp.name)
+def _start_parse(filename: Optional[str]) -> IncrementalParse:
+    filename = filename or "uploaded.xbrl"
+    if Path(filename).suffix.lower() not in ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only .xml, .xbrl or inline XBRL (.html, .xhtml) files are supported")
+    return _upload_parser().incremental(name=filename)
 
+
+def _compute_metrics(path: Path) -> Optional[dict[str, dict[str, float]]]:
+    """Metrics of a stored filing whose sidecar is missing or from another metrics version."""
+
+    try:
+        return metrics_json(_metrics_parser().parse(path).metrics)
+    except ValueError:
+        logger.exception("Unable to recompute metrics from stored filing %s", path.name)
+        return None
+
+
+class _ArchivedParse:
+    """Upload sink that parses the filing and keeps the raw bytes for source drill-down."""
+
+    def __init__(self, parse: IncrementalParse, archive: FilingWriter) -> None:
+        self.parse = parse
+        self.archive = archive
+        self.converting = False
+
+    def feed(self, chunk: bytes | memoryview) -> None:
+        self.archive.feed(chunk)
+        self.parse.feed(chunk)
+
+    def close(self) -> tuple[XBRLParseResult, Optional[str]]:
+        """Finish the parse and file the upload; returns the result and the filing's digest."""
+
+        result = self.parse.close()
+        return result, self.archive.commit(self.parse.name)
+
+    async def convert(self, source_url: str) -> bytes:
+        """Finish the parse, file the upload and render the workbook; owns the archive from here.
+
+        Finalisation stays in this process, which holds the parser state, and is skipped when
+        the parse cache already holds this digest; validation, metrics and rendering go to the
+        conversion pool.
+        """
+
+        self.converting = True
+        try:
+            parse_result, digest = await asyncio.to_thread(self.close)
+            rendered = await get_conversion_pool().render(parse_result, source_url=source_url)
+            if digest is not None:
+                # Filed next to the upload so the metrics endpoints never re-parse it.
+                get_filing_store().save_metrics(digest, rendered.metrics, version=get_metric_engine().version)
+            return rendered.workbook
+        finally:
+            self.archive.discard()
+
+
+@router.post(
+    "/xbrl-to-excel",
+    summary="Convert an uploaded XBRL file into an Excel workbook",
+    openapi_extra=UPLOAD_REQUEST_BODY,
+)
+async def convert_xbrl_to_excel(request: Request) -> StreamingResponse:
+    # The multipart body is parsed by hand so the filing is tokenised while it is still uploading;
+    # once the last byte arrives only finalisation, validation and rendering remain.
     try:
-        parse_result = parser.parse(temp_path)
-        validation_messages = validator.validate_statements(parse_result.statements)
-        workbook_stream = excel_generator.generate(parse_result, validation_messages)
+        upload = MultipartFileStream(request.headers.get("content-type", ""), limit=MAX_FILE_SIZE_BYTES)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    archive = get_filing_store().writer()
+    sink: Optional[_ArchivedParse] = None
+    try:
+        sink = await upload.feed_into(request.stream(), lambda filename: _ArchivedParse(_start_parse(filename), archive))
+        if sink is None:
+            if not upload.found:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing file field 'file'")
+            _start_parse(upload.filename)
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file is empty")
+        digest = archive.digest
+        source_url = str(request.url_for("filing_fact_source", digest=digest, fact="0")).rsplit("/", 1)[0]
+        # Identical uploads arriving together share one finalisation, validation and render. The
+        # filename and the link target end up in the workbook, so they are part of the key.
+        key = ("xbrl-to-excel", digest, _upload_parser().cache_namespace, sink.parse.name, source_url)
+        workbook_bytes = await get_single_flight().run(key, lambda: sink.convert(source_url))
+    except HTTPException:
+        raise
+    except UploadTooLargeError as exc:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc)) from exc
+    except ParseBudgetExceeded as exc:
+        logger.warning("Aborted XBRL upload %s: %s", upload.filename, exc)
+        # Too much content is 413; pathological structure (nesting) is unprocessable.
+        code = status.HTTP_422_UNPROCESSABLE_ENTITY if exc.limit == "max_depth" else status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        raise HTTPException(status_code=code, detail=str(exc)) from exc
     except ValueError as exc:
         logger.exception("Failed to parse XBRL document")
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
@@ -53,17 +140,60 @@ async def convert_xbrl_to_excel(file: UploadFile = File(...)) -> StreamingRespon
         logger.exception("Unexpected error when processing XBRL upload")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Unable to process XBRL file") from exc
     finally:
-        try:
-            temp_path.unlink(missing_ok=True)
-        except OSError:
-            logger.debug("Temporary file cleanup failed for %s", temp_path)
-        await file.close()
+        # Failed uploads and uploads answered by another request's conversion are not kept; a
+        # conversion started here discards (or keeps) the archive itself once it finishes.
+        if sink is None or not sink.converting:
+            archive.discard()
 
     timestamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
     output_filename = f"xbrl-export-{timestamp}.xlsx"
     headers = {"Content-Disposition": f"attachment; filename={output_filename}"}
     return StreamingResponse(
-        workbook_stream,
+        BytesIO(workbook_bytes),
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers=headers,
     )
+
+
+@router.get(
+    "/filings/{digest}/facts/{fact}",
+    name="filing_fact_source",
+    summary="Source XML of one fact in an uploaded filing, as linked from the Audit Trail sheet",
+    response_class=Response,
+)
+def filing_fact_source(digest: str, fact: int) -> Response:
+    excerpt = get_filing_store().excerpt(digest, fact)
+    if excerpt is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown filing or fact")
+    return Response(content=excerpt, media_type="application/xml")
+
+
+@router.get("/filings/{digest}/metrics", summary="Precomputed ratios and growth rates of an uploaded filing")
+def filing_metrics(digest: str) -> dict[str, dict[str, float]]:
+    metrics = get_filing_store().metrics(digest, version=get_metric_engine().version, compute=_compute_metrics)
+    if metrics is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown filing")
+    return metrics
+
+
+@router.get("/metrics", summary="Ratio dashboard: precomputed metrics of many uploaded filings, keyed by digest")
+def metrics_dashboard(digest: list[str] = Query(...)) -> dict[str, dict[str, dict[str, float]]]:
+    store = get_filing_store()
+    version = get_metric_engine().version
+    found = {key: store.metrics(key, version=version, compute=_compute_metrics) for key in dict.fromkeys(digest)}
+    return {key: metrics for key, metrics in found.items() if metrics is not None}
+
+
+@router.get("/parse-cache", summary="Hit, miss and eviction counters of the parse result cache")
+def parse_cache_stats() -> dict[str, int]:
+    return get_parse_cache().stats()
+
+
+@router.get("/single-flight", summary="Conversions started and joined by concurrent identical uploads")
+def single_flight_stats() -> dict[str, int]:
+    return get_single_flight().stats()
+
+
+@router.get("/parser-engines", summary="Per-engine call counts, timings and fallbacks of the XBRL parsers")
+def parser_engine_stats() -> dict[str, dict[str, dict[str, float]]]:
+    return {"statements": PARSER_ENGINES.stats(), "indas": INDAS_ENGINES.stats()}
@@ -23,6 +23,29 @@ class Settings(BaseSettings):
     mca_base_url: str = Field(default="https://www.mca.gov.in/XBRLService")
     storage_bucket: Optional[str] = Field(default=None)
     data_dir: Path = Field(default=Path("./data"))
+    parse_cache_entries: int = Field(
+        default=64,
+        description="Parse results kept in the in-process LRU.",
+    )
+    parse_cache_disk_bytes: Optional[int] = Field(
+        default=1024 * 1024 * 1024,
+        description="Size cap of the shared parse cache under data_dir; least recently used entries go first.",
+    )
+    filing_store_bytes: Optional[int] = Field(
+        default=10 * 1024 * 1024 * 1024,
+        description="Size cap of stored uploads and their sidecars under data_dir; least recently used filings go first.",
+    )
+    conversion_workers: Optional[int] = Field(
+        default=None,
+        description=(
+            "Worker processes for validating and rendering XBRL to Excel conversions (defaults to CPU count, "
+            "0 runs in-process); uploads are parsed and finalised in API threads."
+        ),
+    )
+    calculation_linkbase: Optional[Path] = Field(
+        default=None,
+        description="Calculation linkbase (e.g. the Ind AS taxonomy's) every conversion is checked against.",
+    )
 
     class Config:
         env_file = ".env"
@@ -4,12 +4,25 @@ from fastapi import FastAPI
 
 from app.api.v1 import api_router
 from app.config import get_settings
+from app.services.conversion_pool import get_conversion_pool
+from app.utils.uploads import RequestSizeLimitMiddleware
 
 settings = get_settings()
 app = FastAPI(title=settings.app_name, version="0.1.0")
+app.add_middleware(RequestSizeLimitMiddleware)
 app.include_router(api_router)
 
 
+@app.on_event("startup")
+def start_conversion_pool() -> None:
+    get_conversion_pool().warm_up()
+
+
+@app.on_event("shutdown")
+def stop_conversion_pool() -> None:
+    get_conversion_pool().shutdown()
+
+
 @app.get("/health", tags=["health"])
 def healthcheck() -> dict[str, str]:
     return {"status": "ok", "environment": settings.environment}
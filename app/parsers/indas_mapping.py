@@ -1,26 +1,22 @@
-"""Mappings between Ind AS taxonomy tags and standardized field names."""
+"""Mappings between Ind AS taxonomy tags and standardized field names.
+
+Views over the shared concept registry in :mod:`app.utils.ind_as_mapper`, kept for callers that
+want a ``{taxonomy tag: field}`` table per statement.
+"""
 
 from typing import Dict
 
-BALANCE_SHEET_MAPPING: Dict[str, str] = {
-    "IndAS\_Assets": "total_assets",
-    "IndAS\_Liabilities": "total_liabilities",
-    "IndAS\_Equity": "total_equity",
-    "IndAS\_CurrentAssets": "current_assets",
-    "IndAS\_CurrentLiabilities": "current_liabilities",
-}
+from app.utils.ind_as_mapper import MAPPING_VERSION, get_registry
+
+BALANCE_SHEET_MAPPING: Dict[str, str] = get_registry().section("balance_sheet")
+
+INCOME_STATEMENT_MAPPING: Dict[str, str] = get_registry().section("income_statement")
 
-INCOME_STATEMENT_MAPPING: Dict[str, str] = {
-    "IndAS\_Revenue": "revenue",
-    "IndAS\_CostOfRevenue": "cost_of_revenue",
-    "IndAS\_GrossProfit": "gross_profit",
-    "IndAS\_ProfitBeforeTax": "profit_before_tax",
-    "IndAS\_ProfitAfterTax": "profit_after_tax",
-}
+CASH_FLOW_MAPPING: Dict[str, str] = get_registry().section("cash_flow")
 
-CASH_FLOW_MAPPING: Dict[str, str] = {
-    "IndAS\_CashFlowOperating": "net_cash_from_operations",
-    "IndAS\_CashFlowInvesting": "net_cash_from_investing",
-    "IndAS\_CashFlowFinancing": "net_cash_from_financing",
-    "IndAS\_CashAndCashEquivalent": "cash_and_cash_equivalents",
-}
+__all__ = [
+    "BALANCE_SHEET_MAPPING",
+    "CASH_FLOW_MAPPING",
+    "INCOME_STATEMENT_MAPPING",
+    "MAPPING_VERSION",
+]
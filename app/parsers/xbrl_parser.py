@@ -2,20 +2,26 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from decimal import Decimal
 from datetime import date
 from pathlib import Path
-from typing import Any, Dict, Iterable, Mapping, Optional
+from typing import Any, Dict, Iterable, List, Mapping, Optional
 from xml.etree import ElementTree as ET
 
-from app.parsers.indas_mapping import (
-    BALANCE_SHEET_MAPPING,
-    CASH_FLOW_MAPPING,
-    INCOME_STATEMENT_MAPPING,
+from app.services.parse_budget import (
+    DOM_BYTES_PER_PAYLOAD_BYTE,
+    UNLIMITED,
+    BudgetMeter,
+    DepthLimitedTreeBuilder,
+    ParseBudget,
 )
+from app.services.parse_options import FULL_PARSE, ParseOptions
+from app.services.parser_engines import EngineRegistry, ParserEngine, lxml_etree
 from app.utils.currency import normalize_to_abs
 from app.utils.date import financial_year_for
+from app.utils.ind_as_mapper import get_registry
+from app.utils.xbrl_source import XBRLSource, is_path, iter_chunks, source_name
 
 try:  # pragma: no cover - optional dependency
     from pyxbrl import XBRLParser  # type: ignore
@@ -23,6 +29,15 @@ except ImportError:  # pragma: no cover - optional dependency
     XBRLParser = None  # type: ignore
 
 
+@dataclass(slots=True)
+class _FactIndex:
+    # statement -> field -> candidate facts in document order
+    facts: Dict[str, Dict[str, List[ET.Element]]] = field(default_factory=dict)
+    units: Dict[str, Optional[str]] = field(default_factory=dict)
+    # context id -> (start date, end date or instant) as raw ISO strings
+    contexts: Dict[str, tuple[Optional[str], Optional[str]]] = field(default_factory=dict)
+
+
 @dataclass(slots=True)
 class ParsedStatementBundle:
     balance_sheet: Dict[str, Decimal]
@@ -32,72 +47,106 @@ class ParsedStatementBundle:
 
 
 class IndASXBRLParser:
-    """Parser that maps Ind AS taxonomy values into standardized statements."""
+    """Parser that maps Ind AS taxonomy values into standardized statements.
 
-    def __init__(self, tolerance: Decimal | float = Decimal("0")) -> None:
-        self.tolerance = Decimal(str(tolerance))
+    ``budget`` bounds each parse like :class:`~app.services.xbrl_parser.XBRLParserService`'s:
+    the tree is charged against ``max_memory`` as it is built and facts, contexts and nesting
+    are counted on the way. ``options`` projects the bundle onto the statements and fields a
+    caller wants; facts outside it are never indexed. A bundle carries statement values only,
+    so the ``collect_*`` flags have nothing further to skip.
+    """
 
-    def parse_document(self, file_path: str | Path) -> ParsedStatementBundle:
-        path = Path(file_path)
-        if not path.exists():
-            raise FileNotFoundError(path)
+    def __init__(
+        self,
+        tolerance: Decimal | float = Decimal("0"),
+        *,
+        budget: ParseBudget = UNLIMITED,
+        options: ParseOptions = FULL_PARSE,
+    ) -> None:
+        self.tolerance = Decimal(str(tolerance))
+        self.budget = budget
+        self.options = options
 
-        if XBRLParser is not None:  # pragma: no cover - depends on external library
-            try:
-                return self._parse_with_pyxbrl(path)
-            except Exception as exc:  # fall back to standard parser
-                raise RuntimeError("Failed to parse XBRL using py-xbrl") from exc
+    def parse_document(self, source: XBRLSource, *, name: Optional[str] = None) -> ParsedStatementBundle:
+        """Parse a path, an in-memory buffer or a binary stream into standardized statements."""
 
-        return self._parse_with_etree(path)
+        if is_path(source) and not Path(source).exists():
+            raise FileNotFoundError(source)
+        return INDAS_ENGINES.parse(self, source, source_name(source, name))
 
-    def _parse_with_pyxbrl(self, path: Path) -> ParsedStatementBundle:  # pragma: no cover
+    def _parse_with_pyxbrl(self, payload: bytes | memoryview, source: str) -> ParsedStatementBundle:
+        BudgetMeter(self.budget).reserve(len(payload) * DOM_BYTES_PER_PAYLOAD_BYTE)
         parser = XBRLParser()
-        xbrl = parser.parse(path.read_bytes())
-        facts = {fact.name: fact for fact in xbrl.facts}  # type: ignore[attr-defined]
+        xbrl = parser.parse(bytes(payload))
+        facts = self._index_pyxbrl_facts(xbrl, self.options)
         units = self._build_units_from_pyxbrl(xbrl)
         context_dates = self._extract_context_dates(xbrl)
 
-        balance_sheet = self._map_section(facts, units, BALANCE_SHEET_MAPPING)
-        income_statement = self._map_section(facts, units, INCOME_STATEMENT_MAPPING)
-        cash_flow = self._map_section(facts, units, CASH_FLOW_MAPPING)
+        balance_sheet = self._map_section(facts.get("balance_sheet", {}), units)
+        income_statement = self._map_section(facts.get("income_statement", {}), units)
+        cash_flow = self._map_section(facts.get("cash_flow", {}), units)
 
         metadata = {
-            "period_start": context_dates[0],
-            "period_end": context_dates[1],
+            "period_start": str(context_dates[0]),
+            "period_end": str(context_dates[1]),
             "financial_year": financial_year_for(context_dates[1]),
-            "source": str(path),
+            "source": source,
         }
         return ParsedStatementBundle(balance_sheet, income_statement, cash_flow, metadata)
 
-    def _parse_with_etree(self, path: Path) -> ParsedStatementBundle:
-        tree = ET.parse(path)
-        root = tree.getroot()
-        units = self._build_units_from_xml(root)
-        context_dates = self._extract_context_dates_from_xml(root)
+    def incremental(self, *, name: Optional[str] = None) -> "IncrementalDocument":
+        """Start a feed-style parse; chunks are tokenised as they arrive."""
+
+        return IncrementalDocument(self, name or "<upload>")
+
+    def _parse_with_lxml(self, payload: bytes | memoryview, source: str) -> ParsedStatementBundle:  # pragma: no cover - optional dependency
+        meter = BudgetMeter(self.budget)
+        meter.reserve(len(payload) * DOM_BYTES_PER_PAYLOAD_BYTE)
+        parser = lxml_etree.XMLParser(resolve_entities=False, no_network=True)
+        root = lxml_etree.fromstring(payload if isinstance(payload, bytes) else bytes(payload), parser)
+        limit = self.budget.max_depth
+        if limit is not None and root.xpath("boolean(" + "/*" * (limit + 1) + ")"):
+            meter.enter(limit + 1)
+        return self._bundle_from_root(root, source, meter)
+
+    def _parse_with_etree(self, payload: XBRLSource, source: str) -> ParsedStatementBundle:
+        document = self.incremental(name=source)
+        for chunk in iter_chunks(payload):
+            document.feed(chunk)
+        return document.close()
+
+    def _bundle_from_root(self, root: ET.Element, source: str, meter: BudgetMeter) -> ParsedStatementBundle:
+        index = self._build_fact_index(root, meter, self.options)
+        context_id, context_dates = self._primary_context(index)
 
-        balance_sheet = self._map_section_xml(root, units, BALANCE_SHEET_MAPPING)
-        income_statement = self._map_section_xml(root, units, INCOME_STATEMENT_MAPPING)
-        cash_flow = self._map_section_xml(root, units, CASH_FLOW_MAPPING)
+        balance_sheet = self._map_section_xml(index, "balance_sheet", context_id)
+        income_statement = self._map_section_xml(index, "income_statement", context_id)
+        cash_flow = self._map_section_xml(index, "cash_flow", context_id)
 
         metadata = {
             "period_start": context_dates[0].isoformat(),
             "period_end": context_dates[1].isoformat(),
             "financial_year": financial_year_for(context_dates[1]),
-            "source": str(path),
+            "source": source,
         }
         return ParsedStatementBundle(balance_sheet, income_statement, cash_flow, metadata)
 
     @staticmethod
-    def _map_section(
-        facts: Mapping[str, Any],
-        units: Mapping[str, Optional[str]],
-        mapping: Mapping[str, str],
-    ) -> Dict[str, Decimal]:  # pragma: no cover - exercised when dependency present
+    def _index_pyxbrl_facts(xbrl: Any, options: ParseOptions = FULL_PARSE) -> Dict[str, Dict[str, Any]]:
+        """Index py-xbrl facts by statement field through the registry; the first fact wins."""
+
+        registry = get_registry()
+        facts: Dict[str, Dict[str, Any]] = {}
+        for fact in getattr(xbrl, "facts", []):
+            mapping = registry.resolve(getattr(fact, "name", ""))
+            if mapping is not None and options.wants(mapping.statement, mapping.field):
+                facts.setdefault(mapping.statement, {}).setdefault(mapping.field, fact)
+        return facts
+
+    @staticmethod
+    def _map_section(facts: Mapping[str, Any], units: Mapping[str, Optional[str]]) -> Dict[str, Decimal]:
         data: Dict[str, Decimal] = {}
-        for taxonomy_tag, std_name in mapping.items():
-            fact = facts.get(taxonomy_tag)
-            if fact is None:
-                continue
+        for std_name, fact in facts.items():
             unit = units.get(getattr(fact, "unit_id", ""))
             value = getattr(fact, "value", None)
             if value is None:
@@ -107,30 +156,93 @@ class IndASXBRLParser:
 
     def _map_section_xml(
         self,
-        root: ET.Element,
-        units: Mapping[str, Optional[str]],
-        mapping: Mapping[str, str],
+        index: _FactIndex,
+        statement: str,
+        context_id: str,
     ) -> Dict[str, Decimal]:
         data: Dict[str, Decimal] = {}
-        for taxonomy_tag, std_name in mapping.items():
-            element = self._find_fact(root, taxonomy_tag)
+        for std_name, candidates in index.facts.get(statement, {}).items():
+            element = self._select_fact(index, candidates, context_id)
             if element is None or element.text is None:
                 continue
             unit_ref = element.attrib.get("unitRef")
-            unit = units.get(unit_ref) if unit_ref else None
+            unit = index.units.get(unit_ref) if unit_ref else None
             data[std_name] = normalize_to_abs(element.text, unit)
         return data
 
     @staticmethod
-    def _find_fact(root: ET.Element, tag: str) -> Optional[ET.Element]:
-        # Search while ignoring namespaces
+    def _build_fact_index(
+        root: ET.Element, meter: Optional[BudgetMeter] = None, options: ParseOptions = FULL_PARSE
+    ) -> _FactIndex:
+        """Index mapped facts by statement field, collecting units and contexts on the way.
+
+        This is the only walk over the tree and each fact costs one registry lookup, so the
+        parse stays linear however many concepts the registry maps. ``meter`` counts facts and
+        contexts against its budget; facts outside ``options`` are counted but not indexed.
+        """
+
+        registry = get_registry()
+        meter = meter or BudgetMeter()
+        index = _FactIndex()
         for elem in root.iter():
-            if elem.tag.split("}")[-1] == tag:
-                return elem
+            tag = elem.tag
+            if not isinstance(tag, str):
+                continue  # comments and processing instructions
+            if "contextRef" in elem.attrib:
+                meter.add_fact()
+                mapping = registry.resolve(tag)
+                if mapping is not None and options.wants(mapping.statement, mapping.field):
+                    index.facts.setdefault(mapping.statement, {}).setdefault(mapping.field, []).append(elem)
+                continue
+            local = tag.rsplit("}", 1)[-1]
+            if local == "unit":
+                unit_id = elem.attrib.get("id")
+                if unit_id:
+                    index.units[unit_id] = IndASXBRLParser._unit_measure(elem)
+            elif local == "context":
+                meter.add_context()
+                context_id = elem.attrib.get("id")
+                period = elem.find("{*}period")
+                if context_id and period is not None:
+                    index.contexts[context_id] = (
+                        period.findtext("{*}startDate"),
+                        period.findtext("{*}endDate") or period.findtext("{*}instant"),
+                    )
+        return index
+
+    @staticmethod
+    def _select_fact(index: _FactIndex, candidates: List[ET.Element], context_id: str) -> Optional[ET.Element]:
+        """Pick the candidate fact that belongs to the reporting context.
+
+        Prefers the primary context itself, then any context ending on the same date (balance
+        sheet items are usually reported against an instant context), then the first fact in
+        document order.
+        """
+
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+        period_end = index.contexts[context_id][1]
+        same_period: Optional[ET.Element] = None
+        for element in candidates:
+            fact_context = element.attrib.get("contextRef")
+            if fact_context == context_id:
+                return element
+            if same_period is None and fact_context in index.contexts:
+                if index.contexts[fact_context][1] == period_end:
+                    same_period = element
+        return same_period if same_period is not None else candidates[0]
+
+    @staticmethod
+    def _unit_measure(unit: ET.Element) -> Optional[str]:
+        measure_elem = unit.find("{*}measure")
+        if measure_elem is not None and measure_elem.text:
+            return measure_elem.text.split(":")[-1]
         return None
 
     @staticmethod
-    def _build_units_from_pyxbrl(xbrl: Any) -> Dict[str, Optional[str]]:  # pragma: no cover
+    def _build_units_from_pyxbrl(xbrl: Any) -> Dict[str, Optional[str]]:
         units: Dict[str, Optional[str]] = {}
         for unit in getattr(xbrl, "units", []):
             unit_id = getattr(unit, "id", None)
@@ -141,20 +253,7 @@ class IndASXBRLParser:
         return units
 
     @staticmethod
-    def _build_units_from_xml(root: ET.Element) -> Dict[str, Optional[str]]:
-        units: Dict[str, Optional[str]] = {}
-        for unit in root.findall(".//{*}unit"):
-            unit_id = unit.attrib.get("id")
-            measure = None
-            measure_elem = unit.find("{*}measure")
-            if measure_elem is not None and measure_elem.text:
-                measure = measure_elem.text.split(":")[-1]
-            if unit_id:
-                units[unit_id] = measure
-        return units
-
-    @staticmethod
-    def _extract_context_dates(xbrl: Any) -> tuple[Any, Any]:  # pragma: no cover
+    def _extract_context_dates(xbrl: Any) -> tuple[Any, Any]:
         contexts = getattr(xbrl, "contexts", [])
         if not contexts:
             raise ValueError("No context found in XBRL document")
@@ -163,17 +262,60 @@ class IndASXBRLParser:
         return getattr(period, "start_date"), getattr(period, "end_date")
 
     @staticmethod
-    def _extract_context_dates_from_xml(root: ET.Element) -> tuple[Any, Any]:
-        for context in root.findall(".//{*}context"):
-            period = context.find("{*}period")
-            if period is None:
-                continue
-            start = period.findtext("{*}startDate")
-            end = period.findtext("{*}endDate") or period.findtext("{*}instant")
+    def _primary_context(index: _FactIndex) -> tuple[str, tuple[date, date]]:
+        for context_id, (start, end) in index.contexts.items():
             if start and end:
-                return IndASXBRLParser._parse_iso_date(start), IndASXBRLParser._parse_iso_date(end)
+                return context_id, (
+                    IndASXBRLParser._parse_iso_date(start),
+                    IndASXBRLParser._parse_iso_date(end),
+                )
         raise ValueError("Unable to determine reporting period from XBRL")
 
     @staticmethod
     def _parse_iso_date(value: str) -> date:
         return date.fromisoformat(value)
+
+
+class IncrementalDocument:
+    """Feed-driven parse returned by :meth:`IndASXBRLParser.incremental`."""
+
+    def __init__(self, parser: IndASXBRLParser, name: str) -> None:
+        self.name = name
+        self._parser = parser
+        self._meter = BudgetMeter(parser.budget)
+        self._meter.pause()
+        self._xml = ET.XMLParser(target=DepthLimitedTreeBuilder(self._meter))
+
+    def feed(self, chunk: bytes | memoryview) -> None:
+        # Only time spent parsing counts against the budget, not waiting for the next chunk.
+        self._meter.resume()
+        try:
+            self._meter.reserve(len(chunk) * DOM_BYTES_PER_PAYLOAD_BYTE)
+            self._xml.feed(chunk)
+        finally:
+            self._meter.pause()
+
+    def close(self) -> ParsedStatementBundle:
+        self._meter.resume()
+        return self._parser._bundle_from_root(self._xml.close(), self.name, self._meter)
+
+
+# py-xbrl keeps priority when installed (it understands more of the taxonomy); a failure is
+# counted as a fallback and the document is re-parsed from the same in-memory payload.
+INDAS_ENGINES: EngineRegistry[ParsedStatementBundle] = EngineRegistry(lambda workload: ("pyxbrl", "lxml", "etree"))
+INDAS_ENGINES.register(
+    ParserEngine(
+        "pyxbrl",
+        lambda parser, payload, label: parser._parse_with_pyxbrl(payload, label),
+        available=XBRLParser is not None,
+        fallible=True,
+    )
+)
+INDAS_ENGINES.register(
+    ParserEngine(
+        "lxml",
+        lambda parser, payload, label: parser._parse_with_lxml(payload, label),
+        available=lxml_etree is not None,
+    )
+)
+INDAS_ENGINES.register(ParserEngine("etree", lambda parser, payload, label: parser._parse_with_etree(payload, label)))
@@ -9,6 +9,7 @@ class ParsedStatementResponse(BaseModel):
     income_statement: Dict[str, float]
     cash_flow: Dict[str, float]
     metadata: Dict[str, Any]
+    ratios: Dict[str, float] = {}
 
     class Config:
         schema_extra = {
@@ -16,6 +17,7 @@ class ParsedStatementResponse(BaseModel):
                 "balance_sheet": {"total_assets": 1.5e12, "total_equity": 6.5e11},
                 "income_statement": {"revenue": 8.7e11, "profit_after_tax": 1.2e11},
                 "cash_flow": {"net_cash_from_operations": 9.8e10},
+                "ratios": {"return_on_equity": 0.1846},
                 "metadata": {
                     "period_start": "2023-04-01",
                     "period_end": "2024-03-31",
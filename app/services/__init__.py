@@ -3,7 +3,11 @@
 __all__ = [
     "ExcelExporter",
     "ExcelGenerator",
+    "FactIndex",
     "MCAMonitorService",
+    "ParseBudget",
+    "ParseCache",
+    "ParseOptions",
     "ValidationService",
     "AccountingValidationError",
     "XBRLExtractionService",
@@ -22,10 +26,26 @@ def __getattr__(name: str):  # pragma: no cover - runtime convenience
         from app.services.excel_generator import ExcelGenerator
 
         return ExcelGenerator
+    if name == "FactIndex":
+        from app.services.fact_index import FactIndex
+
+        return FactIndex
     if name == "MCAMonitorService":
         from app.services.mca_service import MCAMonitorService
 
         return MCAMonitorService
+    if name == "ParseCache":
+        from app.services.parse_cache import ParseCache
+
+        return ParseCache
+    if name == "ParseBudget":
+        from app.services.parse_budget import ParseBudget
+
+        return ParseBudget
+    if name == "ParseOptions":
+        from app.services.parse_options import ParseOptions
+
+        return ParseOptions
     if name == "ValidationService":
         from app.services.validation_service import ValidationService
 
@@ -0,0 +1,310 @@
+"""Column-wise batch validation of many parse results at once.
+
+:meth:`ValidationService.validate_fact_table` regroups one filing per period and checks each
+identity with ``Decimal`` arithmetic. For a universe of companies across many years,
+:func:`stack_results` instead lays the fields the identities need out as one integer column per
+field, with one cell per (company, period), in paise. :func:`validate_stack` then evaluates every
+identity over whole ``array`` columns.
+
+This is not a numpy-vectorised engine: numpy is not a dependency of the service, so each
+identity is a few pure-Python comprehensions over the columns, one integer operation per cell.
+What the batch mode saves is the per-filing regrouping, the dict lookups and the ``Decimal``
+arithmetic, not the interpreter loop itself.
+
+The tolerance rule is the one :class:`ValidationService` applies, evaluated exactly on paise:
+``|diff| <= max(absolute, |base| * relative)`` becomes ``|diff| <= absolute * 100`` or
+``|diff| * q <= |base| * p`` with ``relative = p / q``.
+
+Results stay as columns (cell, passed, difference per check) and are expanded into
+:class:`ValidationMessage` objects only for the companies a caller asks about.
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from decimal import Decimal
+from itertools import compress
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.services.fact_table import FactTable
+from app.services.validation_rules import (
+    BALANCE_SHEET_IDENTITY,
+    PROFIT_AFTER_TAX_IDENTITY,
+    REVENUE_IDENTITY,
+    ValidationRule,
+)
+from app.services.validation_service import ValidationMessage, ValidationService
+from app.utils.currency import PAISE_PER_RUPEE, paise_to_decimal
+
+if TYPE_CHECKING:  # pragma: no cover
+    from app.services.xbrl_parser import XBRLParseResult
+
+# Fields the identities read; each becomes one column of the stack.
+BATCH_FIELDS: Tuple[str, ...] = (
+    "total_assets",
+    "total_liabilities",
+    "total_equity",
+    "shareholders_equity",
+    "operating_revenue",
+    "other_income",
+    "total_revenue",
+    "total_income",
+    "profit_before_tax",
+    "tax_expense",
+    "profit_after_tax",
+)
+
+# The built-in identities, evaluated here as column kernels instead of per-period functions.
+_RULES: Dict[str, ValidationRule] = {
+    rule.name: rule for rule in (BALANCE_SHEET_IDENTITY, REVENUE_IDENTITY, PROFIT_AFTER_TAX_IDENTITY)
+}
+
+
+@dataclass(slots=True)
+class StatementStack:
+    """Company × period × field amounts in paise.
+
+    Cells are grouped by company, in input order, and within a company follow the order in
+    which periods first appear. ``values[field][cell]`` is 0 where ``present[field][cell]`` is 0.
+    ``balance_sheet[cell]`` is 1 if the cell has any balance sheet fact, which is when the
+    balance sheet identity applies, as in the per-filing validation.
+    """
+
+    companies: List[str]
+    periods: List[str]
+    cell_companies: array
+    cell_periods: array
+    values: Dict[str, array]
+    present: Dict[str, bytearray]
+    balance_sheet: bytearray
+    # First cell of each company, plus the total cell count at the end.
+    company_starts: array
+
+    def __len__(self) -> int:
+        return len(self.cell_periods)
+
+
+@dataclass(slots=True)
+class CheckResult:
+    """One identity evaluated over the stack: the cells it applied to and their outcome."""
+
+    cells: array
+    passed: bytes
+    differences: array
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    @property
+    def failures(self) -> int:
+        return len(self.passed) - sum(self.passed)
+
+
+@dataclass(slots=True)
+class BatchValidationResult:
+    stack: StatementStack
+    checks: Dict[str, CheckResult] = field(default_factory=dict)
+
+    @property
+    def failures(self) -> int:
+        return sum(check.failures for check in self.checks.values())
+
+    def failed_companies(self) -> List[str]:
+        """Companies with at least one failed identity, in input order."""
+
+        failed = set()
+        cell_companies = self.stack.cell_companies
+        for check in self.checks.values():
+            failed.update(cell_companies[cell] for cell, ok in zip(check.cells, check.passed) if not ok)
+        return [self.stack.companies[company] for company in sorted(failed)]
+
+    def messages(self, company: str) -> List[ValidationMessage]:
+        """Expand one company's results: balance sheet checks first, then the income statement
+        checks period by period, as :meth:`ValidationService.validate_fact_table` lists them."""
+
+        stack = self.stack
+        index = stack.companies.index(company)
+        start, end = stack.company_starts[index], stack.company_starts[index + 1]
+        entries: List[Tuple[int, int, int, ValidationMessage]] = []
+        for order, (name, check) in enumerate(self.checks.items()):
+            rule = _RULES[name]
+            first, last = bisect_left(check.cells, start), bisect_left(check.cells, end)
+            for row in range(first, last):
+                cell = check.cells[row]
+                passed = bool(check.passed[row])
+                message = ValidationMessage(
+                    statement=rule.statement,
+                    field=rule.field,
+                    period=stack.periods[stack.cell_periods[cell]],
+                    passed=passed,
+                    difference=paise_to_decimal(check.differences[row]),
+                    message=rule.passed_message if passed else rule.failed_message,
+                )
+                group = 0 if rule.statement == "balance_sheet" else 1
+                entries.append((group, cell if group else 0, order, message))
+        entries.sort(key=lambda entry: entry[:3])
+        return [entry[3] for entry in entries]
+
+    def messages_by_company(self) -> Dict[str, List[ValidationMessage]]:
+        return {company: self.messages(company) for company in self.stack.companies}
+
+
+def stack_results(results: Iterable[Tuple[str, "XBRLParseResult | FactTable"]]) -> StatementStack:
+    """Stack ``(company, parse result or fact table)`` pairs; later duplicates win per filing."""
+
+    field_index = {name: column for column, name in enumerate(BATCH_FIELDS)}
+    period_codes: Dict[str, int] = {}
+    periods: List[str] = []
+    companies: List[str] = []
+    cell_companies = array("i")
+    cell_periods = array("i")
+    cell_values: List[array] = [array("q") for _ in BATCH_FIELDS]
+    cell_present: List[bytearray] = [bytearray() for _ in BATCH_FIELDS]
+    balance_sheet = bytearray()
+    company_starts = array("i")
+    for company, result in results:
+        table = result if isinstance(result, FactTable) else result.facts
+        company_starts.append(len(cell_periods))
+        company_code = len(companies)
+        companies.append(company)
+        # Table period code -> stack cell, allocated on first sight.
+        cells: Dict[int, int] = {}
+        columns = [field_index.get(name, -1) for name in table.fields.values]
+        balance_sheet_code = table.statements.find("balance_sheet")
+        table_periods = table.periods.values
+        for (statement, field_code, period), value in table.latest_values().items():
+            cell = cells.get(period)
+            if cell is None:
+                cell = cells[period] = len(cell_periods)
+                label = table_periods[period]
+                code = period_codes.get(label)
+                if code is None:
+                    code = period_codes[label] = len(periods)
+                    periods.append(label)
+                cell_companies.append(company_code)
+                cell_periods.append(code)
+                balance_sheet.append(0)
+                for column in range(len(BATCH_FIELDS)):
+                    cell_values[column].append(0)
+                    cell_present[column].append(0)
+            if statement == balance_sheet_code:
+                balance_sheet[cell] = 1
+            column = columns[field_code]
+            if column >= 0:
+                cell_values[column][cell] = value
+                cell_present[column][cell] = 1
+    company_starts.append(len(cell_periods))
+    return StatementStack(
+        companies=companies,
+        periods=periods,
+        cell_companies=cell_companies,
+        cell_periods=cell_periods,
+        values=dict(zip(BATCH_FIELDS, cell_values)),
+        present=dict(zip(BATCH_FIELDS, cell_present)),
+        balance_sheet=balance_sheet,
+        company_starts=company_starts,
+    )
+
+
+def validate_stack(stack: StatementStack, service: Optional[ValidationService] = None) -> BatchValidationResult:
+    """Evaluate the built-in balance sheet, revenue and profit-after-tax identities over every cell.
+
+    Only these three have column kernels. The cash flow rules, which join periods on the
+    :class:`~app.services.period_axis.PeriodAxis`, and any custom rules are not evaluated here.
+    """
+
+    service = service or ValidationService()
+    absolute = math.floor(service.absolute_tolerance * PAISE_PER_RUPEE)
+    numerator, denominator = service.relative_tolerance.as_integer_ratio()
+    evaluate = _Columns(stack)
+    tolerance = (absolute, numerator, denominator)
+    return BatchValidationResult(
+        stack=stack,
+        checks={
+            BALANCE_SHEET_IDENTITY.name: evaluate.balance_sheet(tolerance),
+            REVENUE_IDENTITY.name: evaluate.revenue(tolerance),
+            PROFIT_AFTER_TAX_IDENTITY.name: evaluate.profit_after_tax(tolerance),
+        },
+    )
+
+
+def validate_batch(
+    results: Iterable[Tuple[str, "XBRLParseResult | FactTable"]], service: Optional[ValidationService] = None
+) -> BatchValidationResult:
+    """:func:`stack_results` followed by :func:`validate_stack`."""
+
+    return validate_stack(stack_results(results), service)
+
+
+class _Columns:
+    """Scalar column arithmetic: each step is one pure-Python comprehension over whole columns."""
+
+    def __init__(self, stack: StatementStack) -> None:
+        self._values = stack.values
+        self._present = stack.present
+        self._balance_sheet = stack.balance_sheet
+
+    def balance_sheet(self, tolerance: Tuple[int, int, int]) -> CheckResult:
+        values, present = self._values, self._present
+        equity = [
+            total if has_total else shareholders
+            for total, has_total, shareholders in zip(
+                values["total_equity"], present["total_equity"], values["shareholders_equity"]
+            )
+        ]
+        assets = values["total_assets"]
+        differences = [a - (l + e) for a, l, e in zip(assets, values["total_liabilities"], equity)]
+        return self._check(self._balance_sheet, differences, assets, tolerance)
+
+    def revenue(self, tolerance: Tuple[int, int, int]) -> CheckResult:
+        values, present = self._values, self._present
+        # ``total_revenue or total_income``: a zero total revenue falls through to total income.
+        uses_revenue = [bool(value) and has for value, has in zip(values["total_revenue"], present["total_revenue"])]
+        revenue = [
+            total if use else income for use, total, income in zip(uses_revenue, values["total_revenue"], values["total_income"])
+        ]
+        mask = [
+            a and b and (use or income)
+            for a, b, use, income in zip(
+                present["operating_revenue"], present["other_income"], uses_revenue, present["total_income"]
+            )
+        ]
+        differences = [r - (o + i) for r, o, i in zip(revenue, values["operating_revenue"], values["other_income"])]
+        return self._check(mask, differences, revenue, tolerance)
+
+    def profit_after_tax(self, tolerance: Tuple[int, int, int]) -> CheckResult:
+        values, present = self._values, self._present
+        mask = [
+            a and b and c
+            for a, b, c in zip(present["profit_before_tax"], present["tax_expense"], present["profit_after_tax"])
+        ]
+        profit = values["profit_after_tax"]
+        differences = [p - (b - t) for p, b, t in zip(profit, values["profit_before_tax"], values["tax_expense"])]
+        return self._check(mask, differences, profit, tolerance)
+
+    @staticmethod
+    def _check(
+        mask: Sequence[int], differences: Sequence[int], bases: Sequence[int], tolerance: Tuple[int, int, int]
+    ) -> CheckResult:
+        absolute, numerator, denominator = tolerance
+        cells = array("i", compress(range(len(mask)), mask))
+        kept = array("q", compress(differences, mask))
+        passed = bytes(
+            abs(difference) <= absolute or abs(difference) * denominator <= abs(base) * numerator
+            for difference, base in zip(kept, compress(bases, mask))
+        )
+        return CheckResult(cells=cells, passed=passed, differences=kept)
+
+
+__all__ = [
+    "BATCH_FIELDS",
+    "BatchValidationResult",
+    "CheckResult",
+    "StatementStack",
+    "stack_results",
+    "validate_batch",
+    "validate_stack",
+]
@@ -0,0 +1,316 @@
+"""Calculation-linkbase consistency checks compiled to a sparse weight matrix.
+
+MCA filings and the Ind AS taxonomy publish ``summation-item`` relationships in calculation
+linkbases: within an extended link role, a total concept equals the weighted sum of its item
+concepts. :meth:`CalculationMatrix.compile` turns those arcs into compressed sparse rows, one
+row per distinct ``(total, items)`` summation with the total's column in :attr:`totals` and its
+items in ``indices[indptr[row]:indptr[row + 1]]``. Weights are kept exact: ``weights`` holds
+integer numerators over the common :attr:`denominator` (1 for the usual ±1 weights).
+
+:func:`load_calculations` compiles each linkbase once per content digest, so a taxonomy version
+is parsed on the first filing that needs it and every later check reuses the matrix.
+:func:`evaluate_calculations` then checks every summation for every period in one pass of exact
+integer arithmetic over the sparse rows. The pass is a scalar pure-Python loop, not a
+vectorised sparse product: numpy is not a dependency, and the exact ``Fraction`` weights would
+not survive a float matrix anyway. Compiling once and walking flat ``array`` rows is what keeps a
+full check cheap enough for every upload. As in XBRL 2.1, a summation is only checked when its
+total and at least one item are reported; missing items count as zero.
+Amounts are compared with :class:`~app.services.validation_service.ValidationService`'s
+tolerances rather than the ``decimals`` attribute of each fact.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from fractions import Fraction
+from io import BytesIO
+from math import lcm
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+from xml.etree import ElementTree as ET
+
+from app.services.fact_table import NO_DIMENSIONS, StringPool
+from app.utils.currency import to_paise_batch
+
+if TYPE_CHECKING:  # pragma: no cover
+    from app.services.xbrl_parser import XBRLParseResult
+
+LinkbaseSource = Union[bytes, str, Path]
+
+SUMMATION_ITEM = "http://www.xbrl.org/2003/arcrole/summation-item"
+_LINK = "{http://www.xbrl.org/2003/linkbase}"
+_XLINK = "{http://www.w3.org/1999/xlink}"
+# Compiled matrices kept per process; a deployment rarely uses more than a couple of versions.
+_MAX_CACHED = 8
+
+
+class CalculationLinkbaseError(ValueError):
+    """Raised when a calculation linkbase cannot be read."""
+
+
+@dataclass(frozen=True, slots=True)
+class CalculationFailure:
+    """A summation that did not hold for ``period``; ``difference`` is total minus items in rupees."""
+
+    row: int
+    period: str
+    total: Decimal
+    difference: Decimal
+
+
+class CalculationMatrix:
+    """Summation-item relationships as compressed sparse rows over concept columns."""
+
+    __slots__ = ("version", "concepts", "roles", "row_roles", "totals", "indptr", "indices", "weights", "denominator")
+
+    def __init__(self, version: str) -> None:
+        self.version = version
+        self.concepts = StringPool()
+        self.roles = StringPool()
+        self.row_roles = array("i")
+        self.totals = array("i")
+        self.indptr = array("i", [0])
+        self.indices = array("i")
+        self.weights = array("q")
+        self.denominator = 1
+
+    def __len__(self) -> int:
+        return len(self.totals)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.indices)
+
+    @classmethod
+    def compile(cls, payloads: Sequence[bytes]) -> "CalculationMatrix":
+        """Compile one or more linkbase documents; identical summations across roles are kept once."""
+
+        digest = hashlib.sha256()
+        for payload in payloads:
+            digest.update(hashlib.sha256(payload).digest())
+        matrix = cls(digest.hexdigest()[:16])
+        summations: Dict[Tuple[str, str], Dict[str, Fraction]] = {}
+        for payload in payloads:
+            for role, total, item, weight in _summation_arcs(payload):
+                summations.setdefault((role, total), {})[item] = weight
+        denominator = lcm(1, *(weight.denominator for items in summations.values() for weight in items.values()))
+        seen = set()
+        concepts = matrix.concepts
+        for (role, total), items in summations.items():
+            signature = (total, tuple(sorted(items.items())))
+            if signature in seen:
+                continue
+            seen.add(signature)
+            matrix.row_roles.append(matrix.roles.code(role))
+            matrix.totals.append(concepts.code(total))
+            for item, weight in items.items():
+                matrix.indices.append(concepts.code(item))
+                matrix.weights.append(weight.numerator * (denominator // weight.denominator))
+            matrix.indptr.append(len(matrix.indices))
+        matrix.denominator = denominator
+        return matrix
+
+    def items(self, row: int) -> List[Tuple[str, Fraction]]:
+        """``(item concept, weight)`` pairs of one summation."""
+
+        return [
+            (self.concepts[self.indices[k]], Fraction(self.weights[k], self.denominator))
+            for k in range(self.indptr[row], self.indptr[row + 1])
+        ]
+
+    def total(self, row: int) -> str:
+        return self.concepts[self.totals[row]]
+
+    def role(self, row: int) -> str:
+        return self.roles[self.row_roles[row]]
+
+
+def _summation_arcs(payload: bytes) -> Iterable[Tuple[str, str, str, Fraction]]:
+    """``(role, total, item, weight)`` for each effective summation-item arc of a linkbase.
+
+    Locator labels are resolved within their extended link; of equivalent arcs (same role, total
+    and item) the highest ``priority`` wins, and a winning ``use="prohibited"`` arc removes the
+    relationship.
+    """
+
+    arcs: Dict[Tuple[str, str, str], Tuple[int, bool, Fraction]] = {}
+    try:
+        for _, element in ET.iterparse(BytesIO(payload), events=("end",)):
+            if element.tag != f"{_LINK}calculationLink":
+                continue
+            role = element.get(f"{_XLINK}role", "")
+            locators: Dict[str, str] = {}
+            for loc in element.iter(f"{_LINK}loc"):
+                locators.setdefault(loc.get(f"{_XLINK}label", ""), _concept_from_href(loc.get(f"{_XLINK}href", "")))
+            for arc in element.iter(f"{_LINK}calculationArc"):
+                if arc.get(f"{_XLINK}arcrole") != SUMMATION_ITEM:
+                    continue
+                total = locators.get(arc.get(f"{_XLINK}from", ""))
+                item = locators.get(arc.get(f"{_XLINK}to", ""))
+                if not total or not item:
+                    continue
+                try:
+                    weight = Fraction(Decimal(arc.get("weight", "1")))
+                    priority = int(arc.get("priority", "0"))
+                except (InvalidOperation, ValueError) as exc:
+                    raise CalculationLinkbaseError(f"Invalid calculation arc {total} -> {item}: {exc}") from exc
+                key = (role, total, item)
+                current = arcs.get(key)
+                if current is None or priority >= current[0]:
+                    arcs[key] = (priority, arc.get("use") == "prohibited", weight)
+            element.clear()
+    except ET.ParseError as exc:
+        raise CalculationLinkbaseError(f"Unreadable calculation linkbase: {exc}") from exc
+    for (role, total, item), (_, prohibited, weight) in arcs.items():
+        if not prohibited:
+            yield role, total, item, weight
+
+
+def _concept_from_href(href: str) -> str:
+    """Local name from a locator href, e.g. ``ind-as.xsd#ind-as_Assets`` -> ``Assets``."""
+
+    fragment = href.rpartition("#")[2]
+    return fragment.partition("_")[2] or fragment
+
+
+_cache: "OrderedDict[str, CalculationMatrix]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def load_calculations(*sources: LinkbaseSource) -> CalculationMatrix:
+    """Compiled matrix for the given linkbases (paths or bytes), compiled once per content."""
+
+    payloads = [Path(source).read_bytes() if isinstance(source, (str, Path)) else bytes(source) for source in sources]
+    key = hashlib.sha256(b"".join(hashlib.sha256(payload).digest() for payload in payloads)).hexdigest()
+    with _cache_lock:
+        matrix = _cache.get(key)
+        if matrix is not None:
+            _cache.move_to_end(key)
+            return matrix
+    matrix = CalculationMatrix.compile(payloads)
+    with _cache_lock:
+        _cache[key] = matrix
+        while len(_cache) > _MAX_CACHED:
+            _cache.popitem(last=False)
+    return matrix
+
+
+def concept_values(result: "XBRLParseResult") -> Dict[str, Dict[str, int]]:
+    """``{period: {concept: paise}}`` of entity-level numeric facts, mapped or not; last one wins.
+
+    Mapped facts need the concept column (``collect_audit``); unmapped numeric facts are read
+    from their verbatim values when ``collect_unmapped`` kept them.
+    """
+
+    values: Dict[str, Dict[str, int]] = {}
+    facts = result.facts
+    if facts.audit:
+        periods = facts.periods.values
+        concepts = facts.concepts.values
+        context_periods = [
+            periods[period] if dimensions == NO_DIMENSIONS else None
+            for period, dimensions in zip(facts.context_periods, facts.context_dimensions)
+        ]
+        for concept, context, paise in zip(facts.concept_codes, facts.context_codes, facts.values):
+            period = context_periods[context]
+            if period is not None:
+                values.setdefault(period, {})[concepts[concept]] = paise
+    numeric = []
+    for fact in result.unmapped_facts:
+        context = result.contexts.get(fact.context_ref) if fact.context_ref else None
+        if fact.unit is not None and context is not None and not context.dimensions:
+            numeric.append((context.label, fact.concept, fact.raw_value))
+    amounts = to_paise_batch([raw for _, _, raw in numeric], None, strict=False)
+    for (period, concept, _), paise in zip(numeric, amounts):
+        if paise is not None:
+            values.setdefault(period, {})[concept] = paise
+    return values
+
+
+def evaluate_calculations(
+    matrix: CalculationMatrix,
+    values: Mapping[str, Mapping[str, int]],
+    *,
+    absolute_tolerance: Decimal,
+    relative_tolerance: Decimal,
+) -> List[CalculationFailure]:
+    """Check every summation of ``matrix`` against ``{period: {concept: paise}}``.
+
+    Failures come back period by period, in summation order within a period.
+    """
+
+    periods = list(values)
+    if not len(matrix) or not periods:
+        return []
+    den = matrix.denominator
+    # |diff| <= absolute (paise) or |diff| * q <= |total| * p, all scaled by the weight denominator.
+    absolute = int(absolute_tolerance * 100) * den
+    numerator, denominator = relative_tolerance.as_integer_ratio()
+    columns = [_column(matrix, values[period]) for period in periods]
+    found = _evaluate(matrix, columns, absolute, numerator, denominator)
+    scale = Decimal(den * 100)
+    return [
+        CalculationFailure(
+            row=row,
+            period=periods[position],
+            total=Decimal(columns[position][matrix.totals[row]]) / 100,
+            difference=Decimal(difference) / scale,
+        )
+        for position, row, difference in found
+    ]
+
+
+def _column(matrix: CalculationMatrix, period_values: Mapping[str, int]) -> Dict[int, int]:
+    """Concept column -> paise for the concepts the matrix knows."""
+
+    find = matrix.concepts.find
+    column: Dict[int, int] = {}
+    for concept, paise in period_values.items():
+        code = find(concept)
+        if code is not None:
+            column[code] = paise
+    return column
+
+
+def _evaluate(
+    matrix: CalculationMatrix, columns: Sequence[Dict[int, int]], absolute: int, numerator: int, denominator: int
+) -> List[Tuple[int, int, int]]:
+    den = matrix.denominator
+    spans = list(zip(matrix.totals, matrix.indptr, matrix.indptr[1:]))
+    indices, weights = matrix.indices, matrix.weights
+    found: List[Tuple[int, int, int]] = []
+    for position, column in enumerate(columns):
+        get = column.get
+        for row, (total_column, start, end) in enumerate(spans):
+            total = get(total_column)
+            if total is None:
+                continue
+            reported = False
+            weighted = 0
+            for k in range(start, end):
+                amount = get(indices[k])
+                if amount is not None:
+                    reported = True
+                    weighted += weights[k] * amount
+            if not reported:
+                continue
+            difference = total * den - weighted
+            if abs(difference) > absolute and abs(difference) * denominator > abs(total) * den * numerator:
+                found.append((position, row, difference))
+    return found
+
+
+__all__ = [
+    "CalculationFailure",
+    "CalculationLinkbaseError",
+    "CalculationMatrix",
+    "SUMMATION_ITEM",
+    "concept_values",
+    "evaluate_calculations",
+    "load_calculations",
+]
@@ -0,0 +1,168 @@
+"""Process pool that runs the CPU-bound end of the XBRL → Excel conversion off the API process.
+
+Uploads are tokenised while they stream in and finalised in API-process threads (see
+:class:`~app.services.xbrl_parser.IncrementalParse`): the parser state lives there and cannot
+move between processes mid-document. What follows, validation, derived metrics and rendering,
+runs here. Workers are spawned once and preload the taxonomy mappings together with the
+validator and workbook generator, so a request only pays for its own work.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from app.services.calculation_linkbase import CalculationMatrix, load_calculations
+from app.services.derived_metrics import metrics_json
+from app.services.excel_generator import ExcelGenerator
+from app.services.validation_service import ValidationService
+from app.services.xbrl_parser import XBRLParseResult
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class _WorkerServices:
+    validator: ValidationService
+    generator: ExcelGenerator
+    calculations: Optional[CalculationMatrix] = None
+
+
+@dataclass(frozen=True, slots=True)
+class RenderedFiling:
+    """A rendered workbook and the filing's metrics as :func:`metrics_json` serves them."""
+
+    workbook: bytes
+    metrics: Dict[str, Dict[str, float]]
+
+
+_services: Optional[_WorkerServices] = None
+
+
+def _initialize_worker(calculation_linkbase: Optional[str] = None) -> None:
+    """Build the conversion services once per worker process."""
+
+    global _services
+    _services = _WorkerServices(
+        validator=ValidationService(),
+        generator=ExcelGenerator(),
+        calculations=load_calculations(calculation_linkbase) if calculation_linkbase is not None else None,
+    )
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def render_result(parse_result: XBRLParseResult, source_url: Optional[str] = None) -> RenderedFiling:
+    """Validate, compute metrics for and render an already parsed filing.
+
+    ``source_url`` links audit rows to their source excerpts (see :class:`ExcelGenerator`).
+    """
+
+    if _services is None:
+        _initialize_worker()
+    assert _services is not None
+
+    validator = _services.validator
+    validation_messages = validator.validate_fact_table(parse_result.facts, axis=parse_result.period_axis)
+    if _services.calculations is not None:
+        validation_messages += validator.validate_calculations(parse_result, _services.calculations)
+    # The Ratios sheet memoises the metrics on the result; they travel back with the workbook.
+    workbook = _services.generator.generate(parse_result, validation_messages, source_url=source_url).getvalue()
+    return RenderedFiling(workbook, metrics_json(parse_result.metrics))
+
+
+class ConversionPool:
+    """Dispatch conversions to warm worker processes.
+
+    ``max_workers=0`` keeps conversions in-process but still off the event loop (default
+    thread pool), which is handy for development and tests. With ``calculation_linkbase`` every
+    conversion is also checked against that linkbase's summations, compiled once per worker.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, *, calculation_linkbase: Optional[str | Path] = None) -> None:
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self.calculation_linkbase = str(calculation_linkbase) if calculation_linkbase is not None else None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.max_workers == 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_initialize_worker,
+                    initargs=(self.calculation_linkbase,),
+                )
+            return self._executor
+
+    def warm_up(self) -> None:
+        """Spawn every worker now instead of on the first uploads."""
+
+        executor = self._get_executor()
+        if executor is None:
+            if _services is None:
+                _initialize_worker(self.calculation_linkbase)
+            return
+        futures = [executor.submit(_ping) for _ in range(self.max_workers)]
+        for future in futures:
+            future.result()
+
+    async def render(self, parse_result: XBRLParseResult, *, source_url: Optional[str] = None) -> RenderedFiling:
+        """Validate and render a result parsed in this process (e.g. while the upload streamed in)."""
+
+        return await self._submit(render_result, parse_result, source_url)
+
+    async def _submit(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            # A worker died (typically OOM-killed); start a fresh pool for the next request.
+            logger.error("Conversion worker pool broke; recreating it")
+            self._reset(executor)
+            raise
+
+    def _reset(self, executor: Optional[Executor]) -> None:
+        with self._lock:
+            if executor is not None and self._executor is executor:
+                self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+@lru_cache()
+def get_conversion_pool() -> ConversionPool:
+    """Return the application-wide pool configured from settings.
+
+    ``conversion_workers`` sizes only this pool. Parsing and finalisation of uploads do not run
+    here: they stay in API-process threads, which hold the incremental parser state.
+    """
+
+    from app.config import get_settings
+
+    settings = get_settings()
+    return ConversionPool(settings.conversion_workers, calculation_linkbase=settings.calculation_linkbase)
+
+
+__all__ = ["ConversionPool", "RenderedFiling", "get_conversion_pool", "render_result"]
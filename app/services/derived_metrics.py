@@ -0,0 +1,312 @@
+"""Financial ratios and growth rates derived from the standardized statement fields.
+
+Metrics form a dependency graph. Each :class:`Metric` names its inputs, which are statement
+fields (``profit_after_tax``) or other metrics (``equity``), plus the inputs it needs for the
+previous period as well (growth rates). :class:`MetricEngine` orders the graph once; evaluation
+then computes each metric as one pass over a whole column of (company, period) cells and keeps
+every column, intermediates included, so a metric several others depend on is computed once.
+
+A filing contributes one row per reporting year (its durations), or per instant when it reports
+no durations. Balance sheet fields of a year are read at the year's closing instant and
+"previous period" is the previous year, both joined on the
+:class:`~app.services.period_axis.PeriodAxis`.
+
+A filing's metrics are computed once and memoised on the parse result
+(:attr:`XBRLParseResult.metrics <app.services.xbrl_parser.XBRLParseResult.metrics>`). Uploads
+also file them next to the stored filing, and the ratio dashboard is served from those files.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from array import array
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+from app.services.fact_table import STATEMENT_NAMES
+from app.services.period_axis import PeriodAxis
+
+if TYPE_CHECKING:  # pragma: no cover
+    from app.services.xbrl_parser import XBRLParseResult
+
+PeriodValues = Mapping[str, Mapping[str, Decimal]]
+Column = List[Optional[Decimal]]
+
+# Bump when stored metrics should no longer be served (e.g. a formula changed).
+METRICS_FORMAT = 1
+
+_PLACES = Decimal("0.0001")
+
+
+@dataclass(frozen=True, slots=True)
+class Metric:
+    """``compute(*inputs, *lagged)`` for one cell, with ``lagged`` read from the previous period.
+
+    ``compute`` returns ``None`` where the metric is undefined. Metrics without a ``label`` are
+    intermediates: available to other metrics, but not reported.
+    """
+
+    name: str
+    label: str
+    inputs: Tuple[str, ...]
+    compute: Callable[..., Optional[Decimal]]
+    lagged: Tuple[str, ...] = ()
+    percentage: bool = False
+
+
+def ratio(numerator: Optional[Decimal], denominator: Optional[Decimal]) -> Optional[Decimal]:
+    if numerator is None or denominator is None or denominator == 0:
+        return None
+    return (numerator / denominator).quantize(_PLACES)
+
+
+def growth(current: Optional[Decimal], previous: Optional[Decimal]) -> Optional[Decimal]:
+    if current is None or previous is None or previous == 0:
+        return None
+    return ((current - previous) / abs(previous)).quantize(_PLACES)
+
+
+def first_reported(*values: Optional[Decimal]) -> Optional[Decimal]:
+    return next((value for value in values if value is not None), None)
+
+
+EQUITY = Metric("equity", "", ("total_equity", "shareholders_equity"), first_reported)
+SALES = Metric("sales", "", ("operating_revenue", "total_revenue", "revenue"), first_reported)
+
+CURRENT_RATIO = Metric("current_ratio", "Current ratio", ("current_assets", "current_liabilities"), ratio)
+LIABILITIES_TO_EQUITY = Metric("liabilities_to_equity", "Liabilities to equity", ("total_liabilities", "equity"), ratio)
+RETURN_ON_EQUITY = Metric("return_on_equity", "Return on equity", ("profit_after_tax", "equity"), ratio, percentage=True)
+RETURN_ON_ASSETS = Metric(
+    "return_on_assets", "Return on assets", ("profit_after_tax", "total_assets"), ratio, percentage=True
+)
+NET_PROFIT_MARGIN = Metric("net_profit_margin", "Net profit margin", ("profit_after_tax", "sales"), ratio, percentage=True)
+ASSET_TURNOVER = Metric("asset_turnover", "Asset turnover", ("sales", "total_assets"), ratio)
+EFFECTIVE_TAX_RATE = Metric(
+    "effective_tax_rate", "Effective tax rate", ("tax_expense", "profit_before_tax"), ratio, percentage=True
+)
+REVENUE_GROWTH = Metric("revenue_growth", "Revenue growth", ("sales",), growth, lagged=("sales",), percentage=True)
+PROFIT_GROWTH = Metric(
+    "profit_growth", "Profit growth", ("profit_after_tax",), growth, lagged=("profit_after_tax",), percentage=True
+)
+
+DEFAULT_METRICS: Tuple[Metric, ...] = (
+    EQUITY,
+    SALES,
+    CURRENT_RATIO,
+    LIABILITIES_TO_EQUITY,
+    RETURN_ON_EQUITY,
+    RETURN_ON_ASSETS,
+    NET_PROFIT_MARGIN,
+    ASSET_TURNOVER,
+    EFFECTIVE_TAX_RATE,
+    REVENUE_GROWTH,
+    PROFIT_GROWTH,
+)
+
+
+@dataclass(slots=True)
+class MetricFrame:
+    """Statement fields laid out as one column per field with a cell per (company, period).
+
+    A company's cells are contiguous and in date order; ``previous[cell]`` is the cell of the
+    company's previous period, or -1.
+    """
+
+    fields: Tuple[str, ...]
+    companies: List[str]
+    company_starts: array
+    periods: List[str]
+    columns: Dict[str, Column]
+    previous: array
+
+    @classmethod
+    def empty(cls, fields: Sequence[str]) -> "MetricFrame":
+        return cls(tuple(fields), [], array("i", [0]), [], {field: [] for field in fields}, array("i"))
+
+    def __len__(self) -> int:
+        return len(self.periods)
+
+    def add(self, company: str, values: PeriodValues, axis: Optional[PeriodAxis] = None) -> None:
+        """Append one filing's ``{period: {field: amount}}``; ``axis`` defaults to the labels' dates."""
+
+        axis = axis if axis is not None else PeriodAxis.from_labels(values)
+        positions = sorted(position for position in map(axis.position, values) if position is not None)
+        rows = [position for position in positions if axis.periods[position].is_duration] or positions
+        base = len(self.periods)
+        cells = {position: base + offset for offset, position in enumerate(rows)}
+        empty: Mapping[str, Decimal] = {}
+        for position in rows:
+            label = axis.periods[position].label
+            own = values[label]
+            closing = axis.closing(position)
+            at_close = values.get(axis.periods[closing].label, empty) if closing is not None else empty
+            for field in self.fields:
+                value = own.get(field)
+                self.columns[field].append(value if value is not None else at_close.get(field))
+            self.periods.append(label)
+            previous = axis.previous(position)
+            self.previous.append(cells.get(previous, -1) if previous is not None else -1)
+        self.companies.append(company)
+        self.company_starts.append(len(self.periods))
+
+    def add_result(self, company: str, result: "XBRLParseResult") -> None:
+        facts = result.facts
+        values: Dict[str, Dict[str, Decimal]] = {}
+        for statement in STATEMENT_NAMES:
+            for period, fields in facts.period_values(statement).items():
+                values.setdefault(period, {}).update(fields)
+        self.add(company, values, result.period_axis)
+
+
+@dataclass(slots=True)
+class MetricTable:
+    """Evaluated metric columns over a :class:`MetricFrame`; only reported metrics are kept."""
+
+    frame: MetricFrame
+    metrics: Tuple[Metric, ...]
+    columns: Dict[str, Column]
+
+    @property
+    def names(self) -> List[str]:
+        return [metric.name for metric in self.metrics]
+
+    def for_company(self, company: Optional[str] = None) -> Dict[str, Dict[str, Decimal]]:
+        """``{metric: {period: value}}`` for one company, periods oldest first; undefined values are
+        left out. ``company`` may be omitted for a single filing's table."""
+
+        frame = self.frame
+        if company is None:
+            if len(frame.companies) != 1:
+                raise ValueError("Name the company; this table holds several")
+            index = 0
+        else:
+            index = frame.companies.index(company)
+        start, end = frame.company_starts[index], frame.company_starts[index + 1]
+        return {
+            name: {
+                frame.periods[cell]: value
+                for cell, value in zip(range(start, end), column[start:end])
+                if value is not None
+            }
+            for name, column in self.columns.items()
+        }
+
+    def by_company(self) -> Dict[str, Dict[str, Dict[str, Decimal]]]:
+        return {company: self.for_company(company) for company in self.frame.companies}
+
+
+class MetricEngine:
+    """Compiled metric graph; :meth:`evaluate` runs it over a :class:`MetricFrame`."""
+
+    def __init__(self, metrics: Sequence[Metric] = DEFAULT_METRICS) -> None:
+        by_name: Dict[str, Metric] = {}
+        for metric in metrics:
+            if metric.name in by_name:
+                raise ValueError(f"Metric {metric.name!r} is defined twice")
+            by_name[metric.name] = metric
+        self.order: Tuple[Metric, ...] = _topological_order(by_name)
+        self.reported: Tuple[Metric, ...] = tuple(metric for metric in metrics if metric.label)
+        self.fields: Tuple[str, ...] = tuple(
+            dict.fromkeys(
+                name for metric in metrics for name in metric.inputs + metric.lagged if name not in by_name
+            )
+        )
+        digest = hashlib.sha256(repr(METRICS_FORMAT).encode())
+        for metric in self.order:
+            digest.update(repr((metric.name, metric.inputs, metric.lagged, metric.compute.__qualname__)).encode())
+        self.version = digest.hexdigest()[:16]
+
+    def frame(self) -> MetricFrame:
+        return MetricFrame.empty(self.fields)
+
+    def evaluate(self, frame: MetricFrame) -> MetricTable:
+        columns: Dict[str, Column] = dict(frame.columns)
+        previous = frame.previous
+        for metric in self.order:
+            arguments = [columns[name] for name in metric.inputs]
+            for name in metric.lagged:
+                column = columns[name]
+                arguments.append([column[cell] if cell >= 0 else None for cell in previous])
+            compute = metric.compute
+            columns[metric.name] = [compute(*cell) for cell in zip(*arguments)] if arguments else [None] * len(frame)
+        return MetricTable(frame, self.reported, {metric.name: columns[metric.name] for metric in self.reported})
+
+    def evaluate_results(
+        self, results: Iterable[Tuple[str, Union["XBRLParseResult", PeriodValues]]]
+    ) -> MetricTable:
+        """Stack ``(company, parse result or {period: {field: amount}})`` pairs and evaluate them at once."""
+
+        frame = self.frame()
+        for company, result in results:
+            if isinstance(result, Mapping):
+                frame.add(company, result)
+            else:
+                frame.add_result(company, result)
+        return self.evaluate(frame)
+
+
+def _topological_order(metrics: Mapping[str, Metric]) -> Tuple[Metric, ...]:
+    ordered: List[Metric] = []
+    state: Dict[str, bool] = {}  # False while visiting, True once ordered
+
+    def visit(metric: Metric, path: Tuple[str, ...]) -> None:
+        done = state.get(metric.name)
+        if done:
+            return
+        if done is False:
+            raise ValueError(f"Metric dependency cycle: {' -> '.join(path + (metric.name,))}")
+        state[metric.name] = False
+        for name in metric.inputs + metric.lagged:
+            if name in metrics:
+                visit(metrics[name], path + (metric.name,))
+        state[metric.name] = True
+        ordered.append(metric)
+
+    for metric in metrics.values():
+        visit(metric, ())
+    return tuple(ordered)
+
+
+@lru_cache()
+def get_metric_engine() -> MetricEngine:
+    """Engine over :data:`DEFAULT_METRICS`, shared by parse results, workbooks and the API."""
+
+    return MetricEngine()
+
+
+def statement_ratios(*sections: Mapping[str, Decimal]) -> Dict[str, Decimal]:
+    """Metrics for one undated set of figures, e.g. a single-context preview; growth rates need a
+    previous period and are left out."""
+
+    merged: Dict[str, Decimal] = {}
+    for section in sections:
+        merged.update(section)
+    table = get_metric_engine().evaluate_results([("", {"": merged})])
+    return {name: values[""] for name, values in table.for_company().items() if values}
+
+
+def metrics_json(table: MetricTable, company: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """One company's metrics as plain floats, the shape served by the API."""
+
+    return {
+        name: {period: float(value) for period, value in periods.items()}
+        for name, periods in table.for_company(company).items()
+    }
+
+
+__all__ = [
+    "DEFAULT_METRICS",
+    "METRICS_FORMAT",
+    "Metric",
+    "MetricEngine",
+    "MetricFrame",
+    "MetricTable",
+    "first_reported",
+    "get_metric_engine",
+    "growth",
+    "metrics_json",
+    "ratio",
+    "statement_ratios",
+]
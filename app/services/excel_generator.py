@@ -4,13 +4,15 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from io import BytesIO
-from typing import Dict, Iterable, List, Mapping, MutableMapping, Sequence
+from typing import Dict, Iterable, List, Mapping, MutableMapping, Optional, Sequence
 
 from openpyxl import Workbook
 from openpyxl.comments import Comment
 from openpyxl.styles import Alignment, Font, PatternFill
 from openpyxl.utils import get_column_letter
 
+from app.services.derived_metrics import MetricTable
+from app.services.period_axis import PeriodAxis
 from app.services.validation_service import ValidationMessage
 from app.services.xbrl_parser import AuditRecord, UnmappedFact, XBRLParseResult
 
@@ -28,7 +30,16 @@ CENTER_ALIGN = Alignment(horizontal="center", vertical="center")
 class ExcelGenerator:
     """Create Excel workbooks from parsed XBRL statement bundles."""
 
-    def generate(self, parse_result: XBRLParseResult, validations: Sequence[ValidationMessage]) -> BytesIO:
+    def generate(
+        self,
+        parse_result: XBRLParseResult,
+        validations: Sequence[ValidationMessage],
+        *,
+        source_url: Optional[str] = None,
+    ) -> BytesIO:
+        """Build the workbook; with ``source_url`` each audit row links to ``{source_url}/{fact}``,
+        the excerpt of the fact in the stored filing."""
+
         workbook = Workbook()
         # Remove the default sheet once we add our own content.
         default_sheet = workbook.active
@@ -37,9 +48,15 @@ class ExcelGenerator:
         issues_lookup = self._build_issue_lookup(validations)
         for statement_key, sheet_name in STATEMENT_SHEETS.items():
             sheet = workbook.create_sheet(sheet_name)
-            self._write_statement_sheet(sheet, parse_result.statement(statement_key), issues_lookup.get(statement_key, {}))
-
-        self._write_audit_sheet(workbook, parse_result.audit_trail, validations, parse_result.metadata)
+            self._write_statement_sheet(
+                sheet,
+                parse_result.statement(statement_key),
+                issues_lookup.get(statement_key, {}),
+                parse_result.period_axis,
+            )
+
+        self._write_ratio_sheet(workbook, parse_result.metrics)
+        self._write_audit_sheet(workbook, parse_result.audit_trail, validations, parse_result.metadata, source_url)
         self._write_unmapped_sheet(workbook, parse_result.unmapped_facts)
 
         buffer = BytesIO()
@@ -54,9 +71,15 @@ class ExcelGenerator:
             lookup.setdefault(message.statement, {}).setdefault(message.field, {})[message.period] = message
         return lookup
 
-    def _write_statement_sheet(self, sheet, data: Mapping[str, Mapping[str, object]], issues: Dict[str, Dict[str, ValidationMessage]]) -> None:
+    def _write_statement_sheet(
+        self,
+        sheet,
+        data: Mapping[str, Mapping[str, object]],
+        issues: Dict[str, Dict[str, ValidationMessage]],
+        axis: PeriodAxis,
+    ) -> None:
         sheet.append(["Metric"])
-        periods = self._collect_periods(data)
+        periods = self._collect_periods(data, axis)
         for idx, period in enumerate(periods, start=2):
             cell = sheet.cell(row=1, column=idx, value=period)
             cell.font = Font(bold=True)
@@ -89,13 +112,32 @@ class ExcelGenerator:
             sheet.column_dimensions[get_column_letter(idx)].width = 20
 
     @staticmethod
-    def _collect_periods(data: Mapping[str, Mapping[str, object]]) -> List[str]:
-        seen: List[str] = []
-        for period_values in data.values():
-            for period in period_values.keys():
-                if period not in seen:
-                    seen.append(period)
-        return seen
+    def _collect_periods(data: Mapping[str, Mapping[str, object]], axis: PeriodAxis) -> List[str]:
+        """The periods used in ``data``, oldest first."""
+
+        return axis.sort(period for period_values in data.values() for period in period_values)
+
+    def _write_ratio_sheet(self, workbook: Workbook, metrics: MetricTable) -> None:
+        sheet = workbook.create_sheet("Ratios")
+        periods = list(metrics.frame.periods)
+        for col, header in enumerate(["Metric", *periods], start=1):
+            cell = sheet.cell(row=1, column=col, value=header)
+            cell.font = Font(bold=True)
+            cell.fill = HEADER_FILL
+            cell.alignment = CENTER_ALIGN
+
+        values = metrics.for_company()
+        for row_index, metric in enumerate(metrics.metrics, start=2):
+            sheet.cell(row=row_index, column=1, value=metric.label)
+            for col_offset, period in enumerate(periods, start=2):
+                value = values[metric.name].get(period)
+                cell = sheet.cell(row=row_index, column=col_offset, value=float(value) if value is not None else None)
+                cell.number_format = "0.00%" if metric.percentage else "0.00"
+
+        sheet.freeze_panes = "B2"
+        sheet.column_dimensions["A"].width = 28
+        for idx in range(2, len(periods) + 2):
+            sheet.column_dimensions[get_column_letter(idx)].width = 20
 
     def _write_audit_sheet(
         self,
@@ -103,6 +145,7 @@ class ExcelGenerator:
         audit_trail: Sequence[AuditRecord],
         validations: Sequence[ValidationMessage],
         metadata: Mapping[str, object],
+        source_url: Optional[str] = None,
     ) -> None:
         sheet = workbook.create_sheet("Audit Trail")
         headers = [
@@ -114,6 +157,8 @@ class ExcelGenerator:
             "Unit",
             "Context Ref",
         ]
+        if source_url is not None:
+            headers.append("Source")
         for col, header in enumerate(headers, start=1):
             cell = sheet.cell(row=1, column=col, value=header)
             cell.font = Font(bold=True)
@@ -128,6 +173,10 @@ class ExcelGenerator:
             sheet.cell(row=row_index, column=5, value=float(record.value))
             sheet.cell(row=row_index, column=6, value=record.unit)
             sheet.cell(row=row_index, column=7, value=record.context_ref)
+            if source_url is not None and record.source_fact is not None:
+                source_cell = sheet.cell(row=row_index, column=8, value="XML")
+                source_cell.hyperlink = f"{source_url}/{record.source_fact}"
+                source_cell.font = Font(color="0563C1", underline="single")
 
         issue_start_row = len(audit_trail) + 3
         sheet.cell(row=issue_start_row, column=1, value="Validation Results").font = Font(bold=True)
@@ -167,7 +216,7 @@ class ExcelGenerator:
 
     def _write_unmapped_sheet(self, workbook: Workbook, unmapped_facts: Sequence[UnmappedFact]) -> None:
         sheet = workbook.create_sheet("Unmapped Facts")
-        headers = ["Concept", "Raw Tag", "Context", "Unit", "Raw Value"]
+        headers = ["Concept", "Raw Tag", "Context", "Unit", "Raw Value", "Bytes"]
         for idx, header in enumerate(headers, start=1):
             cell = sheet.cell(row=1, column=idx, value=header)
             cell.font = Font(bold=True)
@@ -186,15 +235,18 @@ class ExcelGenerator:
             sheet.cell(row=row_index, column=2, value=fact.raw_tag)
             sheet.cell(row=row_index, column=3, value=fact.context_ref)
             sheet.cell(row=row_index, column=4, value=fact.unit)
-            sheet.cell(row=row_index, column=5, value=fact.raw_value)
+            # Text blocks only carry a preview; the byte count shows how much was left out.
+            sheet.cell(row=row_index, column=5, value=f"{fact.raw_value}…" if fact.truncated else fact.raw_value)
+            sheet.cell(row=row_index, column=6, value=fact.byte_length)
 
         sheet.freeze_panes = "C2"
-        sheet.auto_filter.ref = f"A1:E{len(unmapped_facts) + 1}"
+        sheet.auto_filter.ref = f"A1:F{len(unmapped_facts) + 1}"
         sheet.column_dimensions["A"].width = 45
         sheet.column_dimensions["B"].width = 60
         sheet.column_dimensions["C"].width = 20
         sheet.column_dimensions["D"].width = 20
         sheet.column_dimensions["E"].width = 50
+        sheet.column_dimensions["F"].width = 12
 
 
 __all__ = ["ExcelGenerator"]
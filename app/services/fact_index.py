@@ -0,0 +1,155 @@
+"""Hash index over a parse result's facts keyed on (field, period, dimension set).
+
+Statement views only show entity-level figures. Facts reported against dimension members
+(operating segments, consolidated vs standalone, ...) stay in the fact table, and this index
+finds them without scanning the audit trail: one pass over the code columns builds
+
+* ``(field, period, dimension set) -> row`` (the last row wins, as in the statement views), so
+  a lookup is three pool probes and a dict hit, and
+* ``dimension set -> rows`` plus ``(axis, member) -> dimension sets``, so slicing by a member
+  touches only the rows that carry it.
+
+Dimension sets are :data:`~app.services.fact_table.Dimensions` tuples and may be passed as
+``{axis: member}`` mappings; axes and members are local names (``"SegmentsAxis"``).
+"""
+
+from __future__ import annotations
+
+from array import array
+from decimal import Decimal
+from heapq import merge
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from app.services.fact_table import NO_DIMENSIONS, Dimensions, FactTable, dimension_set
+from app.utils.currency import paise_to_decimal
+
+if TYPE_CHECKING:  # pragma: no cover - import cycle at runtime
+    from app.services.xbrl_parser import ContextInfo
+
+StatementMatrix = Dict[str, Dict[str, Dict[str, Decimal]]]
+DimensionQuery = Mapping[str, str] | Iterable[Tuple[str, str]]
+
+_Key = Tuple[int, int, int]
+
+
+class FactIndex:
+    """Lookups and dimension slices over a :class:`FactTable`; build with :meth:`XBRLParseResult.index`."""
+
+    __slots__ = ("_facts", "_set_codes", "dimension_sets", "_latest", "_by_concept", "_set_rows", "_member_sets")
+
+    def __init__(self, facts: FactTable, contexts: Mapping[str, "ContextInfo"]) -> None:
+        self._facts = facts
+        # Dimension set code -> members, read off the first context that uses each set.
+        self.dimension_sets: List[Dimensions] = [()] * len(facts.dimension_sets)
+        for context_ref, code in zip(facts.contexts.values, facts.context_dimensions):
+            info = contexts.get(context_ref)
+            if code != NO_DIMENSIONS and info is not None:
+                self.dimension_sets[code] = info.dimensions
+        self._set_codes: Dict[Dimensions, int] = {dimensions: code for code, dimensions in enumerate(self.dimension_sets)}
+        self._member_sets: Dict[Tuple[str, str], List[int]] = {}
+        for code, dimensions in enumerate(self.dimension_sets):
+            for pair in dimensions:
+                self._member_sets.setdefault(pair, []).append(code)
+
+        context_keys = list(zip(facts.context_periods, facts.context_dimensions))
+        latest: Dict[_Key, int] = {}
+        set_rows: Dict[int, array] = {}
+        for row, (field, context) in enumerate(zip(facts.field_codes, facts.context_codes)):
+            period, dimensions = context_keys[context]
+            latest[(field, period, dimensions)] = row
+            rows = set_rows.get(dimensions)
+            if rows is None:
+                rows = set_rows[dimensions] = array("i")
+            rows.append(row)
+        self._latest = latest
+        self._set_rows = set_rows
+        self._by_concept: Optional[Dict[_Key, int]] = None
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    # ------------------------------------------------------------------
+    # Point lookups
+    # ------------------------------------------------------------------
+
+    def value(self, field: str, period: str, dimensions: DimensionQuery = ()) -> Optional[Decimal]:
+        """Latest value of ``field`` (e.g. ``"total_revenue"``) for a period label and dimension set."""
+
+        return self._lookup(self._latest, self._facts.fields.find(field), period, dimensions)
+
+    def concept_value(self, concept: str, period: str, dimensions: DimensionQuery = ()) -> Optional[Decimal]:
+        """Like :meth:`value`, keyed on the reported concept name; needs ``collect_audit``."""
+
+        facts = self._facts
+        if self._by_concept is None:
+            facts._require_audit()
+            context_keys = list(zip(facts.context_periods, facts.context_dimensions))
+            self._by_concept = {
+                (concept_code, *context_keys[context]): row
+                for row, (concept_code, context) in enumerate(zip(facts.concept_codes, facts.context_codes))
+            }
+        return self._lookup(self._by_concept, facts.concepts.find(concept), period, dimensions)
+
+    def _lookup(
+        self, table: Dict[_Key, int], code: Optional[int], period: str, dimensions: DimensionQuery
+    ) -> Optional[Decimal]:
+        period_code = self._facts.periods.find(period)
+        set_code = self._set_codes.get(dimension_set(dimensions))
+        if code is None or period_code is None or set_code is None:
+            return None
+        row = table.get((code, period_code, set_code))
+        return paise_to_decimal(self._facts.values[row]) if row is not None else None
+
+    # ------------------------------------------------------------------
+    # Dimension slices
+    # ------------------------------------------------------------------
+
+    def members(self, axis: str) -> List[str]:
+        """Members reported on ``axis``, in order of first appearance."""
+
+        return list(dict.fromkeys(member for (name, member) in self._member_sets if name == axis))
+
+    def rows(self, dimensions: DimensionQuery = ()) -> array:
+        """Row numbers (document order) of facts in exactly this dimension set."""
+
+        code = self._set_codes.get(dimension_set(dimensions))
+        return self._set_rows.get(code, array("i")) if code is not None else array("i")
+
+    def slice(self, axis: str, member: str) -> List[int]:
+        """Row numbers (document order) of facts whose dimension set includes ``axis=member``."""
+
+        empty = array("i")
+        return list(merge(*(self._set_rows.get(code, empty) for code in self._member_sets.get((axis, member), ()))))
+
+    def statements(self, dimensions: DimensionQuery = ()) -> StatementMatrix:
+        """``{statement: {field: {period: Decimal}}}`` for one dimension set; ``()`` matches
+        :attr:`XBRLParseResult.statements`."""
+
+        return self._matrix(self.rows(dimensions))
+
+    def by_member(self, axis: str) -> Dict[str, StatementMatrix]:
+        """Statements per member of ``axis``, from facts qualified by that axis alone.
+
+        ``by_member("SegmentsAxis")`` gives segment-level statements; facts that combine the
+        axis with further dimensions are reachable through :meth:`statements` and :meth:`slice`.
+        """
+
+        return {member: self.statements({axis: member}) for member in self.members(axis)}
+
+    def _matrix(self, rows: Iterable[int]) -> StatementMatrix:
+        facts = self._facts
+        statements = facts.statements.values
+        fields = facts.fields.values
+        periods = facts.periods.values
+        statement_codes, field_codes, context_codes = facts.statement_codes, facts.field_codes, facts.context_codes
+        context_periods, values = facts.context_periods, facts.values
+        latest: Dict[_Key, int] = {}
+        for row in rows:
+            latest[(statement_codes[row], field_codes[row], context_periods[context_codes[row]])] = values[row]
+        matrix: StatementMatrix = {name: {} for name in statements}
+        for (statement, field, period), value in latest.items():
+            matrix[statements[statement]].setdefault(fields[field], {})[periods[period]] = paise_to_decimal(value)
+        return matrix
+
+
+__all__ = ["DimensionQuery", "FactIndex"]
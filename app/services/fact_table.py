@@ -0,0 +1,440 @@
+"""Columnar storage for mapped XBRL facts.
+
+Each fact is one row of small integer codes (statement, field, concept, context, unit) plus its
+amount in paise. Strings live once in per-column pools, so a row costs a few dozen bytes instead
+of an ``AuditRecord`` and a ``Decimal``. Nested statement dicts and audit records are produced
+as views on demand.
+
+Contexts qualified by dimension members (segments, consolidated/standalone, ...) are kept apart
+from the entity-level figures: statement views only read facts in contexts without dimensions,
+and :class:`~app.services.fact_index.FactIndex` slices the rest by dimension set. A period that
+has no dimension-free fact at all falls back to its dimension set when it has exactly one;
+:meth:`FactTable.dimensional_periods` reports those periods and the ones left out as ambiguous.
+"""
+
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, overload
+
+from app.utils.currency import paise_to_decimal
+
+STATEMENT_NAMES: Tuple[str, ...] = ("income_statement", "balance_sheet", "cash_flow")
+
+# (statement, field, concept, context_ref, period, unit, value in paise, source fact or None)
+FactRow = Tuple[str, str, str, str, str, Optional[str], int, Optional[int]]
+
+# Dimension members qualifying a context as sorted (axis, member) local-name pairs; () for none.
+Dimensions = Tuple[Tuple[str, str], ...]
+
+_NO_UNIT = -1
+# Dimension set code of contexts without dimensions (the pool is seeded with its empty key).
+NO_DIMENSIONS = 0
+# Period markers in FactTable._period_dimension_sets: several dimension sets, no facts at all.
+_AMBIGUOUS = -1
+_NO_FACTS = -2
+# Source position of facts whose engine does not report one (py-xbrl).
+NO_SOURCE = -1
+# Estimated cost of one pooled string (the str itself plus its list and dict slots).
+POOL_ENTRY_BYTES = 128
+
+
+@dataclass(slots=True)
+class AuditRecord:
+    statement: str
+    field: str
+    concept: str
+    context_ref: str
+    period: str
+    unit: Optional[str]
+    value: Decimal
+    # Position among the filing's facts, for drill-down through app.services.filing_store.
+    source_fact: Optional[int] = None
+
+
+def dimension_set(members: Mapping[str, str] | Iterable[Tuple[str, str]]) -> Dimensions:
+    """Canonical :data:`Dimensions` for ``{axis: member}`` or ``(axis, member)`` pairs."""
+
+    pairs = members.items() if isinstance(members, Mapping) else members
+    return tuple(sorted(dict(pairs).items()))
+
+
+def dimension_key(dimensions: Dimensions) -> str:
+    """Pool key (and display label) of a dimension set, e.g. ``"SegmentsAxis=RetailMember"``."""
+
+    return ", ".join(f"{axis}={member}" for axis, member in dimensions)
+
+
+class StringPool:
+    """Append-only string table handing out dense integer codes."""
+
+    __slots__ = ("values", "_codes")
+
+    def __init__(self, values: Sequence[str] = ()) -> None:
+        self.values: List[str] = list(values)
+        self._codes: Dict[str, int] = {value: code for code, value in enumerate(self.values)}
+
+    def code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def find(self, value: str) -> Optional[int]:
+        return self._codes.get(value)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, code: int) -> str:
+        return self.values[code]
+
+    def __getstate__(self) -> List[str]:
+        return self.values
+
+    def __setstate__(self, values: List[str]) -> None:
+        self.values = values
+        self._codes = {value: code for code, value in enumerate(values)}
+
+
+class FactTable:
+    """Array-backed table of mapped facts in document order.
+
+    With ``audit=False`` the concept and unit columns are not kept: statement views still work,
+    row access (and so the audit trail) does not. ``source_facts`` holds each row's position among
+    the document's fact elements (``NO_SOURCE`` if unknown) and is an audit column too.
+    ``context_dimensions`` maps each context to its dimension set (``NO_DIMENSIONS`` for plain
+    contexts), whose keys live in the ``dimension_sets`` pool. Tables decoded by
+    :mod:`app.services.result_codec` hold read-only ``memoryview`` columns and are not appended to.
+    """
+
+    __slots__ = (
+        "audit",
+        "statements",
+        "fields",
+        "concepts",
+        "contexts",
+        "units",
+        "periods",
+        "dimension_sets",
+        "context_periods",
+        "context_dimensions",
+        "statement_codes",
+        "field_codes",
+        "concept_codes",
+        "context_codes",
+        "unit_codes",
+        "source_facts",
+        "values",
+    )
+
+    def __init__(self, *, audit: bool = True) -> None:
+        self.audit = audit
+        self.statements = StringPool(STATEMENT_NAMES)
+        self.fields = StringPool()
+        self.concepts = StringPool()
+        self.contexts = StringPool()
+        self.units = StringPool()
+        self.periods = StringPool()
+        self.dimension_sets = StringPool(("",))
+        # Period and dimension set code for each context code; distinct contexts may share a
+        # period label, and differ only in their dimensions.
+        self.context_periods = array("i")
+        self.context_dimensions = array("i")
+        self.statement_codes = array("i")
+        self.field_codes = array("i")
+        self.concept_codes = array("i")
+        self.context_codes = array("i")
+        self.unit_codes = array("i")
+        self.source_facts = array("i")
+        self.values = array("q")
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def nbytes(self) -> int:
+        """Estimated bytes held by the columns and string pools, for parse budgets."""
+
+        columns = (
+            self.context_periods,
+            self.context_dimensions,
+            self.statement_codes,
+            self.field_codes,
+            self.concept_codes,
+            self.context_codes,
+            self.unit_codes,
+            self.source_facts,
+            self.values,
+        )
+        pools = (self.fields, self.concepts, self.contexts, self.units, self.periods, self.dimension_sets)
+        return sum(len(column) * column.itemsize for column in columns) + POOL_ENTRY_BYTES * sum(map(len, pools))
+
+    def append(
+        self,
+        statement: str,
+        field: str,
+        concept: str,
+        context_ref: str,
+        period: str,
+        unit: Optional[str],
+        paise: int,
+        source_fact: int = NO_SOURCE,
+        dimensions: str = "",
+    ) -> None:
+        """``dimensions`` is the context's :func:`dimension_key`, read on its first fact only."""
+
+        context_code = self.contexts.code(context_ref)
+        if context_code == len(self.context_periods):
+            self.context_periods.append(self.periods.code(period))
+            self.context_dimensions.append(self.dimension_sets.code(dimensions))
+        self.statement_codes.append(self.statements.code(statement))
+        self.field_codes.append(self.fields.code(field))
+        self.context_codes.append(context_code)
+        self.values.append(paise)
+        if self.audit:
+            self.concept_codes.append(self.concepts.code(concept))
+            self.unit_codes.append(self.units.code(unit) if unit is not None else _NO_UNIT)
+            self.source_facts.append(source_fact)
+
+    def extend(self, other: "FactTable", *, source_offset: int = 0) -> None:
+        """Append ``other``'s rows after this table's, re-coding its strings into these pools.
+
+        ``source_offset`` is added to ``other``'s known source positions, for tables built from
+        a later part of the same document.
+        """
+
+        statements = [self.statements.code(value) for value in other.statements.values]
+        fields = [self.fields.code(value) for value in other.fields.values]
+        contexts: List[int] = []
+        for other_code, context_ref in enumerate(other.contexts.values):
+            code = self.contexts.code(context_ref)
+            if code == len(self.context_periods):
+                self.context_periods.append(self.periods.code(other.periods[other.context_periods[other_code]]))
+                self.context_dimensions.append(
+                    self.dimension_sets.code(other.dimension_sets[other.context_dimensions[other_code]])
+                )
+            contexts.append(code)
+        self.statement_codes.extend(map(statements.__getitem__, other.statement_codes))
+        self.field_codes.extend(map(fields.__getitem__, other.field_codes))
+        self.context_codes.extend(map(contexts.__getitem__, other.context_codes))
+        self.values.extend(other.values)
+        if self.audit:
+            other._require_audit()
+            concepts = [self.concepts.code(value) for value in other.concepts.values]
+            # _NO_UNIT (-1) indexes the trailing entry, which maps it to itself.
+            units = [self.units.code(value) for value in other.units.values] + [_NO_UNIT]
+            self.concept_codes.extend(map(concepts.__getitem__, other.concept_codes))
+            self.unit_codes.extend(map(units.__getitem__, other.unit_codes))
+            if source_offset:
+                self.source_facts.extend(
+                    fact + source_offset if fact != NO_SOURCE else NO_SOURCE for fact in other.source_facts
+                )
+            else:
+                self.source_facts.extend(other.source_facts)
+
+    # ------------------------------------------------------------------
+    # Row access
+    # ------------------------------------------------------------------
+
+    def row(self, index: int) -> FactRow:
+        self._require_audit()
+        unit_code = self.unit_codes[index]
+        context_code = self.context_codes[index]
+        source_fact = self.source_facts[index]
+        return (
+            self.statements[self.statement_codes[index]],
+            self.fields[self.field_codes[index]],
+            self.concepts[self.concept_codes[index]],
+            self.contexts[context_code],
+            self.periods[self.context_periods[context_code]],
+            self.units[unit_code] if unit_code != _NO_UNIT else None,
+            self.values[index],
+            source_fact if source_fact != NO_SOURCE else None,
+        )
+
+    def rows(self) -> Iterator[FactRow]:
+        self._require_audit()
+        statements = self.statements.values
+        fields = self.fields.values
+        concepts = self.concepts.values
+        contexts = self.contexts.values
+        periods = self.periods.values
+        context_periods = self.context_periods
+        units = self.units.values
+        for statement, field, concept, context, unit, value, source_fact in zip(
+            self.statement_codes,
+            self.field_codes,
+            self.concept_codes,
+            self.context_codes,
+            self.unit_codes,
+            self.values,
+            self.source_facts,
+        ):
+            yield (
+                statements[statement],
+                fields[field],
+                concepts[concept],
+                contexts[context],
+                periods[context_periods[context]],
+                units[unit] if unit != _NO_UNIT else None,
+                value,
+                source_fact if source_fact != NO_SOURCE else None,
+            )
+
+    def _require_audit(self) -> None:
+        if not self.audit:
+            raise ValueError("Fact rows were not collected; parse with ParseOptions(collect_audit=True)")
+
+    # ------------------------------------------------------------------
+    # Aggregated views
+    # ------------------------------------------------------------------
+
+    def latest_values(self) -> Dict[Tuple[int, int, int], int]:
+        """Map ``(statement, field, period)`` codes to the last value seen in document order.
+
+        Keys keep first-occurrence order, which is the order statements have always listed
+        fields and periods in. Facts in dimension-qualified contexts are left out; they would
+        otherwise overwrite the entity-level figure for the same period. A period without any
+        dimension-free fact is read from its single dimension set instead, and left out when
+        its facts carry several.
+        """
+
+        context_periods = self.context_periods
+        latest: Dict[Tuple[int, int, int], int] = {}
+        columns = zip(self.statement_codes, self.field_codes, self.context_codes, self.values)
+        if not any(self.context_dimensions):
+            for statement, field, context, value in columns:
+                latest[(statement, field, context_periods[context])] = value
+            return latest
+        # -1 marks contexts outside their period's dimension set, so the common case above
+        # stays branch-free.
+        period_sets = self._period_dimension_sets()
+        primary_periods = [
+            period if dimensions == period_sets[period] else -1
+            for period, dimensions in zip(context_periods, self.context_dimensions)
+        ]
+        for statement, field, context, value in columns:
+            period = primary_periods[context]
+            if period >= 0:
+                latest[(statement, field, period)] = value
+        return latest
+
+    def dimensional_periods(self) -> Dict[str, Optional[str]]:
+        """Periods without dimension-free facts, mapped to the :func:`dimension_key` their
+        statement values were read from, or to ``None`` when several sets made them ambiguous."""
+
+        periods = self.periods.values
+        dimension_sets = self.dimension_sets.values
+        return {
+            periods[period]: dimension_sets[code] if code != _AMBIGUOUS else None
+            for period, code in enumerate(self._period_dimension_sets())
+            if code not in (NO_DIMENSIONS, _NO_FACTS)
+        }
+
+    def _period_dimension_sets(self) -> List[int]:
+        """Dimension set code each period's statement values come from, per period code."""
+
+        sets = [_NO_FACTS] * len(self.periods)
+        # Contexts are pooled with their first fact, so every context code here carries facts.
+        for period, dimensions in zip(self.context_periods, self.context_dimensions):
+            current = sets[period]
+            if current == NO_DIMENSIONS or current == dimensions:
+                continue
+            sets[period] = dimensions if dimensions == NO_DIMENSIONS or current == _NO_FACTS else _AMBIGUOUS
+        return sets
+
+    def statement_matrix(self) -> Dict[str, Dict[str, Dict[str, Decimal]]]:
+        """Build ``{statement: {field: {period: Decimal}}}``; later duplicates win."""
+
+        matrix: Dict[str, Dict[str, Dict[str, Decimal]]] = {name: {} for name in self.statements.values}
+        statements = self.statements.values
+        fields = self.fields.values
+        periods = self.periods.values
+        for (statement, field, period), value in self.latest_values().items():
+            matrix[statements[statement]].setdefault(fields[field], {})[periods[period]] = paise_to_decimal(value)
+        return matrix
+
+    def period_values(self, statement: str) -> Dict[str, Dict[str, Decimal]]:
+        """Return ``{period: {field: Decimal}}`` for one statement straight from the columns."""
+
+        grouped: Dict[str, Dict[str, Decimal]] = {}
+        statement_code = self.statements.find(statement)
+        if statement_code is None:
+            return grouped
+        fields = self.fields.values
+        periods = self.periods.values
+        for (row_statement, field, period), value in self.latest_values().items():
+            if row_statement == statement_code:
+                grouped.setdefault(periods[period], {})[fields[field]] = paise_to_decimal(value)
+        return grouped
+
+
+class AuditTrailView(Sequence[AuditRecord]):
+    """Read-only sequence of :class:`AuditRecord` materialised lazily from a :class:`FactTable`."""
+
+    __slots__ = ("_table",)
+
+    def __init__(self, table: FactTable) -> None:
+        self._table = table
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    @overload
+    def __getitem__(self, index: int) -> AuditRecord: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[AuditRecord]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._record(row) for row in (self._table.row(i) for i in range(*index.indices(len(self))))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("audit trail index out of range")
+        return self._record(self._table.row(index))
+
+    def __iter__(self) -> Iterator[AuditRecord]:
+        return (self._record(row) for row in self._table.rows())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (AuditTrailView, list, tuple)):
+            return len(self) == len(other) and all(left == right for left, right in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"AuditTrailView({len(self)} records)"
+
+    @staticmethod
+    def _record(row: FactRow) -> AuditRecord:
+        statement, field, concept, context_ref, period, unit, value, source_fact = row
+        return AuditRecord(
+            statement=statement,
+            field=field,
+            concept=concept,
+            context_ref=context_ref,
+            period=period,
+            unit=unit,
+            value=paise_to_decimal(value),
+            source_fact=source_fact,
+        )
+
+
+__all__ = [
+    "AuditRecord",
+    "AuditTrailView",
+    "Dimensions",
+    "FactRow",
+    "FactTable",
+    "NO_DIMENSIONS",
+    "NO_SOURCE",
+    "STATEMENT_NAMES",
+    "StringPool",
+    "dimension_key",
+    "dimension_set",
+]
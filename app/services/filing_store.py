@@ -0,0 +1,353 @@
+"""Raw uploaded filings, kept for drill-down from a parsed fact to its source XML.
+
+Filings are stored content-addressed (SHA-256) under ``data_dir``. The parser records each
+fact's position among the document's fact elements (:attr:`AuditRecord.source_fact`); on the
+first drill-down into a filing, one pass over the memory-mapped file turns those positions into
+byte ranges and stores them in a sidecar index, so every excerpt afterwards is two ``mmap``
+reads.
+
+Uploads also leave their precomputed ratios (:mod:`app.services.derived_metrics`) in a JSON
+sidecar, so dashboards over many filings read them back instead of re-parsing anything. A
+sidecar written by another metrics version (or never written) is recomputed from the stored
+filing on first read and filed again.
+
+The store is capped by size (``max_bytes``): reads refresh a filing's modification time, and once
+a new upload pushes the store past the cap, the least recently used filings are deleted together
+with their sidecars until it is back under :data:`PRUNE_TARGET` of the cap. Drill-down into a
+pruned filing answers ``None`` like any unknown digest, and its metrics are simply gone.
+
+The index pass uses the same byte-level patterns as :mod:`app.services.parallel_parser`: fact
+elements are start tags carrying ``contextRef`` (``ix:nonFraction`` in inline XBRL, counted in
+the order they close, as the inline engine does), and comments and CDATA sections are skipped.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import IO, Callable, Dict, Iterator, List, Mapping, Optional, Pattern, Tuple
+
+from app.services.parser_engines import INLINE
+from app.services.xbrl_parser import _detect_kind
+
+logger = logging.getLogger(__name__)
+
+Metrics = Dict[str, Dict[str, float]]
+
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+_INSTANCE_SUFFIX = ".xml"
+_INLINE_SUFFIX = ".xhtml"
+_INDEX_SUFFIX = ".idx"
+_METRICS_SUFFIX = ".metrics.json"
+_SIDECAR_SUFFIXES = (_INDEX_SUFFIX, _METRICS_SUFFIX)
+_HEAD_BYTES = 4096
+# Pruning goes below the cap so that it does not run again on the very next upload.
+PRUNE_TARGET = 0.9
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024 * 1024
+# (offset, length) of one fact element, little-endian.
+_INDEX_ENTRY = struct.Struct("<qq")
+
+_INSTANCE_FACT = re.compile(
+    rb"<!--.*?-->|<!\[CDATA\[.*?\]\]>|<([^\s/>!?]+)(?=\s)[^>]*?\scontextRef\s*=[^>]*?(/?)>",
+    re.DOTALL,
+)
+_INLINE_FACT = re.compile(
+    rb"<!--.*?-->|<!\[CDATA\[.*?\]\]>|<((?:[\w.-]+:)?nonFraction)(?=[\s/>])[^>]*?(/?)>|</(?:[\w.-]+:)?nonFraction\s*>",
+    re.DOTALL,
+)
+
+
+class FilingStore:
+    """Content-addressed store of raw filings with a lazily built fact byte-range index.
+
+    ``max_bytes=None`` keeps every filing forever.
+    """
+
+    def __init__(self, directory: str | Path, *, max_bytes: Optional[int] = DEFAULT_MAX_BYTES) -> None:
+        if max_bytes is not None and max_bytes < 0:
+            raise ValueError("max_bytes must be zero or positive")
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Running estimate of the store's size; None until the first commit scans it.
+        self._stored_bytes: Optional[int] = None
+
+    def writer(self) -> "FilingWriter":
+        return FilingWriter(self)
+
+    def path(self, digest: str) -> Optional[Path]:
+        """Stored filing for ``digest``, or ``None`` if there is none (or ``digest`` is malformed)."""
+
+        if not _DIGEST.fullmatch(digest):
+            return None
+        for suffix in (_INSTANCE_SUFFIX, _INLINE_SUFFIX):
+            candidate = self._path_for(digest, suffix)
+            if candidate.exists():
+                return candidate
+        return None
+
+    def excerpt(self, digest: str, fact: int) -> Optional[bytes]:
+        """Exact source bytes of fact number ``fact`` in filing ``digest``; ``None`` if unknown."""
+
+        path = self.path(digest)
+        if path is None or fact < 0:
+            return None
+        _touch(path)
+        span = self._span(path, fact)
+        if span is None:
+            return None
+        offset, length = span
+        with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped[offset : offset + length]
+
+    def save_metrics(self, digest: str, metrics: Mapping[str, Mapping[str, float]], *, version: str) -> None:
+        """File ``{metric: {period: value}}`` for a stored filing, tagged with the engine ``version``.
+
+        Metrics are auxiliary: a failed write is logged and the next read recomputes them.
+        """
+
+        if self.path(digest) is None:
+            return
+        payload = json.dumps({"version": version, "metrics": metrics}, separators=(",", ":")).encode()
+        try:
+            _write_atomically(self._path_for(digest, _METRICS_SUFFIX), payload)
+        except OSError:
+            logger.warning("Unable to file metrics for filing %s", digest, exc_info=True)
+
+    def metrics(
+        self, digest: str, *, version: str, compute: Optional[Callable[[Path], Optional[Metrics]]] = None
+    ) -> Optional[Metrics]:
+        """Metrics filed for ``digest`` by the same engine ``version``.
+
+        Otherwise, when the filing is stored and ``compute`` is given, ``compute(path)`` is filed
+        and returned; ``None`` if there is no filing or nothing could be computed.
+        """
+
+        if not _DIGEST.fullmatch(digest):
+            return None
+        try:
+            payload = json.loads(self._path_for(digest, _METRICS_SUFFIX).read_bytes())
+        except (OSError, ValueError):
+            payload = {}
+        path = self.path(digest)
+        if path is not None:
+            _touch(path)
+        if payload.get("version") == version:
+            return payload.get("metrics")
+        if compute is None or path is None:
+            return None
+        metrics = compute(path)
+        if metrics is not None:
+            self.save_metrics(digest, metrics, version=version)
+        return metrics
+
+    def _span(self, path: Path, fact: int) -> Optional[Tuple[int, int]]:
+        index_path = path.with_suffix(_INDEX_SUFFIX)
+        if not index_path.exists():
+            self._write_index(path, index_path)
+        with index_path.open("rb") as handle:
+            size = os.fstat(handle.fileno()).st_size
+            if (fact + 1) * _INDEX_ENTRY.size > size:
+                return None
+            # Only one entry is read, so the cost does not depend on the size of the filing.
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return _INDEX_ENTRY.unpack_from(mapped, fact * _INDEX_ENTRY.size)
+
+    def _write_index(self, path: Path, index_path: Path) -> None:
+        inline = path.suffix == _INLINE_SUFFIX
+        entries = b""
+        with path.open("rb") as handle:
+            if os.fstat(handle.fileno()).st_size:
+                with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    entries = b"".join(_INDEX_ENTRY.pack(*span) for span in fact_spans(mapped, inline=inline))
+        _write_atomically(index_path, entries)
+
+    def _path_for(self, digest: str, suffix: str) -> Path:
+        return self.directory / digest[:2] / f"{digest}{suffix}"
+
+    def _account(self, committed: Path) -> None:
+        if self.max_bytes is None:
+            return
+        try:
+            size = committed.stat().st_size
+        except OSError:
+            return
+        with self._lock:
+            if self._stored_bytes is None:
+                self._stored_bytes = sum(size for _, size, _ in self._filings())
+            else:
+                self._stored_bytes += size
+            if self._stored_bytes > self.max_bytes:
+                self._prune(keep=committed)
+
+    def _filings(self) -> List[Tuple[float, int, Path]]:
+        """``(mtime, size including sidecars, path)`` of every stored filing."""
+
+        filings: List[Tuple[float, int, Path]] = []
+        for suffix in (_INSTANCE_SUFFIX, _INLINE_SUFFIX):
+            for path in self.directory.glob(f"*/*{suffix}"):
+                if not _DIGEST.fullmatch(path.stem):
+                    continue
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue  # pruned by another process meanwhile
+                size = stat.st_size
+                for sidecar in _SIDECAR_SUFFIXES:
+                    try:
+                        size += path.with_suffix(sidecar).stat().st_size
+                    except OSError:
+                        pass
+                filings.append((stat.st_mtime, size, path))
+        return filings
+
+    def _prune(self, *, keep: Path) -> None:
+        # Rescanned here: other processes share the directory, so the running estimate drifts.
+        filings = sorted(self._filings())
+        total = sum(size for _, size, _ in filings)
+        target = int(self.max_bytes * PRUNE_TARGET)  # type: ignore[operator]
+        for _, size, path in filings:
+            if total <= target:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                logger.warning("Unable to prune stored filing %s", path, exc_info=True)
+                continue
+            for sidecar in _SIDECAR_SUFFIXES:
+                path.with_suffix(sidecar).unlink(missing_ok=True)
+            total -= size
+        self._stored_bytes = total
+
+
+class FilingWriter:
+    """Receives an upload chunk by chunk; :meth:`commit` files it under its digest."""
+
+    def __init__(self, store: FilingStore) -> None:
+        self._store = store
+        self._digest = hashlib.sha256()
+        self._head = bytearray()
+        self._file: Optional[IO[bytes]] = None
+
+    def feed(self, chunk: bytes | memoryview) -> None:
+        if self._file is None:
+            self._store.directory.mkdir(parents=True, exist_ok=True)
+            self._file = tempfile.NamedTemporaryFile(dir=self._store.directory, suffix=".tmp", delete=False)
+        if len(self._head) < _HEAD_BYTES:
+            self._head += chunk[: _HEAD_BYTES - len(self._head)]
+        self._digest.update(chunk)
+        self._file.write(chunk)
+
+    @property
+    def digest(self) -> str:
+        """SHA-256 of everything fed so far; the key the filing is committed under."""
+
+        return self._digest.hexdigest()
+
+    def commit(self, name: str) -> Optional[str]:
+        """Store the filing (``name`` picks instance vs inline XBRL) and return its digest."""
+
+        if self._file is None:
+            return None
+        self._file.close()
+        temp_path = Path(self._file.name)
+        self._file = None
+        digest = self.digest
+        suffix = _INLINE_SUFFIX if _detect_kind(name, bytes(self._head)) == INLINE else _INSTANCE_SUFFIX
+        target = self._store._path_for(digest, suffix)
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(temp_path, target)
+        except OSError:
+            temp_path.unlink(missing_ok=True)
+            raise
+        self._store._account(target)
+        return digest
+
+    def discard(self) -> None:
+        """Drop an uncommitted upload; a no-op after :meth:`commit`."""
+
+        if self._file is None:
+            return
+        self._file.close()
+        Path(self._file.name).unlink(missing_ok=True)
+        self._file = None
+
+
+def fact_spans(document: bytes | mmap.mmap, *, inline: bool) -> Iterator[Tuple[int, int]]:
+    """Yield ``(offset, length)`` of every fact element in parser order."""
+
+    if inline:
+        yield from _inline_spans(document)
+        return
+    end_tags: Dict[bytes, Pattern[bytes]] = {}
+    for match in _INSTANCE_FACT.finditer(document):
+        name = match.group(1)
+        if name is None:
+            continue  # comment or CDATA section
+        if match.group(2):
+            yield match.start(), match.end() - match.start()
+            continue
+        # Facts are leaf elements, so the next end tag with their name is their own.
+        end_tag = end_tags.get(name)
+        if end_tag is None:
+            end_tag = end_tags[name] = re.compile(rb"</" + re.escape(name) + rb"\s*>")
+        close = end_tag.search(document, match.end())
+        if close is None:
+            return  # truncated document; the parser rejected it anyway
+        yield match.start(), close.end() - match.start()
+
+
+def _inline_spans(document: bytes | mmap.mmap) -> Iterator[Tuple[int, int]]:
+    # ix:nonFraction may nest; the engine folds a fact when it closes, so emit on the end tag.
+    open_facts = []
+    for match in _INLINE_FACT.finditer(document):
+        text = match.group(0)
+        if text.startswith(b"</"):
+            if open_facts:
+                start = open_facts.pop()
+                yield start, match.end() - start
+        elif match.group(1) is not None:
+            if match.group(2):
+                yield match.start(), match.end() - match.start()
+            else:
+                open_facts.append(match.start())
+
+
+def _touch(path: Path) -> None:
+    # Marks the filing as recently used for pruning; a filing pruned meanwhile is not an error.
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _write_atomically(path: Path, payload: bytes) -> None:
+    with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False) as tmp:
+        tmp.write(payload)
+        temp_path = Path(tmp.name)
+    os.replace(temp_path, path)
+
+
+@lru_cache()
+def get_filing_store() -> FilingStore:
+    """Return the process-wide store under ``Settings.data_dir``."""
+
+    from app.config import get_settings
+
+    settings = get_settings()
+    return FilingStore(Path(settings.data_dir) / "filings", max_bytes=settings.filing_store_bytes)
+
+
+__all__ = ["FilingStore", "FilingWriter", "fact_spans", "get_filing_store"]
@@ -0,0 +1,309 @@
+"""Parse one large XBRL instance on several cores.
+
+A first pass over the raw bytes (regular expressions, no XML parsing of facts) finds the root
+element, every ``context``/``unit`` definition and cut points at fact boundaries. The
+definitions are parsed once in this process; the fact region is split into byte ranges that
+worker processes parse with the streaming engine, each range wrapped in a copy of the root tag
+so namespace prefixes resolve. Partial fact tables are merged in range order, which is document
+order, so duplicate resolution ("the later value wins") is unchanged.
+
+Cut points are found heuristically. A cut that does not fall between two top-level elements
+leaves a range that is not well-formed, so any parse error is reported as
+:class:`PartitionError` and the engine registry falls back to the sequential streaming engine,
+which then surfaces genuine syntax errors itself.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from xml.etree import ElementTree as ET
+
+from app.services.fact_table import FactTable
+from app.services.parse_budget import ParseBudget, ParseBudgetExceeded
+from app.services.parse_options import ParseOptions
+from app.services.unmapped_facts import UnmappedFacts
+from app.services.xbrl_parser import (
+    ContextInfo,
+    XBRLParseResult,
+    XBRLParserService,
+    _result_metadata,
+    _StreamingXMLEngine,
+)
+from app.utils.xbrl_source import iter_chunks
+
+logger = logging.getLogger(__name__)
+
+# Ranges smaller than this are not worth a round trip to a worker.
+MIN_RANGE_BYTES = 1024 * 1024
+# Ranges per worker; a little oversplitting evens out ranges with denser facts.
+RANGES_PER_WORKER = 2
+
+_ROOT_START = re.compile(rb"<(?![?!])([^\s/>]+)[^>]*>")
+_DEFINITION = re.compile(
+    rb"<!--.*?-->|<!\[CDATA\[.*?\]\]>|<((?:[\w.-]+:)?(?:context|unit))[\s>/]",
+    re.DOTALL,
+)
+_FACT_START = re.compile(rb"<[^\s/>!?]+\s[^>]*?\bcontextRef\s*=")
+
+
+class PartitionError(RuntimeError):
+    """The document could not be split into independently parseable ranges."""
+
+
+@dataclass(frozen=True, slots=True)
+class _WorkerConfig:
+    options: ParseOptions
+    budget: ParseBudget
+    unmapped_memory_budget: int
+
+
+@dataclass(slots=True)
+class Partition:
+    """Result of the first pass over a payload."""
+
+    root_open: bytes
+    root_close: bytes
+    definitions: bytes
+    ranges: List[Tuple[int, int]]
+
+
+def partition(payload: bytes | memoryview, parts: int) -> Partition:
+    """Locate the root tag, context/unit definitions and up to ``parts`` fact ranges."""
+
+    text = _as_bytes(payload)
+    head = text[: 64 * 1024]
+    if b"<!DOCTYPE" in head:
+        # Internal DTD subsets may declare entities the ranges could not see.
+        raise PartitionError("documents with a DOCTYPE are parsed sequentially")
+    root = _ROOT_START.search(head)
+    if root is None:
+        raise PartitionError("root element not found in the first 64 KiB")
+    prologue = head[: root.start()].strip()
+    declaration = prologue[: prologue.index(b"?>") + 2] if prologue.startswith(b"<?xml") else b""
+    root_name = root.group(1)
+    root_close = b"</" + root_name + b">"
+    body_start = root.end()
+    body_end = text.rfind(root_close)
+    if body_end < body_start:
+        raise PartitionError("closing root tag not found")
+
+    definitions: List[bytes] = []
+    for match in _DEFINITION.finditer(text, body_start, body_end):
+        name = match.group(1)
+        if name is None:
+            continue  # comment or CDATA section
+        tag_end = text.index(b">", match.start())
+        if text[tag_end - 1 : tag_end] == b"/":
+            definitions.append(text[match.start() : tag_end + 1])
+            continue
+        close = text.find(b"</" + name + b">", tag_end)
+        if close < 0:
+            raise PartitionError(f"unterminated <{name.decode()}> definition")
+        definitions.append(text[match.start() : close + len(name) + 3])
+
+    return Partition(
+        root_open=declaration + root.group(0),
+        root_close=root_close,
+        definitions=b"".join(definitions),
+        ranges=_fact_ranges(text, body_start, body_end, parts),
+    )
+
+
+def _as_bytes(payload: bytes | memoryview) -> bytes:
+    """``payload`` as ``bytes``, without a copy when it is a full view of a bytes object."""
+
+    if isinstance(payload, bytes):
+        return payload
+    view = memoryview(payload).cast("B")
+    if isinstance(view.obj, bytes) and len(view.obj) == view.nbytes:
+        return view.obj
+    return view.tobytes()
+
+
+def _fact_ranges(text: bytes, start: int, end: int, parts: int) -> List[Tuple[int, int]]:
+    parts = max(1, min(parts, (end - start) // MIN_RANGE_BYTES))
+    cuts = [start]
+    step = (end - start) // parts
+    for index in range(1, parts):
+        match = _FACT_START.search(text, max(start + index * step, cuts[-1] + 1), end)
+        if match is None:
+            break
+        cuts.append(match.start())
+    cuts.append(end)
+    return [(left, right) for left, right in zip(cuts, cuts[1:]) if right > left]
+
+
+def parse_parallel(
+    service: XBRLParserService,
+    payload: bytes | memoryview,
+    *,
+    source: str,
+    pool: Optional["ParallelParsePool"] = None,
+) -> XBRLParseResult:
+    pool = pool or get_parallel_pool()
+    layout = partition(payload, max(pool.max_workers, 1) * RANGES_PER_WORKER)
+    contexts, units = _parse_definitions(service, layout)
+    budget = service.budget
+    if budget.max_contexts is not None and len(contexts) > budget.max_contexts:
+        raise ParseBudgetExceeded("max_contexts", budget.max_contexts, len(contexts))
+
+    config = _WorkerConfig(service.options, budget, service.unmapped_memory_budget)
+    text = _as_bytes(payload)
+    documents = [layout.root_open + text[left:right] + layout.root_close for left, right in layout.ranges]
+    partials = pool.map(config, contexts, units, documents)
+
+    facts = FactTable(audit=service.options.collect_audit)
+    unmapped = UnmappedFacts(memory_budget=service.unmapped_memory_budget)
+    entities: Set[str] = set()
+    used_units: Set[str] = set()
+    source_offset = 0
+    for partial, fact_count in partials:
+        # Source positions restart in every range; shift them to whole-document positions.
+        facts.extend(partial.facts, source_offset=source_offset)
+        source_offset += fact_count
+        unmapped.extend(partial.unmapped_facts)
+        entities.update(partial.metadata["entities"])  # type: ignore[arg-type]
+        used_units.update(partial.metadata["units"])  # type: ignore[arg-type]
+    if budget.max_facts is not None and len(facts) + len(unmapped) > budget.max_facts:
+        raise ParseBudgetExceeded("max_facts", budget.max_facts, len(facts) + len(unmapped))
+
+    metadata = _result_metadata(
+        service.options,
+        source=source,
+        contexts=contexts,
+        entities=entities,
+        units=used_units,
+        unmapped=unmapped,
+        facts=facts,
+    )
+    return XBRLParseResult(facts=facts, contexts=contexts, metadata=metadata, unmapped_facts=unmapped)
+
+
+def _parse_definitions(
+    service: XBRLParserService, layout: Partition
+) -> Tuple[Dict[str, ContextInfo], Dict[str, Optional[str]]]:
+    try:
+        root = ET.fromstring(layout.root_open + layout.definitions + layout.root_close)
+    except ET.ParseError as exc:
+        raise PartitionError(f"context/unit definitions could not be isolated: {exc}") from exc
+    contexts: Dict[str, ContextInfo] = {}
+    units: Dict[str, Optional[str]] = {}
+    for element in root:
+        if element.tag.rsplit("}", 1)[-1] == "context":
+            info = service._context_from_element(element)
+            if info is not None:
+                contexts[info.id] = info
+        else:
+            unit_id = element.attrib.get("id")
+            if unit_id:
+                units[unit_id] = service._unit_measure(element)
+    return contexts, units
+
+
+def _parse_range(
+    config: _WorkerConfig,
+    contexts: Dict[str, ContextInfo],
+    units: Dict[str, Optional[str]],
+    document: bytes,
+) -> Tuple[XBRLParseResult, int]:
+    """Parse one range into a result and the number of fact elements it held.
+
+    The result travels back to the parent in the compact binary encoding.
+    """
+
+    service = XBRLParserService(
+        options=config.options,
+        budget=config.budget,
+        unmapped_memory_budget=config.unmapped_memory_budget,
+    )
+    engine = _StreamingXMLEngine(service, contexts=dict(contexts), units=dict(units))
+    try:
+        for chunk in iter_chunks(document):
+            engine.feed(chunk)
+        return engine.close(source="<range>"), engine.meter.facts
+    except ET.ParseError as exc:
+        raise PartitionError(f"byte range is not well-formed on its own: {exc}") from exc
+
+
+class ParallelParsePool:
+    """Worker processes for :func:`parse_parallel`; ``max_workers=0`` parses ranges in-process."""
+
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.max_workers == 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def map(
+        self,
+        config: _WorkerConfig,
+        contexts: Dict[str, ContextInfo],
+        units: Dict[str, Optional[str]],
+        documents: Sequence[bytes],
+    ) -> List[Tuple[XBRLParseResult, int]]:
+        executor = self._get_executor()
+        if executor is None:
+            return [_parse_range(config, contexts, units, document) for document in documents]
+        try:
+            futures = [executor.submit(_parse_range, config, contexts, units, document) for document in documents]
+        except BrokenProcessPool:
+            self._reset(executor)
+            raise
+        try:
+            return [future.result() for future in futures]
+        except BrokenProcessPool:
+            # A worker died; the registry falls back to streaming and the next parse gets a new pool.
+            logger.error("Parallel parse worker pool broke; recreating it")
+            self._reset(executor)
+            raise
+        except BaseException:
+            # Budget aborts arrive here as ParseBudgetExceeded and leave the pool usable.
+            for future in futures:
+                future.cancel()
+            raise
+
+    def _reset(self, executor: Executor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+@lru_cache()
+def get_parallel_pool() -> ParallelParsePool:
+    return ParallelParsePool()
+
+
+__all__ = [
+    "ParallelParsePool",
+    "Partition",
+    "PartitionError",
+    "get_parallel_pool",
+    "parse_parallel",
+    "partition",
+]
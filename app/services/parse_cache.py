@@ -0,0 +1,274 @@
+"""Content-addressed cache for parsed XBRL filings.
+
+Entries are keyed on the SHA-256 of the uploaded payload plus a namespace that carries the
+parser kind and mapping version, so a repeat upload of the same filing skips parsing entirely
+while any change to the taxonomy mapping invalidates old entries. A bounded in-process LRU sits
+in front of an on-disk tier that every worker process on the host shares. The disk tier is an LRU
+too, by size: hits refresh an entry's modification time, and once the tier outgrows
+``max_disk_bytes`` the least recently used entries are deleted until it is back under
+:data:`DISK_PRUNE_TARGET` of the limit.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+# Pruning goes below the limit so that it does not run again on the very next write.
+DISK_PRUNE_TARGET = 0.9
+DEFAULT_MAX_DISK_BYTES = 1024 * 1024 * 1024
+
+
+@dataclass(slots=True)
+class CacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    stores: int = 0
+    disk_evictions: int = 0
+
+
+class ParseCache:
+    """Two-tier (memory LRU + shared disk LRU) cache for parse results.
+
+    ``max_disk_bytes=None`` leaves the disk tier unbounded.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str | Path] = None,
+        *,
+        max_entries: int = 64,
+        max_disk_bytes: Optional[int] = DEFAULT_MAX_DISK_BYTES,
+    ) -> None:
+        if max_entries < 0:
+            raise ValueError("max_entries must be zero or positive")
+        if max_disk_bytes is not None and max_disk_bytes < 0:
+            raise ValueError("max_disk_bytes must be zero or positive")
+        self.directory = Path(directory) if directory is not None else None
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        # Running estimate of the disk tier's size; None until the first write scans it.
+        self._disk_bytes: Optional[int] = None
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def digest_bytes(payload: bytes | memoryview) -> str:
+        return hashlib.sha256(payload).hexdigest()
+
+    @staticmethod
+    def digest_file(path: str | Path) -> str:
+        digest = hashlib.sha256()
+        with Path(path).open("rb") as handle:
+            while True:
+                chunk = handle.read(_HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def digest_stream(stream: BinaryIO) -> str:
+        """Hash ``stream`` from its current position, then seek back so it can be parsed."""
+
+        start = stream.tell()
+        digest = hashlib.sha256()
+        while True:
+            chunk = stream.read(_HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+        stream.seek(start)
+        return digest.hexdigest()
+
+    @staticmethod
+    def key(digest: str, namespace: str) -> str:
+        return hashlib.sha256(f"{namespace}\0{digest}".encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------------
+    # Lookup / store
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._stats.memory_hits += 1
+                return value
+
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self._stats.misses += 1
+                return None
+            self._stats.disk_hits += 1
+            self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._stats.stores += 1
+            self._remember(key, value)
+        self._write_disk(key, value)
+
+    def get_or_compute(self, digest: str, namespace: str, compute: Callable[[], T]) -> T:
+        key = self.key(digest, namespace)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        """Drop the in-process tier; the shared disk tier is left to other workers."""
+
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            snapshot = asdict(self._stats)
+            snapshot["entries"] = len(self._entries)
+            snapshot["max_entries"] = self.max_entries
+            snapshot["max_disk_bytes"] = self.max_disk_bytes or 0
+        return snapshot
+
+    def _remember(self, key: str, value: Any) -> None:
+        if self.max_entries == 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats.evictions += 1
+
+    # ------------------------------------------------------------------
+    # Disk tier
+    # ------------------------------------------------------------------
+
+    def _path_for(self, key: str) -> Optional[Path]:
+        if self.directory is None:
+            return None
+        return self.directory / key[:2] / f"{key}.pickle"
+
+    def _read_disk(self, key: str) -> Optional[Any]:
+        path = self._path_for(key)
+        if path is None:
+            return None
+        try:
+            with path.open("rb") as handle:
+                value = pickle.load(handle)
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            logger.warning("Discarding unreadable parse cache entry %s", path)
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                pass
+            return None
+        try:
+            # A hit makes the entry the most recently used one for disk pruning.
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def _write_disk(self, key: str, value: Any) -> None:
+        path = self._path_for(key)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a sibling temp file and rename so concurrent readers never see partial data.
+            with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False) as tmp:
+                pickle.dump(value, tmp, protocol=pickle.HIGHEST_PROTOCOL)
+                temp_path = Path(tmp.name)
+                written = tmp.tell()
+            os.replace(temp_path, path)
+        except OSError:
+            logger.debug("Unable to persist parse cache entry %s", path, exc_info=True)
+            return
+        self._account_disk(written)
+
+    def _account_disk(self, written: int) -> None:
+        if self.max_disk_bytes is None:
+            return
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+            else:
+                self._disk_bytes += written
+            if self._disk_bytes > self.max_disk_bytes:
+                self._prune_disk()
+
+    def _disk_entries(self) -> List[Tuple[float, int, Path]]:
+        """``(mtime, size, path)`` of every disk entry; other processes may delete them meanwhile."""
+
+        assert self.directory is not None
+        entries: List[Tuple[float, int, Path]] = []
+        for path in self.directory.glob("*/*.pickle"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _prune_disk(self) -> None:
+        # Rescanned here: the tier is shared, so the running estimate drifts between processes.
+        entries = sorted(self._disk_entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_disk_bytes * DISK_PRUNE_TARGET)  # type: ignore[operator]
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            total -= size
+            self._stats.disk_evictions += 1
+        self._disk_bytes = total
+
+
+@lru_cache()
+def get_parse_cache() -> ParseCache:
+    """Return the process-wide cache backed by ``Settings.data_dir``."""
+
+    from app.config import get_settings
+
+    settings = get_settings()
+    return ParseCache(
+        Path(settings.data_dir) / "cache" / "parse",
+        max_entries=settings.parse_cache_entries,
+        max_disk_bytes=settings.parse_cache_disk_bytes,
+    )
+
+
+__all__ = ["CacheStats", "ParseCache", "get_parse_cache"]
@@ -0,0 +1,74 @@
+"""What a caller needs from a parse, so the parser can skip the rest."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import AbstractSet, FrozenSet, Iterable, Optional
+
+from app.services.fact_table import STATEMENT_NAMES
+
+
+@dataclass(frozen=True, slots=True)
+class ParseOptions:
+    """Projection applied while facts are folded.
+
+    ``statements`` and ``fields`` restrict which mapped facts are kept (``None`` keeps all).
+    Facts outside the projection are dropped as soon as their concept is resolved, before their
+    value is converted. ``collect_audit=False`` stores only what the statement views need, so
+    :attr:`XBRLParseResult.audit_trail` is unavailable; ``collect_unmapped=False`` skips unmapped
+    facts entirely and ``collect_period_metadata=False`` leaves ``metadata["periods"]`` out.
+    """
+
+    statements: Optional[FrozenSet[str]] = None
+    fields: Optional[FrozenSet[str]] = None
+    collect_audit: bool = True
+    collect_unmapped: bool = True
+    collect_period_metadata: bool = True
+
+    def __post_init__(self) -> None:
+        if self.statements is not None:
+            statements = _frozen(self.statements)
+            unknown = statements - set(STATEMENT_NAMES)
+            if unknown:
+                raise ValueError(f"Unknown statements in parse options: {', '.join(sorted(unknown))}")
+            object.__setattr__(self, "statements", statements)
+        if self.fields is not None:
+            object.__setattr__(self, "fields", _frozen(self.fields))
+
+    @property
+    def is_full(self) -> bool:
+        return self == FULL_PARSE
+
+    def wants(self, statement: str, field: str) -> bool:
+        return (self.statements is None or statement in self.statements) and (
+            self.fields is None or field in self.fields
+        )
+
+    @property
+    def cache_key(self) -> str:
+        """Stable identifier for cache namespaces; results of different projections never mix."""
+
+        if self.is_full:
+            return "full"
+        parts = [
+            ",".join(sorted(self.statements)) if self.statements is not None else "*",
+            ",".join(sorted(self.fields)) if self.fields is not None else "*",
+            "".join(
+                "1" if flag else "0"
+                for flag in (self.collect_audit, self.collect_unmapped, self.collect_period_metadata)
+            ),
+        ]
+        return "|".join(parts)
+
+
+def _frozen(values: Iterable[str] | AbstractSet[str]) -> FrozenSet[str]:
+    if isinstance(values, str):
+        return frozenset({values})
+    return frozenset(values)
+
+
+FULL_PARSE = ParseOptions()
+# Statement values only: what API previews and balance-sheet checks need.
+STATEMENTS_ONLY = ParseOptions(collect_audit=False, collect_unmapped=False, collect_period_metadata=False)
+
+__all__ = ["FULL_PARSE", "ParseOptions", "STATEMENTS_ONLY"]
@@ -0,0 +1,301 @@
+"""Registry of interchangeable XBRL parser engines.
+
+Each parser family (the statement parser in :mod:`app.services.xbrl_parser`, the Ind AS bundle
+parser in :mod:`app.parsers.xbrl_parser`) registers its engines here together with a selection
+policy. Streaming engines run straight off the source (a path is re-opened and a stream rewound
+for each attempt); the payload is only read into memory when a DOM engine is tried, at most
+once, and that buffer is then shared by every later engine. The registry also keeps per-engine
+timings and fallback counts so slow or failing engines show up in ``stats()`` instead of
+silently burning CPU.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, Generic, List, Optional, Sequence, Tuple, TypeVar
+from xml.etree import ElementTree as ET
+
+from app.services.parse_budget import ParseBudgetExceeded
+from app.utils.xbrl_source import (
+    DEFAULT_CHUNK_SIZE,
+    XBRLSource,
+    as_buffer,
+    is_path,
+    iter_chunks,
+    read_payload,
+    rewindable,
+)
+
+try:  # pragma: no cover - optional dependency
+    from lxml import etree as lxml_etree  # type: ignore
+except ImportError:  # pragma: no cover - lxml is optional
+    lxml_etree = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+INSTANCE = "instance"
+INLINE = "inline"
+
+# Errors that mean the payload itself is bad; every other engine would reject it too.
+PAYLOAD_ERRORS: Tuple[type[BaseException], ...] = (ET.ParseError, ValueError)
+if lxml_etree is not None:  # pragma: no branch
+    PAYLOAD_ERRORS += (lxml_etree.XMLSyntaxError,)
+
+HEAD_BYTES = 4096
+
+
+@dataclass(frozen=True, slots=True)
+class ParserEngine(Generic[T]):
+    """One way of turning a payload into a parse result.
+
+    ``run(owner, payload, label)`` is called with the parser instance that asked for the parse.
+    ``streaming`` engines receive an iterable of chunks and can run straight off a file;
+    the others receive the whole payload as a buffer. ``fallible`` engines (third-party
+    parsers) fall back to the next candidate on any error, not just on engine faults.
+    """
+
+    name: str
+    run: Callable[..., T]
+    kinds: FrozenSet[str] = frozenset({INSTANCE})
+    streaming: bool = False
+    available: bool = True
+    fallible: bool = False
+
+
+@dataclass(slots=True)
+class EngineStats:
+    calls: int = 0
+    failures: int = 0
+    fallbacks: int = 0
+    budget_aborts: int = 0
+    seconds: float = 0.0
+    bytes: int = 0
+
+
+@dataclass(slots=True)
+class Workload:
+    kind: str
+    size: Optional[int]
+
+
+Policy = Callable[[Workload], Sequence[str]]
+
+
+class EngineRegistry(Generic[T]):
+    """Select, run and account for parser engines."""
+
+    def __init__(self, policy: Policy, detect_kind: Optional[Callable[[str, bytes], str]] = None) -> None:
+        self.policy = policy
+        self._detect_kind = detect_kind
+        self._engines: Dict[str, ParserEngine[T]] = {}
+        self._stats: Dict[str, EngineStats] = {}
+        self._lock = threading.Lock()
+
+    def register(self, engine: ParserEngine[T]) -> None:
+        self._engines[engine.name] = engine
+        with self._lock:
+            self._stats.setdefault(engine.name, EngineStats())
+
+    def engine(self, name: str) -> ParserEngine[T]:
+        try:
+            return self._engines[name]
+        except KeyError as exc:
+            raise ValueError(f"Unknown parser engine {name!r}") from exc
+
+    def available(self) -> List[str]:
+        return [name for name, engine in self._engines.items() if engine.available]
+
+    def candidates(self, workload: Workload, prefer: Optional[Sequence[str]] = None) -> List[ParserEngine[T]]:
+        """Engines to try in order; ``prefer`` overrides the policy for the kinds it can handle."""
+
+        engines = self._usable(prefer or (), workload) or self._usable(self.policy(workload), workload)
+        if not engines:
+            raise ValueError(f"No parser engine available for {workload.kind} payloads")
+        return engines
+
+    def _usable(self, names: Sequence[str], workload: Workload) -> List[ParserEngine[T]]:
+        engines: List[ParserEngine[T]] = []
+        for name in names:
+            engine = self.engine(name)
+            if engine.available and workload.kind in engine.kinds and engine not in engines:
+                engines.append(engine)
+        return engines
+
+    # ------------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------------
+
+    def parse(self, owner: object, source: XBRLSource, label: str, *, prefer: Optional[Sequence[str]] = None) -> T:
+        workload = self._inspect(source, label)
+        engines = self.candidates(workload, prefer)
+
+        # Streaming engines run straight off the source. The payload is only read into memory
+        # once a DOM engine actually has to run, and then shared by every later candidate.
+        start: Optional[int] = None
+        if not is_path(source) and as_buffer(source) is None:
+            if len(engines) > 1:
+                # A fallback must be able to read the stream again; spools large ones to disk.
+                source = rewindable(source)  # type: ignore[arg-type]
+            start = _tell(source)
+        payload: Optional[bytes | memoryview] = None
+
+        first_error: Optional[BaseException] = None
+        for position, engine in enumerate(engines):
+            if position and start is not None:
+                source.seek(start)  # type: ignore[union-attr]
+            if payload is None and not engine.streaming:
+                payload = read_payload(source)
+                workload.size = len(payload)
+            try:
+                return self._run(engine, owner, source if payload is None else payload, label, workload)
+            except ParseBudgetExceeded as exc:
+                # Another engine would burn the same budget again.
+                logger.warning("Parser engine %s aborted %s: %s", engine.name, label, exc)
+                raise
+            except Exception as exc:
+                if first_error is None:
+                    first_error = exc
+                if not engine.fallible and isinstance(exc, PAYLOAD_ERRORS):
+                    raise
+                if position + 1 == len(engines):
+                    raise first_error from None
+                self._count(engine.name, fallbacks=1)
+                logger.warning(
+                    "Parser engine %s failed on %s (%s); falling back to %s",
+                    engine.name,
+                    label,
+                    exc,
+                    engines[position + 1].name,
+                )
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    def _run(self, engine: ParserEngine[T], owner: object, payload: XBRLSource, label: str, workload: Workload) -> T:
+        started = time.perf_counter()
+        try:
+            if engine.streaming:
+                result = engine.run(owner, iter_chunks(payload, DEFAULT_CHUNK_SIZE), label)
+            else:
+                result = engine.run(owner, payload, label)
+        except Exception as exc:
+            self.record(
+                engine.name,
+                time.perf_counter() - started,
+                workload.size or 0,
+                failed=True,
+                aborted=isinstance(exc, ParseBudgetExceeded),
+            )
+            raise
+        self.record(engine.name, time.perf_counter() - started, workload.size or 0)
+        return result
+
+    def record(self, name: str, seconds: float, size: int, *, failed: bool = False, aborted: bool = False) -> None:
+        """Account one run of ``name``; also used by feed-style parses that bypass :meth:`parse`."""
+
+        with self._lock:
+            stats = self._stats.setdefault(name, EngineStats())
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.bytes += size
+            if failed:
+                stats.failures += 1
+            if aborted:
+                stats.budget_aborts += 1
+
+    def _count(self, name: str, *, fallbacks: int) -> None:
+        with self._lock:
+            self._stats.setdefault(name, EngineStats()).fallbacks += fallbacks
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            snapshot: Dict[str, Dict[str, float]] = {}
+            for name, stats in self._stats.items():
+                entry: Dict[str, float] = asdict(stats)
+                entry["available"] = self._engines[name].available if name in self._engines else False
+                entry["mean_seconds"] = stats.seconds / stats.calls if stats.calls else 0.0
+                entry["mb_per_second"] = (
+                    stats.bytes / (1024 * 1024) / stats.seconds if stats.seconds > 0 else 0.0
+                )
+                snapshot[name] = entry
+        return snapshot
+
+    # ------------------------------------------------------------------
+    # Workload detection
+    # ------------------------------------------------------------------
+
+    def _inspect(self, source: XBRLSource, label: str) -> Workload:
+        head, size = _peek(source)
+        kind = self._detect_kind(label, head) if self._detect_kind is not None else INSTANCE
+        return Workload(kind=kind, size=size)
+
+
+def _tell(stream: XBRLSource) -> Optional[int]:
+    try:
+        return stream.tell() if stream.seekable() else None  # type: ignore[union-attr]
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _peek(source: XBRLSource) -> Tuple[bytes, Optional[int]]:
+    """Return the first bytes and total size of ``source`` without consuming it."""
+
+    buffer = as_buffer(source)
+    if buffer is not None:
+        return bytes(buffer[:HEAD_BYTES]), len(buffer)
+    if is_path(source):
+        path = Path(source)
+        with path.open("rb") as handle:
+            return handle.read(HEAD_BYTES), os.fstat(handle.fileno()).st_size
+    stream = source
+    try:
+        if stream.seekable():  # type: ignore[union-attr]
+            start = stream.tell()  # type: ignore[union-attr]
+            head = stream.read(HEAD_BYTES)  # type: ignore[union-attr]
+            end = stream.seek(0, os.SEEK_END)  # type: ignore[union-attr]
+            stream.seek(start)  # type: ignore[union-attr]
+            return head, end - start
+    except (AttributeError, OSError, ValueError):
+        pass
+    return b"", None
+
+
+def size_policy(
+    *,
+    dom_max_bytes: int,
+    dom_engines: Sequence[str],
+    streaming_engines: Sequence[str],
+    inline_engines: Sequence[str] = (),
+) -> Policy:
+    """Build a policy: DOM engines for small instances, streaming ones above ``dom_max_bytes``.
+
+    Unknown sizes (non-seekable streams) are treated as large. Each list doubles as the fallback
+    order, so the DOM list ends with a streaming engine and vice versa.
+    """
+
+    def policy(workload: Workload) -> Sequence[str]:
+        if workload.kind == INLINE:
+            return inline_engines
+        if workload.size is not None and workload.size <= dom_max_bytes:
+            return [*dom_engines, *streaming_engines]
+        return [*streaming_engines, *dom_engines]
+
+    return policy
+
+
+__all__ = [
+    "EngineRegistry",
+    "EngineStats",
+    "INLINE",
+    "INSTANCE",
+    "PAYLOAD_ERRORS",
+    "ParserEngine",
+    "Workload",
+    "lxml_etree",
+    "size_policy",
+]
@@ -0,0 +1,204 @@
+"""Chronological axis over a filing's periods, with instants aligned to durations.
+
+Statements key their amounts by period label. :class:`PeriodAxis` gives those labels their
+dates back: built from the parse result's :class:`~app.services.xbrl_parser.ContextInfo`
+entries (or, failing that, from the labels themselves, which carry ISO dates), it sorts the
+periods chronologically and indexes instants by date and durations by end date. Joining a
+duration to the balance at its start or end, or to the duration before it, is then a dict
+probe per period, so a ten-year filing costs ten probes and not ten label scans.
+
+:meth:`PeriodAxis.align` uses those joins to copy instant-dated fields (cash and cash
+equivalents in the cash flow statement) onto each duration as ``opening_<field>``,
+``closing_<field>`` and ``previous_closing_<field>``, which is what lets cross-period identities
+be written as ordinary per-period :class:`~app.services.validation_rules.ValidationRule`\\ s.
+"""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Optional, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover - import cycle at runtime
+    from app.services.xbrl_parser import ContextInfo
+
+OPENING = "opening_"
+CLOSING = "closing_"
+PREVIOUS_CLOSING = "previous_closing_"
+
+_ONE_DAY = timedelta(days=1)
+# Labels written by ContextInfo: "FY2023-24 (2023-04-01 to 2024-03-31)", "2023-04-01 to
+# 2024-03-31" and "As of 2024-03-31".
+_DURATION_LABEL = re.compile(r"(?:^|\()(\d{4}-\d{2}-\d{2}) to (\d{4}-\d{2}-\d{2})\)?$")
+_INSTANT_LABEL = re.compile(r"^As of (\d{4}-\d{2}-\d{2})$")
+
+
+@dataclass(frozen=True, slots=True)
+class Period:
+    """A period label with its dates: ``start``/``end`` for durations, ``instant`` otherwise."""
+
+    label: str
+    start: Optional[date] = None
+    end: Optional[date] = None
+    instant: Optional[date] = None
+
+    @property
+    def is_duration(self) -> bool:
+        return self.start is not None and self.end is not None
+
+    @property
+    def is_instant(self) -> bool:
+        return self.instant is not None and not self.is_duration
+
+    @property
+    def date(self) -> Optional[date]:
+        """The date the period is reported at: its end, or its instant."""
+
+        return self.end if self.is_duration else self.instant
+
+    @classmethod
+    def from_context(cls, context: "ContextInfo") -> "Period":
+        return cls(context.label, context.start_date, context.end_date, context.instant)
+
+    @classmethod
+    def from_label(cls, label: str) -> "Period":
+        """Read the dates back out of a context label; labels without dates stay undated."""
+
+        match = _DURATION_LABEL.search(label)
+        if match:
+            return cls(label, start=date.fromisoformat(match[1]), end=date.fromisoformat(match[2]))
+        match = _INSTANT_LABEL.match(label)
+        if match:
+            return cls(label, instant=date.fromisoformat(match[1]))
+        return cls(label)
+
+
+class PeriodAxis:
+    """Periods sorted by date (instants before durations ending the same day, longer durations
+    first); undated periods follow in first-seen order. Positions index :attr:`periods`."""
+
+    __slots__ = ("periods", "_positions", "_instants", "_instant_order", "_durations_ending")
+
+    def __init__(self, periods: Iterable[Period]) -> None:
+        unique: Dict[str, Period] = {}
+        for period in periods:
+            unique.setdefault(period.label, period)
+        dated = sorted((period for period in unique.values() if period.date is not None), key=_sort_key)
+        self.periods: List[Period] = dated + [period for period in unique.values() if period.date is None]
+        self._positions: Dict[str, int] = {period.label: position for position, period in enumerate(self.periods)}
+        self._instants: Dict[date, int] = {}
+        # Instant positions in date order, for stepping back from one instant to the one before.
+        self._instant_order: List[int] = []
+        self._durations_ending: Dict[date, List[int]] = {}
+        for position, period in enumerate(self.periods):
+            if period.is_duration:
+                self._durations_ending.setdefault(period.end, []).append(position)  # type: ignore[arg-type]
+            elif period.is_instant:
+                self._instant_order.append(position)
+                self._instants.setdefault(period.instant, position)  # type: ignore[arg-type]
+
+    @classmethod
+    def from_contexts(cls, contexts: Iterable["ContextInfo"]) -> "PeriodAxis":
+        return cls(Period.from_context(context) for context in contexts)
+
+    @classmethod
+    def from_labels(cls, labels: Iterable[str]) -> "PeriodAxis":
+        return cls(Period.from_label(label) for label in dict.fromkeys(labels))
+
+    def __len__(self) -> int:
+        return len(self.periods)
+
+    @property
+    def labels(self) -> List[str]:
+        return [period.label for period in self.periods]
+
+    def position(self, label: str) -> Optional[int]:
+        return self._positions.get(label)
+
+    def sort(self, labels: Iterable[str]) -> List[str]:
+        """``labels`` (deduplicated) in axis order; labels the axis does not know go last."""
+
+        unique = list(dict.fromkeys(labels))
+        last = len(self.periods)
+        return sorted(unique, key=lambda label: self._positions.get(label, last))
+
+    def opening(self, position: int) -> Optional[int]:
+        """The instant a duration opens at: its start date, else the day before it."""
+
+        period = self.periods[position]
+        if not period.is_duration:
+            return None
+        found = self._instants.get(period.start)  # type: ignore[arg-type]
+        if found is None:
+            found = self._instants.get(period.start - _ONE_DAY)  # type: ignore[operator]
+        return found
+
+    def closing(self, position: int) -> Optional[int]:
+        period = self.periods[position]
+        return self._instants.get(period.end) if period.is_duration else None  # type: ignore[arg-type]
+
+    def previous(self, position: int) -> Optional[int]:
+        """The duration ending the day before this one starts, closest to it in length; for an
+        instant, the instant before it."""
+
+        period = self.periods[position]
+        if period.is_instant:
+            rank = bisect_left(self._instant_order, position)
+            return self._instant_order[rank - 1] if rank else None
+        if not period.is_duration:
+            return None
+        candidates = self._durations_ending.get(period.start - _ONE_DAY)  # type: ignore[operator]
+        if not candidates:
+            return None
+        length = _length(period)
+        return min(candidates, key=lambda candidate: abs(_length(self.periods[candidate]) - length))
+
+    def align(self, values: Mapping[str, Mapping[str, Decimal]]) -> Dict[str, Dict[str, Decimal]]:
+        """Copy of ``{period: {field: amount}}`` where each duration also carries the instant
+        amounts at its opening and closing, and the closing of the duration before it.
+
+        ``previous_closing_<field>`` is only set when that closing is a different instant from
+        this duration's opening, i.e. when the carry-forward is not trivially true.
+        """
+
+        aligned: Dict[str, Dict[str, Decimal]] = {label: dict(fields) for label, fields in values.items()}
+        at_position: Dict[int, Mapping[str, Decimal]] = {}
+        for label, fields in values.items():
+            position = self._positions.get(label)
+            if position is not None:
+                at_position[position] = fields
+        instant_fields = {
+            position: fields for position, fields in at_position.items() if self.periods[position].is_instant
+        }
+        if not instant_fields:
+            return aligned
+        for position, fields in at_position.items():
+            if not self.periods[position].is_duration:
+                continue
+            target = aligned[self.periods[position].label]
+            opening = self.opening(position)
+            for prefix, instant in ((OPENING, opening), (CLOSING, self.closing(position))):
+                for field, amount in instant_fields.get(instant, {}).items():  # type: ignore[arg-type]
+                    target[prefix + field] = amount
+            previous = self.previous(position)
+            if previous is not None:
+                previous_closing = self.closing(previous)
+                if previous_closing is not None and previous_closing != opening:
+                    for field, amount in instant_fields.get(previous_closing, {}).items():
+                        target[PREVIOUS_CLOSING + field] = amount
+        return aligned
+
+
+def _sort_key(period: Period) -> Tuple[date, int, date]:
+    # For equal dates: the instant, then durations from the earliest start (longest) onwards.
+    return (period.date, 1 if period.is_duration else 0, period.start or period.date)  # type: ignore[return-value]
+
+
+def _length(period: Period) -> int:
+    return (period.end - period.start).days  # type: ignore[operator]
+
+
+__all__ = ["CLOSING", "OPENING", "PREVIOUS_CLOSING", "Period", "PeriodAxis"]
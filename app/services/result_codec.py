@@ -0,0 +1,378 @@
+"""Compact binary encoding of :class:`~app.services.xbrl_parser.XBRLParseResult`.
+
+Pickling a result walks thousands of slotted objects (contexts, unmapped facts) and re-emits
+every string once per object. This codec writes one de-duplicated string table and stores
+everything else as fixed-width little-endian integer columns, so encoding is mostly
+``array.tobytes`` and decoding a fact table is a handful of ``memoryview.cast`` calls.
+
+Layout (all integers little-endian, every block 8-byte aligned)::
+
+    header     magic (8 bytes) | version (u16) | flags (u16) | block count (u32)
+    directory  block count x (offset u64, length u64)
+    blocks     see ``_BLOCKS``; string references index the string table, -1 is None
+
+Per-row data is stored column by column, and code columns use the narrowest integer width
+their string pool allows, so a typical fact row costs 16 bytes instead of 32.
+
+Decoding is zero-copy for the fact columns: a result decoded from a ``bytes``, ``memoryview``
+or ``mmap`` keeps read-only views into that buffer instead of copying them into arrays, so
+the buffer must stay unchanged for the life of the result. Contexts, unmapped facts and
+metadata are rebuilt as objects since callers use them as such.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+import sys
+from array import array
+from collections import Counter
+from datetime import date
+from itertools import accumulate, islice
+from operator import attrgetter
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.services.fact_table import FactTable, StringPool
+from app.services.unmapped_facts import UnmappedFact, UnmappedFacts
+
+if TYPE_CHECKING:  # pragma: no cover - import cycle at runtime
+    from app.services.xbrl_parser import ResultMetadata, XBRLParseResult
+
+MAGIC = b"XBRLRES\x00"
+# Bumped whenever the layout below changes; older buffers are rejected, not misread.
+CODEC_VERSION = 3
+
+_HEADER = struct.Struct("<8sHHI")
+_DIRECTORY_ENTRY = struct.Struct("<QQ")
+_UNMAPPED_HEADER = struct.Struct("<qqq")
+_ALIGNMENT = 8
+_FLAG_AUDIT = 1
+_NONE = -1
+_NO_DATE = 0
+_LITTLE_ENDIAN = sys.byteorder == "little"
+_WIDTHS = (("b", 1 << 7), ("h", 1 << 15), ("i", 1 << 31))
+
+_POOLS = ("statements", "fields", "concepts", "contexts", "units", "periods", "dimension_sets")
+# Fact table column -> pool its codes index, or the fixed typecode of non-code columns.
+_FACT_COLUMNS = (
+    ("context_periods", "periods"),
+    ("context_dimensions", "dimension_sets"),
+    ("statement_codes", "statements"),
+    ("field_codes", "fields"),
+    ("concept_codes", "concepts"),
+    ("context_codes", "contexts"),
+    ("unit_codes", "units"),
+    ("source_facts", "i"),
+    ("values", "q"),
+)
+_BLOCKS = (
+    "string_offsets",  # u32 x (strings + 1), byte offsets into string_data
+    "string_data",  # UTF-8
+    "pool_sizes",  # i32 per entry of _POOLS
+    "pool_strings",  # i32 string references, pools concatenated
+    "column_types",  # one array typecode per entry of _FACT_COLUMNS
+    *(name for name, _ in _FACT_COLUMNS),
+    "context_strings",  # i32 x 2 columns: id, entity
+    "context_dates",  # i32 x 3 columns of date ordinals (0 is None): start, end, instant
+    "context_dimension_counts",  # i32 dimension members per context
+    "context_dimension_members",  # i32 string references, (axis, member) pairs in context order
+    "unmapped_header",  # preview_chars, memory_budget, preview_bytes
+    "unmapped_strings",  # i32 x 5 columns: concept, raw_tag, context_ref, unit, raw_value
+    "unmapped_lengths",  # i64 byte length per fact
+    "unmapped_truncated",  # u8 per fact
+    "metadata",  # UTF-8 JSON
+)
+
+
+class ResultCodecError(ValueError):
+    """Raised when a buffer is not an encoded parse result this version can read."""
+
+
+class _StringTable:
+    __slots__ = ("values", "_codes")
+
+    def __init__(self) -> None:
+        self.values: List[str] = []
+        self._codes: Dict[Optional[str], int] = {None: _NONE}
+
+    def codes(self, values: Sequence[Optional[str]]) -> array:
+        lookup = self._codes
+        for value in dict.fromkeys(values):
+            if value not in lookup:
+                lookup[value] = len(self.values)
+                self.values.append(value)  # type: ignore[arg-type]
+        return array("i", map(lookup.__getitem__, values))
+
+
+# ----------------------------------------------------------------------
+# Encoding
+# ----------------------------------------------------------------------
+
+
+def encode_result(result: "XBRLParseResult") -> bytes:
+    strings = _StringTable()
+    facts = result.facts
+    blocks: Dict[str, bytes] = {}
+
+    pools = [getattr(facts, name).values for name in _POOLS]
+    blocks["pool_sizes"] = _pack("i", [len(pool) for pool in pools])
+    blocks["pool_strings"] = _pack("i", strings.codes([value for pool in pools for value in pool]))
+    typecodes = []
+    for name, pool in _FACT_COLUMNS:
+        typecode = _narrowest(len(getattr(facts, pool))) if pool in _POOLS else pool
+        typecodes.append(typecode)
+        blocks[name] = _pack(typecode, getattr(facts, name))
+    blocks["column_types"] = "".join(typecodes).encode("ascii")
+
+    contexts = list(result.contexts.values())
+    blocks["context_strings"] = _pack(
+        "i", strings.codes([info.id for info in contexts] + [info.entity for info in contexts])
+    )
+    blocks["context_dates"] = _pack(
+        "i",
+        [_ordinal(info.start_date) for info in contexts]
+        + [_ordinal(info.end_date) for info in contexts]
+        + [_ordinal(info.instant) for info in contexts],
+    )
+    blocks["context_dimension_counts"] = _pack("i", [len(info.dimensions) for info in contexts])
+    blocks["context_dimension_members"] = _pack(
+        "i", strings.codes([name for info in contexts for pair in info.dimensions for name in pair])
+    )
+
+    unmapped = result.unmapped_facts
+    blocks["unmapped_header"] = _UNMAPPED_HEADER.pack(
+        unmapped.preview_chars, unmapped.memory_budget, unmapped.preview_bytes
+    )
+    unmapped_strings = array("i")
+    for attribute in ("concept", "raw_tag", "context_ref", "unit", "raw_value"):
+        unmapped_strings.extend(strings.codes(list(map(attrgetter(attribute), unmapped))))
+    blocks["unmapped_strings"] = _pack("i", unmapped_strings)
+    blocks["unmapped_lengths"] = _pack("q", list(map(attrgetter("byte_length"), unmapped)))
+    blocks["unmapped_truncated"] = bytes(map(attrgetter("truncated"), unmapped))
+
+    blocks["metadata"] = _encode_metadata(result.metadata)
+
+    encoded = [value.encode("utf-8") for value in strings.values]
+    blocks["string_offsets"] = _pack("I", [0, *accumulate(map(len, encoded))])
+    blocks["string_data"] = b"".join(encoded)
+
+    return _assemble([blocks[name] for name in _BLOCKS], flags=_FLAG_AUDIT if facts.audit else 0)
+
+
+def _encode_metadata(metadata: "ResultMetadata") -> bytes:
+    values: Dict[str, object] = {}
+    deferred: List[str] = []
+    for key, value in metadata._values.items():
+        if key == "periods":
+            # Derived from the contexts, so never stored; recomputed on access after decoding.
+            deferred.append(key)
+            value = None
+        values[key] = value
+    return json.dumps({"values": values, "deferred": deferred}, separators=(",", ":")).encode("utf-8")
+
+
+def _assemble(blocks: Sequence[bytes], *, flags: int) -> bytes:
+    directory_end = _HEADER.size + _DIRECTORY_ENTRY.size * len(blocks)
+    position = _aligned(directory_end)
+    entries = []
+    for block in blocks:
+        entries.append((position, len(block)))
+        position = _aligned(position + len(block))
+
+    out = bytearray(position)
+    _HEADER.pack_into(out, 0, MAGIC, CODEC_VERSION, flags, len(blocks))
+    for index, (offset, length) in enumerate(entries):
+        _DIRECTORY_ENTRY.pack_into(out, _HEADER.size + index * _DIRECTORY_ENTRY.size, offset, length)
+        out[offset : offset + length] = blocks[index]
+    return bytes(out)
+
+
+def _narrowest(pool_size: int) -> str:
+    """Smallest signed typecode holding codes ``-1 .. pool_size - 1``."""
+
+    for typecode, limit in _WIDTHS:
+        if pool_size <= limit:
+            return typecode
+    return "q"
+
+
+def _pack(typecode: str, values: Iterable[int]) -> bytes:
+    if _LITTLE_ENDIAN and isinstance(values, (array, memoryview)):
+        raw = bytes(values)
+        source, target = values.itemsize, struct.calcsize(typecode)
+        if source == target:
+            return raw
+        if target < source:
+            # Codes fit the narrower type, so their low-order bytes are the narrowed values.
+            out = bytearray(len(raw) // source * target)
+            for byte in range(target):
+                out[byte::target] = raw[byte::source]
+            return bytes(out)
+    column = array(typecode, values)
+    if not _LITTLE_ENDIAN:  # pragma: no cover - big-endian hosts
+        column.byteswap()
+    return column.tobytes()
+
+
+def _aligned(position: int) -> int:
+    return -(-position // _ALIGNMENT) * _ALIGNMENT
+
+
+def _ordinal(value: Optional[date]) -> int:
+    return value.toordinal() if value is not None else _NO_DATE
+
+
+# ----------------------------------------------------------------------
+# Decoding
+# ----------------------------------------------------------------------
+
+
+def decode_result(buffer) -> "XBRLParseResult":
+    """Rebuild a result from ``buffer`` (``bytes``, ``memoryview``, ``mmap``...) without copying its columns."""
+
+    view = memoryview(buffer).cast("B")
+    flags, blocks = _read_directory(view)
+    try:
+        return _decode_blocks(flags, blocks)
+    except (IndexError, OverflowError, TypeError, struct.error) as exc:
+        raise ResultCodecError("Encoded parse result is corrupt") from exc
+
+
+def _decode_blocks(flags: int, blocks: Dict[str, memoryview]) -> "XBRLParseResult":
+    from app.services.xbrl_parser import _DEFERRED, ContextInfo, ResultMetadata, XBRLParseResult
+
+    # The trailing None makes the -1 reference resolve to None without a branch.
+    strings: List[Optional[str]] = [*_decode_strings(blocks["string_offsets"], blocks["string_data"]), None]
+    lookup = strings.__getitem__
+
+    facts = FactTable(audit=bool(flags & _FLAG_AUDIT))
+    pool_sizes = _column(blocks["pool_sizes"], "i")
+    if len(pool_sizes) != len(_POOLS):
+        raise ResultCodecError("Encoded result has a malformed string pool directory")
+    pool_strings = _column(blocks["pool_strings"], "i")
+    start = 0
+    for name, size in zip(_POOLS, pool_sizes):
+        setattr(facts, name, StringPool(list(map(lookup, pool_strings[start : start + size]))))
+        start += size
+    typecodes = bytes(blocks["column_types"]).decode("ascii")
+    if len(typecodes) != len(_FACT_COLUMNS):
+        raise ResultCodecError("Encoded result has a malformed column directory")
+    for (name, _), typecode in zip(_FACT_COLUMNS, typecodes):
+        setattr(facts, name, _column(blocks[name], typecode))
+    if any(len(getattr(facts, name)) != len(facts.values) for name in ("statement_codes", "field_codes", "context_codes")):
+        raise ResultCodecError("Encoded result has fact columns of different lengths")
+
+    context_strings = _column(blocks["context_strings"], "i")
+    count = len(context_strings) // 2
+    dates = list(map(_date, _column(blocks["context_dates"], "i")))
+    dimension_counts = _column(blocks["context_dimension_counts"], "i")
+    members = list(map(lookup, _column(blocks["context_dimension_members"], "i")))
+    if len(dates) != 3 * count or len(dimension_counts) != count or len(members) != 2 * sum(dimension_counts):
+        raise ResultCodecError("Encoded result has context columns of different lengths")
+    pairs = iter(zip(members[::2], members[1::2]))
+    dimensions = [tuple(islice(pairs, size)) for size in dimension_counts]
+    contexts: Dict[str, ContextInfo] = {}
+    for info in map(
+        ContextInfo,
+        map(lookup, context_strings[:count]),
+        map(lookup, context_strings[count:]),
+        dates[:count],
+        dates[count : 2 * count],
+        dates[2 * count :],
+        dimensions,
+    ):
+        contexts[info.id] = info
+
+    unmapped = _decode_unmapped(blocks, lookup)
+
+    try:
+        document = json.loads(str(blocks["metadata"], "utf-8"))
+        values = document["values"]
+        for key in document["deferred"]:
+            values[key] = _DEFERRED
+    except (UnicodeDecodeError, ValueError, KeyError, TypeError) as exc:
+        raise ResultCodecError("Encoded result has unreadable metadata") from exc
+
+    return XBRLParseResult(
+        facts=facts,
+        contexts=contexts,
+        metadata=ResultMetadata(values, contexts),
+        unmapped_facts=unmapped,
+    )
+
+
+def _read_directory(view: memoryview) -> Tuple[int, Dict[str, memoryview]]:
+    if len(view) < _HEADER.size:
+        raise ResultCodecError("Buffer is too short to hold an encoded parse result")
+    magic, version, flags, count = _HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ResultCodecError("Buffer does not hold an encoded parse result")
+    if version != CODEC_VERSION:
+        raise ResultCodecError(f"Encoded parse result has version {version}, expected {CODEC_VERSION}")
+    if count != len(_BLOCKS) or len(view) < _HEADER.size + count * _DIRECTORY_ENTRY.size:
+        raise ResultCodecError("Encoded parse result has a malformed block directory")
+    blocks: Dict[str, memoryview] = {}
+    for index, name in enumerate(_BLOCKS):
+        offset, length = _DIRECTORY_ENTRY.unpack_from(view, _HEADER.size + index * _DIRECTORY_ENTRY.size)
+        if offset + length > len(view):
+            raise ResultCodecError(f"Encoded parse result is truncated (block {name!r})")
+        blocks[name] = view[offset : offset + length]
+    return flags, blocks
+
+
+def _decode_strings(offsets_block: memoryview, data: memoryview) -> List[str]:
+    offsets = _column(offsets_block, "I")
+    if not offsets or offsets[-1] != len(data):
+        raise ResultCodecError("Encoded result has a malformed string table")
+    try:
+        text = str(data, "utf-8")
+    except UnicodeDecodeError as exc:
+        raise ResultCodecError("Encoded result has a malformed string table") from exc
+    if len(text) == len(data):
+        # ASCII only: byte offsets are character offsets, slice the decoded text directly.
+        return [text[start:end] for start, end in zip(offsets, offsets[1:])]
+    return [str(data[start:end], "utf-8") for start, end in zip(offsets, offsets[1:])]
+
+
+def _decode_unmapped(blocks: Dict[str, memoryview], lookup: Callable[[int], Optional[str]]) -> UnmappedFacts:
+    preview_chars, memory_budget, preview_bytes = _UNMAPPED_HEADER.unpack(blocks["unmapped_header"])
+    references = _column(blocks["unmapped_strings"], "i")
+    lengths = _column(blocks["unmapped_lengths"], "q")
+    truncated = blocks["unmapped_truncated"]
+    count = len(lengths)
+    if not len(references) == 5 * count == 5 * len(truncated):
+        raise ResultCodecError("Encoded result has unmapped columns of different lengths")
+    concepts, raw_tags, context_refs, units, raw_values = (
+        map(lookup, references[index * count : (index + 1) * count]) for index in range(5)
+    )
+    facts = list(map(UnmappedFact, concepts, raw_tags, context_refs, units, raw_values, lengths, map(bool, truncated)))
+    unmapped = UnmappedFacts(preview_chars=preview_chars, memory_budget=memory_budget)
+    # Same state a pickled copy restores: previews only, counts rebuilt from the facts.
+    unmapped.__setstate__(
+        {
+            "preview_chars": preview_chars,
+            "memory_budget": memory_budget,
+            "concept_counts": dict(Counter(map(attrgetter("concept"), facts))),
+            "total_bytes": sum(lengths),
+            "preview_bytes": preview_bytes,
+            "facts": facts,
+        }
+    )
+    return unmapped
+
+
+def _column(block: memoryview, typecode: str) -> memoryview | array:
+    if typecode not in "bhiqBI" or len(block) % struct.calcsize(typecode):
+        raise ResultCodecError("Encoded result has a malformed column")
+    if _LITTLE_ENDIAN:
+        return block.cast(typecode)
+    column = array(typecode, block.tobytes())  # pragma: no cover - big-endian hosts
+    column.byteswap()  # pragma: no cover
+    return column  # pragma: no cover
+
+
+def _date(ordinal: int) -> Optional[date]:
+    return date.fromordinal(ordinal) if ordinal != _NO_DATE else None
+
+
+__all__ = ["CODEC_VERSION", "MAGIC", "ResultCodecError", "decode_result", "encode_result"]
@@ -0,0 +1,79 @@
+"""Coalesce concurrent identical computations onto the one already running.
+
+Around filing deadlines several analysts upload the same filing within seconds. Each request
+still streams its own upload, but once the payload hash is known the remaining work (parse
+finalisation, validation, rendering) is keyed on that hash plus everything else that shapes the
+response; a request whose key is already in flight awaits the running computation instead of
+starting its own. Keys are only held while the computation runs; completed results are left to
+the parse cache.
+
+The computation runs as its own task, so a client that disconnects (and cancels its request)
+does not cancel the work other requests are waiting on.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(slots=True)
+class FlightStats:
+    started: int = 0
+    joined: int = 0
+    failed: int = 0
+
+
+class SingleFlight(Generic[T]):
+    """In-flight registry: :meth:`run` computes each key at most once at a time."""
+
+    def __init__(self) -> None:
+        self._flights: Dict[Hashable, "asyncio.Task[T]"] = {}
+        self._lock = threading.Lock()
+        self._stats = FlightStats()
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[T]]) -> T:
+        """Return ``compute()``'s result, sharing it with every concurrent caller of ``key``.
+
+        Followers receive the leader's result or exception; ``compute`` is only called by the
+        leader.
+        """
+
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and flight.get_loop() is asyncio.get_running_loop():
+                self._stats.joined += 1
+            else:
+                flight = asyncio.ensure_future(compute())
+                self._flights[key] = flight
+                self._stats.started += 1
+                flight.add_done_callback(lambda done: self._land(key, done))
+        return await asyncio.shield(flight)
+
+    def _land(self, key: Hashable, flight: "asyncio.Task[T]") -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if flight.cancelled() or flight.exception() is not None:
+                self._stats.failed += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            snapshot = asdict(self._stats)
+            snapshot["in_flight"] = len(self._flights)
+        return snapshot
+
+
+@lru_cache()
+def get_single_flight() -> SingleFlight[Any]:
+    """Process-wide registry shared by the upload endpoints; keys start with the endpoint name."""
+
+    return SingleFlight()
+
+
+__all__ = ["FlightStats", "SingleFlight", "get_single_flight"]
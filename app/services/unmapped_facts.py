@@ -0,0 +1,208 @@
+"""Bounded storage for facts that did not map to a known Ind AS concept.
+
+Most unmapped facts in AOC-4 filings are narrative text blocks (accounting policies, notes,
+director reports) that can run to megabytes of HTML. Only a short preview of each value is held
+in memory; the full text of truncated values goes to a spool that moves to a temporary file
+once it outgrows the memory budget, and previews stop being kept once they have used up the
+same budget.
+"""
+
+from __future__ import annotations
+
+import tempfile
+from array import array
+from dataclasses import dataclass
+from typing import IO, Dict, Iterator, List, Optional, Sequence, overload
+
+from app.utils.constants import UNMAPPED_MEMORY_BUDGET, UNMAPPED_PREVIEW_CHARS
+
+_NOT_SPILLED = -1
+# Estimated cost of one UnmappedFact besides its preview text.
+_FACT_BYTES = 160
+
+
+@dataclass(slots=True)
+class UnmappedFact:
+    concept: str
+    raw_tag: Optional[str]
+    context_ref: Optional[str]
+    unit: Optional[str]
+    # The value itself for numeric facts and short text, a leading preview otherwise.
+    raw_value: str
+    byte_length: int = 0
+    truncated: bool = False
+
+
+class UnmappedFacts(Sequence[UnmappedFact]):
+    """Append-only sequence of :class:`UnmappedFact` with a bounded memory footprint.
+
+    Facts with a unit are numeric and kept verbatim. Text facts longer than ``preview_chars``
+    keep a preview, and their full value is written to a spool that stays in memory up to
+    ``memory_budget`` bytes and spills to a temporary file beyond it; :meth:`value` reads it
+    back and :meth:`close` releases it. Spooled text is not pickled, so a cached or
+    cross-process copy only carries the previews and byte lengths.
+    """
+
+    __slots__ = (
+        "preview_chars",
+        "memory_budget",
+        "concept_counts",
+        "total_bytes",
+        "preview_bytes",
+        "_facts",
+        "_offsets",
+        "_spill",
+        "_spilled_bytes",
+    )
+
+    def __init__(self, *, preview_chars: int = UNMAPPED_PREVIEW_CHARS, memory_budget: int = UNMAPPED_MEMORY_BUDGET) -> None:
+        self.preview_chars = preview_chars
+        self.memory_budget = memory_budget
+        self.concept_counts: Dict[str, int] = {}
+        self.total_bytes = 0
+        self.preview_bytes = 0
+        self._facts: List[UnmappedFact] = []
+        # Spool offset of each fact's full value, or _NOT_SPILLED.
+        self._offsets = array("q")
+        self._spill: Optional[IO[bytes]] = None
+        self._spilled_bytes = 0
+
+    @property
+    def nbytes(self) -> int:
+        """Estimated bytes held in memory: facts, previews and a spool that has not rolled over."""
+
+        spool = self._spilled_bytes if self._spilled_bytes <= self.memory_budget else 0
+        return len(self._facts) * _FACT_BYTES + self.preview_bytes + spool
+
+    def add(
+        self,
+        concept: str,
+        raw_tag: Optional[str],
+        context_ref: Optional[str],
+        unit: Optional[str],
+        text: Optional[str],
+    ) -> None:
+        text = text or ""
+        self.concept_counts[concept] = self.concept_counts.get(concept, 0) + 1
+        offset = _NOT_SPILLED
+        if unit is not None or len(text) <= self.preview_chars:
+            # Numeric values and short text: cheap enough to strip and keep whole.
+            value = text.strip()
+            byte_length = _utf8_length(value)
+            truncated = False
+        else:
+            # A text block; slice before stripping so the full text is never copied.
+            byte_length = _utf8_length(text)
+            value = text[: self.preview_chars * 2].strip()[: self.preview_chars]
+            truncated = True
+            offset = self._spill_text(text)
+        if self.preview_bytes >= self.memory_budget and truncated:
+            value = ""
+        self.preview_bytes += _utf8_length(value)
+        self.total_bytes += byte_length
+        self._offsets.append(offset)
+        self._facts.append(
+            UnmappedFact(
+                concept=concept,
+                raw_tag=raw_tag,
+                context_ref=context_ref,
+                unit=unit,
+                raw_value=value,
+                byte_length=byte_length,
+                truncated=truncated,
+            )
+        )
+
+    def extend(self, other: "UnmappedFacts") -> None:
+        """Append ``other``'s facts; their spooled full text is not carried over."""
+
+        for concept, count in other.concept_counts.items():
+            self.concept_counts[concept] = self.concept_counts.get(concept, 0) + count
+        self.total_bytes += other.total_bytes
+        self.preview_bytes += other.preview_bytes
+        self._facts.extend(other._facts)
+        self._offsets.extend([_NOT_SPILLED] * len(other._facts))
+
+    def value(self, index: int) -> Optional[str]:
+        """Full value of fact ``index``; ``None`` if its text was spooled by another copy."""
+
+        fact = self._facts[index]
+        offset = self._offsets[index]
+        if not fact.truncated:
+            return fact.raw_value
+        if offset == _NOT_SPILLED or self._spill is None:
+            return None
+        self._spill.seek(offset)
+        return self._spill.read(fact.byte_length).decode("utf-8").strip()
+
+    def close(self) -> None:
+        """Release the spool; previews and lengths stay, :meth:`value` answers ``None``."""
+
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+            self._spilled_bytes = 0
+
+    def _spill_text(self, text: str) -> int:
+        if self._spill is None:
+            self._spill = tempfile.SpooledTemporaryFile(max_size=self.memory_budget)
+        spill = self._spill
+        spill.seek(0, 2)
+        offset = spill.tell()
+        encoded = text.encode("utf-8")
+        spill.write(encoded)
+        self._spilled_bytes += len(encoded)
+        return offset
+
+    def __len__(self) -> int:
+        return len(self._facts)
+
+    @overload
+    def __getitem__(self, index: int) -> UnmappedFact: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[UnmappedFact]: ...
+
+    def __getitem__(self, index):
+        return self._facts[index]
+
+    def __iter__(self) -> Iterator[UnmappedFact]:
+        return iter(self._facts)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, UnmappedFacts):
+            return self._facts == other._facts
+        if isinstance(other, Sequence):
+            return self._facts == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"UnmappedFacts({len(self)} facts, {self.total_bytes} bytes)"
+
+    def __getstate__(self) -> dict:
+        return {
+            "preview_chars": self.preview_chars,
+            "memory_budget": self.memory_budget,
+            "concept_counts": self.concept_counts,
+            "total_bytes": self.total_bytes,
+            "preview_bytes": self.preview_bytes,
+            "facts": self._facts,
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.preview_chars = state["preview_chars"]
+        self.memory_budget = state["memory_budget"]
+        self.concept_counts = state["concept_counts"]
+        self.total_bytes = state["total_bytes"]
+        self.preview_bytes = state["preview_bytes"]
+        self._facts = state["facts"]
+        self._offsets = array("q", [_NOT_SPILLED] * len(self._facts))
+        self._spill = None
+        self._spilled_bytes = 0
+
+
+def _utf8_length(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+__all__ = ["UnmappedFact", "UnmappedFacts"]
@@ -0,0 +1,233 @@
+"""Declarative accounting identities and the plan they compile into.
+
+Each :class:`ValidationRule` names the statement it checks, the fields it reads and a function
+turning one period's values into ``(difference, base)`` (or ``None`` when the rule does not
+apply, e.g. because an input is missing). :class:`ValidationService` applies the tolerance and
+words the message, so rules stay pure functions of their inputs.
+
+:meth:`RuleRegistry.plan` compiles the registered rules into an :class:`EvaluationPlan`: rules
+grouped per statement in registration order, plus a ``(statement, field) -> rules`` dependency
+index. Cross-period identities read the instant amounts :meth:`PeriodAxis.align
+<app.services.period_axis.PeriodAxis.align>` copies onto each duration (``opening_<field>``,
+``closing_<field>``, ``previous_closing_<field>``). A later run over amended figures re-evaluates only the rules whose inputs changed (see
+:meth:`ValidationService.run`).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Dict, FrozenSet, Iterator, Mapping, Optional, Sequence, Tuple
+
+from app.services.period_axis import CLOSING, OPENING, PREVIOUS_CLOSING
+
+PeriodValues = Mapping[str, Decimal]
+# (difference, base amount for the relative tolerance); None when the rule does not apply.
+Outcome = Optional[Tuple[Decimal, Decimal]]
+
+_ZERO = Decimal("0")
+_CASH = "cash_and_cash_equivalents"
+_CASH_FLOWS = ("net_cash_from_operations", "net_cash_from_investing", "net_cash_from_financing")
+
+
+@dataclass(frozen=True, slots=True)
+class ValidationRule:
+    """One identity, checked per period of ``statement``; messages are reported on ``field``."""
+
+    name: str
+    statement: str
+    field: str
+    inputs: Tuple[str, ...]
+    evaluate: Callable[[PeriodValues], Outcome]
+    passed_message: str
+    failed_message: str
+
+
+@dataclass(frozen=True, slots=True)
+class EvaluationPlan:
+    statements: Tuple[str, ...]
+    rules: Mapping[str, Tuple[ValidationRule, ...]]
+    # Fields read by any rule of a statement; only these are compared between runs.
+    inputs: Mapping[str, FrozenSet[str]]
+    dependents: Mapping[Tuple[str, str], Tuple[ValidationRule, ...]]
+
+    def affected(self, statement: str, fields: Sequence[str]) -> Tuple[ValidationRule, ...]:
+        """Rules of ``statement`` reading any of ``fields``, in plan order."""
+
+        names = {rule.name for field in fields for rule in self.dependents.get((statement, field), ())}
+        return tuple(rule for rule in self.rules[statement] if rule.name in names)
+
+
+class RuleRegistry:
+    """Named validation rules; re-registering a name replaces the rule."""
+
+    def __init__(self, rules: Sequence[ValidationRule] = ()) -> None:
+        self._rules: Dict[str, ValidationRule] = {}
+        self._plan: Optional[EvaluationPlan] = None
+        for rule in rules:
+            self.register(rule)
+
+    def register(self, rule: ValidationRule) -> None:
+        self._rules[rule.name] = rule
+        self._plan = None
+
+    def rule(self, name: str) -> ValidationRule:
+        try:
+            return self._rules[name]
+        except KeyError as exc:
+            raise ValueError(f"Unknown validation rule {name!r}") from exc
+
+    def __iter__(self) -> Iterator[ValidationRule]:
+        return iter(self._rules.values())
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def plan(self) -> EvaluationPlan:
+        """Compile (once per set of registered rules) into an :class:`EvaluationPlan`."""
+
+        if self._plan is None:
+            rules: Dict[str, Tuple[ValidationRule, ...]] = {}
+            dependents: Dict[Tuple[str, str], Tuple[ValidationRule, ...]] = {}
+            for rule in self._rules.values():
+                rules[rule.statement] = rules.get(rule.statement, ()) + (rule,)
+                for field in rule.inputs:
+                    key = (rule.statement, field)
+                    dependents[key] = dependents.get(key, ()) + (rule,)
+            self._plan = EvaluationPlan(
+                statements=tuple(rules),
+                rules=rules,
+                inputs={
+                    statement: frozenset(field for rule in statement_rules for field in rule.inputs)
+                    for statement, statement_rules in rules.items()
+                },
+                dependents=dependents,
+            )
+        return self._plan
+
+
+# ----------------------------------------------------------------------
+# Built-in identities
+# ----------------------------------------------------------------------
+
+
+def balance_sheet_difference(values: PeriodValues) -> Outcome:
+    """Assets minus (liabilities + equity); missing amounts count as zero."""
+
+    total_assets = values.get("total_assets", _ZERO)
+    total_liabilities = values.get("total_liabilities", _ZERO)
+    total_equity = values.get("total_equity", values.get("shareholders_equity", _ZERO))
+    return total_assets - (total_liabilities + total_equity), total_assets
+
+
+def revenue_difference(values: PeriodValues) -> Outcome:
+    operating_revenue = values.get("operating_revenue")
+    other_income = values.get("other_income")
+    total_revenue = values.get("total_revenue") or values.get("total_income")
+    if operating_revenue is None or other_income is None or total_revenue is None:
+        return None
+    return total_revenue - (operating_revenue + other_income), total_revenue
+
+
+def profit_after_tax_difference(values: PeriodValues) -> Outcome:
+    profit_before_tax = values.get("profit_before_tax")
+    tax_expense = values.get("tax_expense")
+    profit_after_tax = values.get("profit_after_tax")
+    if profit_before_tax is None or tax_expense is None or profit_after_tax is None:
+        return None
+    return profit_after_tax - (profit_before_tax - tax_expense), profit_after_tax
+
+
+def cash_flow_difference(values: PeriodValues) -> Outcome:
+    """Change in cash minus the net operating, investing and financing flows."""
+
+    opening = values.get(OPENING + _CASH)
+    closing = values.get(CLOSING + _CASH)
+    flows = [values.get(field) for field in _CASH_FLOWS]
+    if opening is None or closing is None or any(flow is None for flow in flows):
+        return None
+    return (closing - opening) - sum(flows, _ZERO), closing  # type: ignore[arg-type]
+
+
+def cash_carry_forward_difference(values: PeriodValues) -> Outcome:
+    """Opening cash minus the previous period's closing cash, where those are distinct instants."""
+
+    opening = values.get(OPENING + _CASH)
+    previous_closing = values.get(PREVIOUS_CLOSING + _CASH)
+    if opening is None or previous_closing is None:
+        return None
+    return opening - previous_closing, previous_closing
+
+
+BALANCE_SHEET_IDENTITY = ValidationRule(
+    name="balance_sheet_identity",
+    statement="balance_sheet",
+    field="total_assets",
+    inputs=("total_assets", "total_liabilities", "total_equity", "shareholders_equity"),
+    evaluate=balance_sheet_difference,
+    passed_message="Assets equal liabilities plus equity",
+    failed_message="Assets do not equal liabilities plus equity",
+)
+REVENUE_IDENTITY = ValidationRule(
+    name="revenue_identity",
+    statement="income_statement",
+    field="total_revenue",
+    inputs=("operating_revenue", "other_income", "total_revenue", "total_income"),
+    evaluate=revenue_difference,
+    passed_message="Total revenue reconciles with operating revenue + other income",
+    failed_message="Total revenue mismatch against operating revenue + other income",
+)
+PROFIT_AFTER_TAX_IDENTITY = ValidationRule(
+    name="profit_after_tax_identity",
+    statement="income_statement",
+    field="profit_after_tax",
+    inputs=("profit_before_tax", "tax_expense", "profit_after_tax"),
+    evaluate=profit_after_tax_difference,
+    passed_message="Profit after tax reconciles with profit before tax minus tax expense",
+    failed_message="Profit after tax mismatch against profit before tax minus tax expense",
+)
+CASH_FLOW_IDENTITY = ValidationRule(
+    name="cash_flow_identity",
+    statement="cash_flow",
+    field=_CASH,
+    inputs=_CASH_FLOWS + (OPENING + _CASH, CLOSING + _CASH),
+    evaluate=cash_flow_difference,
+    passed_message="Net cash flows reconcile with the change in cash and cash equivalents",
+    failed_message="Net cash flows do not match the change in cash and cash equivalents",
+)
+CASH_CARRY_FORWARD = ValidationRule(
+    name="cash_carry_forward",
+    statement="cash_flow",
+    field=_CASH,
+    inputs=(OPENING + _CASH, PREVIOUS_CLOSING + _CASH),
+    evaluate=cash_carry_forward_difference,
+    passed_message="Opening cash equals the previous period's closing cash",
+    failed_message="Opening cash does not match the previous period's closing cash",
+)
+
+
+def default_rules() -> RuleRegistry:
+    """A fresh registry holding the built-in identities, ready for further rules."""
+
+    return RuleRegistry(
+        [BALANCE_SHEET_IDENTITY, REVENUE_IDENTITY, PROFIT_AFTER_TAX_IDENTITY, CASH_FLOW_IDENTITY, CASH_CARRY_FORWARD]
+    )
+
+
+__all__ = [
+    "BALANCE_SHEET_IDENTITY",
+    "CASH_CARRY_FORWARD",
+    "CASH_FLOW_IDENTITY",
+    "EvaluationPlan",
+    "Outcome",
+    "PROFIT_AFTER_TAX_IDENTITY",
+    "REVENUE_IDENTITY",
+    "RuleRegistry",
+    "ValidationRule",
+    "balance_sheet_difference",
+    "cash_carry_forward_difference",
+    "cash_flow_difference",
+    "default_rules",
+    "profit_after_tax_difference",
+    "revenue_difference",
+]
@@ -1,11 +1,19 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from decimal import Decimal
-from typing import Dict, Iterable, List, Optional
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
 
+from app.services.period_axis import PeriodAxis
+from app.services.validation_rules import EvaluationPlan, RuleRegistry, ValidationRule, balance_sheet_difference, default_rules
 from app.utils.constants import ACCOUNTING_TOLERANCE
 
+if TYPE_CHECKING:  # pragma: no cover
+    from app.services.batch_validation import BatchValidationResult
+    from app.services.calculation_linkbase import CalculationMatrix
+    from app.services.fact_table import FactTable
+    from app.services.xbrl_parser import XBRLParseResult
+
 
 class AccountingValidationError(ValueError):
     """Raised when an accounting identity is violated beyond tolerance."""
@@ -32,23 +40,43 @@ class ValidationMessage:
     message: str
 
 
+@dataclass(slots=True)
+class ValidationRun:
+    """Messages of one validation pass plus what :meth:`ValidationService.run` needs to redo it
+    incrementally: the rule inputs seen per ``(statement, period)`` and each rule's outcome per
+    ``(rule name, period)`` (``None`` where the rule did not apply). Plain data, so runs can be
+    stored next to the filings they describe."""
+
+    messages: List[ValidationMessage] = field(default_factory=list)
+    inputs: Dict[Tuple[str, str], Dict[str, Decimal]] = field(default_factory=dict)
+    outcomes: Dict[Tuple[str, str], Optional[ValidationMessage]] = field(default_factory=dict)
+    rules: Dict[str, ValidationRule] = field(default_factory=dict)
+    evaluated: int = 0
+    reused: int = 0
+
+
 class ValidationService:
-    """Apply core accounting validation rules on parsed statements."""
+    """Apply core accounting validation rules on parsed statements.
+
+    Rules come from a :class:`~app.services.validation_rules.RuleRegistry` (the built-in
+    identities by default); register more on :attr:`rules` to extend every later run.
+    """
 
     def __init__(
         self,
         *,
         absolute_tolerance: Decimal = ACCOUNTING_TOLERANCE,
         relative_tolerance: Decimal = Decimal("0.01"),
+        rules: Optional[RuleRegistry] = None,
     ) -> None:
         self.absolute_tolerance = absolute_tolerance
         self.relative_tolerance = relative_tolerance
+        self.rules = rules if rules is not None else default_rules()
 
     def validate_balance_sheet(self, balance_sheet: Dict[str, Decimal]) -> ValidationResult:
-        total_assets = balance_sheet.get("total_assets", Decimal("0"))
         total_liabilities = balance_sheet.get("total_liabilities", Decimal("0"))
         total_equity = balance_sheet.get("total_equity", balance_sheet.get("shareholders_equity", Decimal("0")))
-        difference = total_assets - (total_liabilities + total_equity)
+        difference, total_assets = balance_sheet_difference(balance_sheet)  # type: ignore[misc]
         if not self._within_tolerance(difference, total_assets):
             message = (
                 "Balance sheet does not balance. "
@@ -67,86 +95,160 @@ class ValidationService:
         return ValidationResult(is_valid=True, difference=Decimal("0"))
 
     def validate_statements(self, statements: Dict[str, Dict[str, Dict[str, Decimal]]]) -> List[ValidationMessage]:
+        return self.run(statements).messages
+
+    def validate_fact_table(self, table: "FactTable", *, axis: Optional[PeriodAxis] = None) -> List[ValidationMessage]:
+        """Validate straight from a parse result's columnar facts, skipping the nested statement view.
+
+        Pass the result's :attr:`~app.services.xbrl_parser.XBRLParseResult.period_axis` to date
+        periods from their contexts rather than their labels.
+        """
+
+        return self.run_fact_table(table, axis=axis).messages
+
+    def validate_batch(
+        self, results: Iterable[Tuple[str, "XBRLParseResult | FactTable"]]
+    ) -> "BatchValidationResult":
+        """Validate many ``(company, parse result)`` pairs at once, column by column.
+
+        Same identities and tolerances as :meth:`validate_fact_table`; see
+        :mod:`app.services.batch_validation`.
+        """
+
+        from app.services.batch_validation import validate_batch
+
+        return validate_batch(results, self)
+
+    def validate_calculations(
+        self, result: "XBRLParseResult", calculations: "CalculationMatrix"
+    ) -> List[ValidationMessage]:
+        """Check ``result`` against a compiled calculation linkbase; only failures are reported.
+
+        Messages carry the total's statement and field when it is a mapped concept, and
+        ``("calculation", concept)`` otherwise. See :mod:`app.services.calculation_linkbase`.
+        """
+
+        from app.services.calculation_linkbase import concept_values, evaluate_calculations
+        from app.utils.ind_as_mapper import resolve_concept
+
+        failures = evaluate_calculations(
+            calculations,
+            concept_values(result),
+            absolute_tolerance=self.absolute_tolerance,
+            relative_tolerance=self.relative_tolerance,
+        )
         messages: List[ValidationMessage] = []
-        balance_sheet = statements.get("balance_sheet", {})
-        for period, values in self._group_by_period(balance_sheet).items():
-            difference = self._balance_sheet_difference(values)
-            passed = self._within_tolerance(difference, values.get("total_assets", Decimal("0")))
-            message = (
-                "Assets equal liabilities plus equity"
-                if passed
-                else "Assets do not equal liabilities plus equity"
-            )
+        for failure in failures:
+            total = calculations.total(failure.row)
+            items = [concept for concept, _ in calculations.items(failure.row)]
+            mapping = resolve_concept(total)
             messages.append(
                 ValidationMessage(
-                    statement="balance_sheet",
-                    field="total_assets",
-                    period=period,
-                    passed=passed,
-                    difference=difference,
-                    message=message,
+                    statement=mapping.statement if mapping is not None else "calculation",
+                    field=mapping.field if mapping is not None else total,
+                    period=failure.period,
+                    passed=False,
+                    difference=failure.difference,
+                    message=f"{total} does not equal the sum of its calculation items ({', '.join(items)})",
                 )
             )
-
-        income_statement = statements.get("income_statement", {})
-        for period, values in self._group_by_period(income_statement).items():
-            messages.extend(self._validate_income_statement_period(values, period))
         return messages
 
-    def _validate_income_statement_period(self, values: Dict[str, Decimal], period: str) -> List[ValidationMessage]:
-        messages: List[ValidationMessage] = []
+    def run(
+        self,
+        statements: Dict[str, Dict[str, Dict[str, Decimal]]],
+        *,
+        previous: Optional[ValidationRun] = None,
+        axis: Optional[PeriodAxis] = None,
+    ) -> ValidationRun:
+        """Evaluate every rule over nested ``{statement: {field: {period: Decimal}}}`` figures.
 
-        operating_revenue = values.get("operating_revenue")
-        other_income = values.get("other_income")
-        total_revenue = values.get("total_revenue") or values.get("total_income")
-        if operating_revenue is not None and other_income is not None and total_revenue is not None:
-            expected = operating_revenue + other_income
-            difference = total_revenue - expected
-            passed = self._within_tolerance(difference, total_revenue)
-            message = (
-                "Total revenue reconciles with operating revenue + other income"
-                if passed
-                else "Total revenue mismatch against operating revenue + other income"
-            )
-            messages.append(
-                ValidationMessage(
-                    statement="income_statement",
-                    field="total_revenue",
-                    period=period,
-                    passed=passed,
-                    difference=difference,
-                    message=message,
-                )
-            )
+        With ``previous`` (the run over an earlier version of the same filing), only rules whose
+        inputs changed are re-evaluated; the other messages are carried over. Instants are
+        aligned to durations on ``axis``, by default read off the period labels.
+        """
 
-        profit_before_tax = values.get("profit_before_tax")
-        tax_expense = values.get("tax_expense")
-        profit_after_tax = values.get("profit_after_tax")
-        if (
-            profit_before_tax is not None
-            and tax_expense is not None
-            and profit_after_tax is not None
-        ):
-            expected = profit_before_tax - tax_expense
-            difference = profit_after_tax - expected
-            passed = self._within_tolerance(difference, profit_after_tax)
-            message = (
-                "Profit after tax reconciles with profit before tax minus tax expense"
-                if passed
-                else "Profit after tax mismatch against profit before tax minus tax expense"
-            )
-            messages.append(
-                ValidationMessage(
-                    statement="income_statement",
-                    field="profit_after_tax",
-                    period=period,
-                    passed=passed,
-                    difference=difference,
-                    message=message,
-                )
-            )
+        plan = self.rules.plan()
+        periods = {statement: self._group_by_period(statements.get(statement, {})) for statement in plan.statements}
+        return self._run(plan, periods, previous, axis)
 
-        return messages
+    def run_fact_table(
+        self,
+        table: "FactTable",
+        *,
+        previous: Optional[ValidationRun] = None,
+        axis: Optional[PeriodAxis] = None,
+    ) -> ValidationRun:
+        """:meth:`run` over a fact table's columns."""
+
+        plan = self.rules.plan()
+        periods = {statement: table.period_values(statement) for statement in plan.statements}
+        return self._run(plan, periods, previous, axis)
+
+    def _run(
+        self,
+        plan: EvaluationPlan,
+        periods: Dict[str, Dict[str, Dict[str, Decimal]]],
+        previous: Optional[ValidationRun],
+        axis: Optional[PeriodAxis],
+    ) -> ValidationRun:
+        if axis is None:
+            axis = PeriodAxis.from_labels(label for values in periods.values() for label in values)
+        run = ValidationRun(rules={rule.name: rule for rules in plan.rules.values() for rule in rules})
+        for statement in plan.statements:
+            fields = plan.inputs[statement]
+            for period, values in axis.align(periods[statement]).items():
+                inputs = {field: values[field] for field in fields if field in values}
+                run.inputs[(statement, period)] = inputs
+                for rule in self._rules_to_evaluate(plan, statement, period, inputs, previous):
+                    run.outcomes[(rule.name, period)] = self._evaluate(rule, inputs, period)
+                    run.evaluated += 1
+                for rule in plan.rules[statement]:
+                    key = (rule.name, period)
+                    if key not in run.outcomes:
+                        assert previous is not None
+                        run.outcomes[key] = previous.outcomes[key]
+                        run.reused += 1
+                    message = run.outcomes[key]
+                    if message is not None:
+                        run.messages.append(message)
+        return run
+
+    @staticmethod
+    def _rules_to_evaluate(
+        plan: EvaluationPlan,
+        statement: str,
+        period: str,
+        inputs: Dict[str, Decimal],
+        previous: Optional[ValidationRun],
+    ) -> Tuple[ValidationRule, ...]:
+        rules = plan.rules[statement]
+        previous_inputs = previous.inputs.get((statement, period)) if previous is not None else None
+        if previous is None or previous_inputs is None:
+            return rules
+        changed = [field for field in plan.inputs[statement] if inputs.get(field) != previous_inputs.get(field)]
+        affected = {rule.name for rule in plan.affected(statement, changed)}
+        # Rules added or redefined since the previous run have no reusable outcome.
+        return tuple(
+            rule
+            for rule in rules
+            if rule.name in affected or previous.rules.get(rule.name) != rule or (rule.name, period) not in previous.outcomes
+        )
+
+    def _evaluate(self, rule: ValidationRule, values: Dict[str, Decimal], period: str) -> Optional[ValidationMessage]:
+        outcome = rule.evaluate(values)
+        if outcome is None:
+            return None
+        difference, base = outcome
+        passed = self._within_tolerance(difference, base)
+        return ValidationMessage(
+            statement=rule.statement,
+            field=rule.field,
+            period=period,
+            passed=passed,
+            difference=difference,
+            message=rule.passed_message if passed else rule.failed_message,
+        )
 
     @staticmethod
     def _group_by_period(statement: Dict[str, Dict[str, Decimal]]) -> Dict[str, Dict[str, Decimal]]:
@@ -156,12 +258,6 @@ class ValidationService:
                 grouped.setdefault(period, {})[field] = value
         return grouped
 
-    def _balance_sheet_difference(self, values: Dict[str, Decimal]) -> Decimal:
-        total_assets = values.get("total_assets", Decimal("0"))
-        total_liabilities = values.get("total_liabilities", Decimal("0"))
-        total_equity = values.get("total_equity", values.get("shareholders_equity", Decimal("0")))
-        return total_assets - (total_liabilities + total_equity)
-
     def _within_tolerance(self, difference: Decimal, base_amount: Decimal) -> bool:
         abs_tolerance = self.absolute_tolerance
         rel_tolerance = (abs(base_amount) * self.relative_tolerance) if base_amount != 0 else Decimal("0")
@@ -2,25 +2,66 @@
 
 from __future__ import annotations
 
-from collections import defaultdict
-from dataclasses import dataclass
+import hashlib
+import time
+from dataclasses import dataclass, field, replace
 from datetime import date, datetime
 from decimal import Decimal
 from pathlib import Path
-from typing import DefaultDict, Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
 from xml.etree import ElementTree as ET
 
-from app.utils.currency import normalize_to_abs
+from app.services.fact_index import FactIndex
+from app.services.fact_table import (
+    POOL_ENTRY_BYTES,
+    AuditRecord,
+    AuditTrailView,
+    Dimensions,
+    FactTable,
+    dimension_key,
+    dimension_set,
+)
+from app.services.parse_budget import (
+    DOM_BYTES_PER_PAYLOAD_BYTE,
+    UNLIMITED,
+    BudgetMeter,
+    DepthLimitedTreeBuilder,
+    ParseBudget,
+    ParseBudgetExceeded,
+)
+from app.services.parse_cache import ParseCache
+from app.services.parse_options import FULL_PARSE, ParseOptions
+from app.services.parser_engines import INLINE, INSTANCE, EngineRegistry, ParserEngine, lxml_etree, size_policy
+from app.services.period_axis import PeriodAxis
+from app.services.unmapped_facts import UnmappedFact, UnmappedFacts
+from app.utils.constants import UNMAPPED_MEMORY_BUDGET
+from app.utils.currency import decimal_to_paise, normalize_to_abs, to_paise_batch
 from app.utils.date import financial_year_for
-from app.utils.ind_as_mapper import resolve_concept
+from app.utils.ind_as_mapper import MAPPING_VERSION, ConceptMapping, get_registry, resolve_concept
+from app.utils.ixbrl import HTML_ENTITIES, IX_NAMESPACES, XSI_NIL, nonfraction_value
+from app.utils.xbrl_source import XBRLSource, as_buffer, is_path, iter_chunks, read_payload, rewindable, source_name
 
 try:  # pragma: no cover - optional dependency
     from pyxbrl import XBRLParser as PyXBRLParser  # type: ignore
 except ImportError:  # pragma: no cover - graceful fallback when library missing
     PyXBRLParser = None  # type: ignore
 
+if TYPE_CHECKING:  # pragma: no cover
+    from app.services.derived_metrics import MetricTable
+
 StatementMatrix = Dict[str, Dict[str, Dict[str, Decimal]]]
 
+INLINE_SNIFF_BYTES = 4096
+_INLINE_NAMESPACE_MARKERS = tuple(namespace.encode("ascii") for namespace in IX_NAMESPACES)
+
+# Bumped whenever the shape of XBRLParseResult changes so cached results are not reused.
+RESULT_FORMAT_VERSION = 10
+
+# Estimates charged against ParseBudget.max_memory: one ContextInfo with its strings and dict
+# slot (about 500 bytes measured), and one fact element or row held back for later folding.
+CONTEXT_BYTES = 512
+PENDING_FACT_BYTES = 384
+
 
 @dataclass(slots=True)
 class ContextInfo:
@@ -31,71 +72,207 @@ class ContextInfo:
     start_date: Optional[date]
     end_date: Optional[date]
     instant: Optional[date]
+    # Explicit and typed members from <segment>/<scenario>; () for entity-level contexts.
+    dimensions: Dimensions = ()
+    # Derived once at construction; every fact in the context shares these strings.
+    label: str = field(init=False)
+    financial_year: Optional[str] = field(init=False)
+    dimension_key: str = field(init=False)
 
-    @property
-    def label(self) -> str:
+    def __post_init__(self) -> None:
+        self.financial_year = self._compute_financial_year()
+        self.label = self._compute_label()
+        self.dimension_key = dimension_key(self.dimensions)
+
+    def _compute_label(self) -> str:
         if self.start_date and self.end_date:
-            try:
-                fy = financial_year_for(self.end_date)
-                return f"{fy} ({self.start_date.isoformat()} to {self.end_date.isoformat()})"
-            except ValueError:
-                pass
+            if self.financial_year is not None:
+                return f"{self.financial_year} ({self.start_date.isoformat()} to {self.end_date.isoformat()})"
             return f"{self.start_date.isoformat()} to {self.end_date.isoformat()}"
         if self.instant:
             return f"As of {self.instant.isoformat()}"
         return self.id
 
-    @property
-    def financial_year(self) -> Optional[str]:
-        if self.end_date:
-            try:
-                return financial_year_for(self.end_date)
-            except ValueError:
-                return None
-        if self.instant:
-            try:
-                return financial_year_for(self.instant)
-            except ValueError:
-                return None
-        return None
+    def _compute_financial_year(self) -> Optional[str]:
+        target = self.end_date or self.instant
+        if target is None:
+            return None
+        try:
+            return financial_year_for(target)
+        except ValueError:
+            return None
 
 
-@dataclass(slots=True)
-class AuditRecord:
-    statement: str
-    field: str
-    concept: str
-    context_ref: str
-    period: str
-    unit: Optional[str]
-    value: Decimal
+class _Deferred:
+    """Placeholder for a metadata entry that is computed on first access."""
 
+    __slots__ = ()
 
-@dataclass(slots=True)
-class UnmappedFact:
-    concept: str
-    raw_tag: Optional[str]
-    context_ref: Optional[str]
-    unit: Optional[str]
-    raw_value: str
+    def __reduce__(self) -> str:
+        return "_DEFERRED"
+
+
+_DEFERRED = _Deferred()
+
+
+class ResultMetadata(Mapping[str, object]):
+    """Parse metadata whose derived entries (``periods``) are built on first access.
+
+    Key order is fixed at construction, so the audit sheet lists entries the same way whether or
+    not a derived entry has been computed yet.
+    """
+
+    __slots__ = ("_values", "_contexts")
+
+    def __init__(self, values: Dict[str, object], contexts: Mapping[str, ContextInfo]) -> None:
+        self._values = values
+        self._contexts = contexts
+
+    def __getitem__(self, key: str) -> object:
+        value = self._values[key]
+        if value is _DEFERRED:
+            value = self._values[key] = _period_metadata(self._contexts)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        return f"ResultMetadata({dict(self)!r})"
+
+    def with_values(self, **values: object) -> "ResultMetadata":
+        """Copy with ``values`` replaced; deferred entries stay deferred."""
+
+        return ResultMetadata({**self._values, **values}, self._contexts)
+
+
+def _period_metadata(contexts: Mapping[str, ContextInfo]) -> Dict[str, Dict[str, Optional[str]]]:
+    return {
+        ctx_id: {
+            "label": ctx.label,
+            "start_date": ctx.start_date.isoformat() if ctx.start_date else None,
+            "end_date": ctx.end_date.isoformat() if ctx.end_date else None,
+            "instant": ctx.instant.isoformat() if ctx.instant else None,
+            "financial_year": ctx.financial_year,
+        }
+        for ctx_id, ctx in contexts.items()
+    }
+
+
+def _result_metadata(
+    options: ParseOptions,
+    *,
+    source: str,
+    contexts: Dict[str, ContextInfo],
+    entities: Iterable[str],
+    units: Iterable[str],
+    unmapped: UnmappedFacts,
+    facts: FactTable,
+) -> ResultMetadata:
+    values: Dict[str, object] = {"source": source, "entities": sorted(entities)}
+    if options.collect_period_metadata:
+        values["periods"] = _DEFERRED
+    values["units"] = sorted(units)
+    dimensional = facts.dimensional_periods()
+    if dimensional:
+        # Statements for these periods come from a dimension set, or are missing (None).
+        values["dimensional_periods"] = dimensional
+    if options.collect_unmapped:
+        values["unmapped_count"] = len(unmapped)
+        values["unmapped_bytes"] = unmapped.total_bytes
+    return ResultMetadata(values, contexts)
 
 
 @dataclass(slots=True)
 class XBRLParseResult:
-    statements: StatementMatrix
-    audit_trail: List[AuditRecord]
+    facts: FactTable
     contexts: Dict[str, ContextInfo]
-    metadata: Dict[str, object]
-    unmapped_facts: List[UnmappedFact]
+    metadata: ResultMetadata
+    unmapped_facts: UnmappedFacts
+    _statements: Optional[StatementMatrix] = field(default=None, init=False, repr=False, compare=False)
+    _index: Optional[FactIndex] = field(default=None, init=False, repr=False, compare=False)
+    _period_axis: Optional[PeriodAxis] = field(default=None, init=False, repr=False, compare=False)
+    _metrics: Optional["MetricTable"] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def statements(self) -> StatementMatrix:
+        """Nested ``{statement: {field: {period: Decimal}}}`` view, built on first access."""
+
+        if self._statements is None:
+            self._statements = self.facts.statement_matrix()
+        return self._statements
+
+    @property
+    def index(self) -> FactIndex:
+        """(field, period, dimension set) index, including segment facts; built on first access."""
+
+        if self._index is None:
+            self._index = FactIndex(self.facts, self.contexts)
+        return self._index
+
+    @property
+    def period_axis(self) -> PeriodAxis:
+        """The filing's periods in date order, from its contexts; built on first access."""
+
+        if self._period_axis is None:
+            self._period_axis = PeriodAxis.from_contexts(self.contexts.values())
+        return self._period_axis
+
+    @property
+    def metrics(self) -> "MetricTable":
+        """Ratios and growth rates per reporting year (see :mod:`app.services.derived_metrics`);
+        computed on first access and kept with the result."""
+
+        if self._metrics is None:
+            from app.services.derived_metrics import get_metric_engine
+
+            self._metrics = get_metric_engine().evaluate_results([(self.metadata.get("source", ""), self)])
+        return self._metrics
+
+    @property
+    def audit_trail(self) -> AuditTrailView:
+        """Per-fact records; raises ``ValueError`` if the parse ran with ``collect_audit=False``."""
+
+        if not self.facts.audit:
+            raise ValueError("Audit trail was not collected; parse with ParseOptions(collect_audit=True)")
+        return AuditTrailView(self.facts)
 
     def statement(self, name: str) -> Dict[str, Dict[str, Decimal]]:
         return self.statements.get(name, {})
 
+    def to_bytes(self) -> bytes:
+        """Encode with :mod:`app.services.result_codec`; a fraction of the size and time of pickle."""
+
+        from app.services.result_codec import encode_result
+
+        return encode_result(self)
+
+    @classmethod
+    def from_buffer(cls, buffer: bytes | memoryview) -> "XBRLParseResult":
+        """Decode :meth:`to_bytes` output; fact columns stay views into ``buffer`` (or an mmap)."""
+
+        from app.services.result_codec import decode_result
+
+        return decode_result(buffer)
+
+    def __reduce__(self):
+        # Process pools and the parse cache pickle results; route them through the binary codec.
+        return (_result_from_bytes, (self.to_bytes(),))
+
+
+def _result_from_bytes(payload: bytes) -> XBRLParseResult:
+    return XBRLParseResult.from_buffer(payload)
+
 
 class XBRLParserService:
     """Parse MCA AOC-4 XBRL instance documents into normalized financial statements."""
 
-    SUPPORTED_EXTENSIONS = {".xml", ".xbrl"}
+    SUPPORTED_EXTENSIONS = {".xml", ".xbrl", ".html", ".htm", ".xhtml"}
+    # Inline XBRL (XHTML) filings; other extensions are still sniffed for the iXBRL namespace.
+    INLINE_EXTENSIONS = {".html", ".htm", ".xhtml"}
 
     # Best-effort mapping from raw unit names to multiplier identifiers used in currency helpers.
     UNIT_ALIASES: Dict[str, str] = {
@@ -111,147 +288,191 @@ class XBRLParserService:
         "lakhs": "LAKHS",
     }
 
-    def parse(self, file_path: str | Path) -> XBRLParseResult:
-        path = Path(file_path)
-        if path.suffix.lower() not in self.SUPPORTED_EXTENSIONS:
+    STREAM_CHUNK_SIZE = 64 * 1024
+
+    def __init__(
+        self,
+        *,
+        streaming: Optional[bool] = None,
+        engine: Optional[str] = None,
+        cache: Optional[ParseCache] = None,
+        unmapped_memory_budget: int = UNMAPPED_MEMORY_BUDGET,
+        budget: ParseBudget = UNLIMITED,
+        options: ParseOptions = FULL_PARSE,
+    ) -> None:
+        """``engine`` pins a registered engine (see :data:`PARSER_ENGINES`); ``streaming=True`` /
+        ``False`` pins the streaming or ElementTree engine. By default the engine is chosen per
+        payload by the registry's size/type policy. ``unmapped_memory_budget`` caps the memory
+        held for unmapped text blocks per parse (see :class:`UnmappedFacts`). ``budget`` limits
+        time, facts, contexts, nesting and memory per parse; exceeding it raises
+        :class:`~app.services.parse_budget.ParseBudgetExceeded`. ``options`` projects the result
+        onto what the caller needs; facts and artefacts outside it are never built."""
+
+        if engine is not None:
+            PARSER_ENGINES.engine(engine)  # fail fast on typos
+        self.streaming = streaming
+        self.engine = engine
+        self.cache = cache
+        self.unmapped_memory_budget = unmapped_memory_budget
+        self.budget = budget
+        self.options = options
+
+    @property
+    def preferred_engines(self) -> Optional[Sequence[str]]:
+        if self.engine in {"pyxbrl", "parallel"}:
+            # Both can give up on a document (py-xbrl is best effort, parallel parsing needs a
+            # partitionable layout); keep the in-house streaming engine behind them.
+            return (self.engine, "streaming")
+        if self.engine is not None:
+            return (self.engine,)
+        if self.streaming is None:
+            return None
+        return ("streaming",) if self.streaming else ("etree",)
+
+    @property
+    def cache_namespace(self) -> str:
+        return f"xbrl-parser:{MAPPING_VERSION}:{RESULT_FORMAT_VERSION}:{self.options.cache_key}"
+
+    def parse(self, source: XBRLSource, *, name: Optional[str] = None) -> XBRLParseResult:
+        """Parse a path, an in-memory buffer or a binary stream.
+
+        ``name`` labels in-memory sources in ``metadata["source"]``; when it (or a path) carries a
+        file extension, the extension must be one of :attr:`SUPPORTED_EXTENSIONS`.
+        """
+
+        label = source_name(source, name)
+        if (is_path(source) or name is not None) and Path(label).suffix.lower() not in self.SUPPORTED_EXTENSIONS:
             raise ValueError("Unsupported file extension for XBRL parsing")
-        if PyXBRLParser is not None:  # pragma: no cover - exercised when dependency installed
-            try:
-                parser = PyXBRLParser()
-                xbrl = parser.parse(path.read_bytes())
-                return self._parse_with_pyxbrl(xbrl, source=str(path))
-            except Exception:
-                # Fall back to XML parsing on failure to keep robustness.
-                pass
-        return self._parse_with_xml(path.read_bytes(), source=str(path))
+        if self.cache is None:
+            return self._parse_source(source, label)
+        source, digest = self._digest(source)
+        result = self.cache.get_or_compute(digest, self.cache_namespace, lambda: self._parse_source(source, label))
+        return self._with_source(result, label)
+
+    def incremental(self, *, name: Optional[str] = None) -> "IncrementalParse":
+        """Start a feed-style parse: push chunks as they arrive, then :meth:`IncrementalParse.close`.
+
+        Always uses the streaming engine, so facts are accumulated while the upload is still in
+        flight and only finalisation is left once the last chunk has been fed.
+        """
+
+        label = name or "<upload>"
+        if name is not None and Path(name).suffix.lower() not in self.SUPPORTED_EXTENSIONS:
+            raise ValueError("Unsupported file extension for XBRL parsing")
+        return IncrementalParse(self, label)
+
+    def _digest(self, source: XBRLSource) -> tuple[XBRLSource, str]:
+        assert self.cache is not None
+        buffer = as_buffer(source)
+        if buffer is not None:
+            return buffer, self.cache.digest_bytes(buffer)
+        if is_path(source):
+            return source, self.cache.digest_file(source)  # type: ignore[arg-type]
+        stream = rewindable(source)  # type: ignore[arg-type]
+        return stream, self.cache.digest_stream(stream)
+
+    def _parse_source(self, source: XBRLSource, label: str) -> XBRLParseResult:
+        return PARSER_ENGINES.parse(self, source, label, prefer=self.preferred_engines)
+
+    @staticmethod
+    def _with_source(result: XBRLParseResult, source: str) -> XBRLParseResult:
+        """Return ``result`` labelled with ``source``; cached results carry the first upload's path."""
+
+        if result.metadata.get("source") == source:
+            return result
+        return replace(result, metadata=result.metadata.with_values(source=source))
 
     # ------------------------------------------------------------------
     # XML parsing fallback
     # ------------------------------------------------------------------
 
-    def _parse_with_xml(self, payload: bytes, *, source: str) -> XBRLParseResult:
-        root = ET.fromstring(payload)
-        contexts = self._extract_contexts_xml(root)
-        units = self._extract_units_xml(root)
-        statements: Dict[str, DefaultDict[str, Dict[str, Decimal]]] = {
-            "income_statement": defaultdict(dict),
-            "balance_sheet": defaultdict(dict),
-            "cash_flow": defaultdict(dict),
-        }
-        audit_trail: List[AuditRecord] = []
-        unmapped: List[UnmappedFact] = []
-        entities: set[str] = set()
-        used_units: set[str] = set()
+    def _parse_with_xml(self, payload: bytes | memoryview, *, source: str) -> XBRLParseResult:
+        if self._is_inline(source, payload):
+            # iXBRL is always streamed; a DOM of the narrative XHTML buys nothing.
+            return self._parse_inline((payload,), source=source)
+        meter = BudgetMeter(self.budget)
+        meter.reserve(len(payload) * DOM_BYTES_PER_PAYLOAD_BYTE)
+        if self.budget.max_depth is None:
+            root = ET.fromstring(payload)
+        else:
+            # Count depth while the tree is built so runaway nesting never gets materialised.
+            parser = ET.XMLParser(target=DepthLimitedTreeBuilder(meter))
+            parser.feed(payload)
+            root = parser.close()
+        return self._facts_from_root(root, source=source, meter=meter)
+
+    def _parse_with_lxml(self, payload: bytes | memoryview, *, source: str) -> XBRLParseResult:  # pragma: no cover - optional dependency
+        meter = BudgetMeter(self.budget)
+        meter.reserve(len(payload) * DOM_BYTES_PER_PAYLOAD_BYTE)
+        # Without huge_tree libxml2 refuses nesting beyond 256 levels and oversized text nodes on
+        # its own, so the depth budget can be checked on the finished tree with one XPath probe.
+        parser = lxml_etree.XMLParser(resolve_entities=False, no_network=True)
+        root = lxml_etree.fromstring(payload if isinstance(payload, bytes) else bytes(payload), parser)
+        limit = self.budget.max_depth
+        if limit is not None and root.xpath("boolean(" + "/*" * (limit + 1) + ")"):
+            meter.enter(limit + 1)
+        return self._facts_from_root(root, source=source, meter=meter)
 
+    def _facts_from_root(self, root: ET.Element, *, source: str, meter: BudgetMeter) -> XBRLParseResult:
+        facts = _FactAccumulator(self, {}, self._extract_units_xml(root), meter)
+        for context in root.iterfind(".//{*}context"):
+            info = self._context_from_element(context)
+            if info is not None:
+                facts.add_context(info)
         for element in root.findall('.//*[@contextRef]'):
-            concept_name = self._concept_name(element)
-            concept = resolve_concept(concept_name) or resolve_concept(element.tag)
-            context_ref = element.attrib.get("contextRef")
-            if not context_ref or context_ref not in contexts:
-                if concept is None:
-                    unmapped.append(
-                        UnmappedFact(
-                            concept=concept_name,
-                            raw_tag=element.tag,
-                            context_ref=context_ref,
-                            unit=element.attrib.get("unitRef"),
-                            raw_value=(element.text or "").strip(),
-                        )
-                    )
-                continue
-            raw_value = (element.text or "").strip()
-            if not raw_value or element.attrib.get("{http://www.xbrl.org/2003/instance}nil") == "true":
-                if concept is None:
-                    unmapped.append(
-                        UnmappedFact(
-                            concept=concept_name,
-                            raw_tag=element.tag,
-                            context_ref=context_ref,
-                            unit=element.attrib.get("unitRef"),
-                            raw_value=raw_value,
-                        )
-                    )
-                continue
-            if concept is None:
-                unmapped.append(
-                    UnmappedFact(
-                        concept=concept_name,
-                        raw_tag=element.tag,
-                        context_ref=context_ref,
-                        unit=element.attrib.get("unitRef"),
-                        raw_value=raw_value,
-                    )
-                )
-                continue
-            unit_ref = element.attrib.get("unitRef")
-            unit = units.get(unit_ref) if unit_ref else None
-            normalized_unit = self._normalize_unit(unit)
-            try:
-                value = normalize_to_abs(raw_value, normalized_unit)
-            except (ValueError, TypeError):
-                continue
-            if value is None:
-                continue
+            facts.add(element.tag, element.attrib, element.text)
+        return facts.result(source=source)
 
-            context = contexts[context_ref]
-            period_label = context.label
-            statement_bucket = statements[concept.statement]
-            exists = statement_bucket[concept.field].get(period_label)
-            if exists is not None:
-                # Keep the most recently encountered value when duplicates exist.
-                statement_bucket[concept.field][period_label] = value
-            else:
-                statement_bucket[concept.field][period_label] = value
-
-            audit_trail.append(
-                AuditRecord(
-                    statement=concept.statement,
-                    field=concept.field,
-                    concept=concept_name,
-                    context_ref=context_ref,
-                    period=period_label,
-                    unit=unit,
-                    value=value,
-                )
-            )
-            if context.entity:
-                entities.add(context.entity)
-            if unit:
-                used_units.add(unit)
+    # ------------------------------------------------------------------
+    # Streaming XML parsing
+    # ------------------------------------------------------------------
 
-        metadata = {
-            "source": source,
-            "entities": sorted(entities),
-            "periods": {
-                ctx_id: {
-                    "label": ctx.label,
-                    "start_date": ctx.start_date.isoformat() if ctx.start_date else None,
-                    "end_date": ctx.end_date.isoformat() if ctx.end_date else None,
-                    "instant": ctx.instant.isoformat() if ctx.instant else None,
-                    "financial_year": ctx.financial_year,
-                }
-                for ctx_id, ctx in contexts.items()
-            },
-            "units": sorted(used_units),
-            "unmapped_count": len(unmapped),
-        }
+    def _parse_inline(self, chunks: Iterable[bytes | memoryview], *, source: str) -> XBRLParseResult:
+        engine = _InlineXBRLEngine(self)
+        for chunk in chunks:
+            engine.feed(chunk)
+        return engine.close(source=source)
 
-        normalized_statements: StatementMatrix = {
-            name: {field: dict(periods) for field, periods in bucket.items()}
-            for name, bucket in statements.items()
-        }
-        return XBRLParseResult(
-            statements=normalized_statements,
-            audit_trail=audit_trail,
-            contexts=contexts,
-            metadata=metadata,
-            unmapped_facts=unmapped,
-        )
+    def _parse_streaming(self, chunks: Iterable[bytes | memoryview], *, source: str) -> XBRLParseResult:
+        """Parse ``chunks`` incrementally, discarding elements once they are consumed.
+
+        Produces the same result as :meth:`_parse_with_xml` while only holding the current
+        chunk and the element being processed, so peak memory stays flat as filings grow.
+        """
+
+        engine: Optional[_StreamingXMLEngine | _InlineXBRLEngine] = None
+        for chunk in chunks:
+            if engine is None:
+                engine = self._engine_for(source, chunk)
+            engine.feed(chunk)
+        if engine is None:
+            engine = _StreamingXMLEngine(self)
+        return engine.close(source=source)
+
+    def _engine_for(self, source: str, head: bytes | memoryview) -> "_StreamingXMLEngine | _InlineXBRLEngine":
+        if self._is_inline(source, head):
+            return _InlineXBRLEngine(self)
+        return _StreamingXMLEngine(self)
+
+    def _is_inline(self, source: str, head: bytes | memoryview) -> bool:
+        if Path(source).suffix.lower() in self.INLINE_EXTENSIONS:
+            return True
+        prologue = bytes(head[:INLINE_SNIFF_BYTES])
+        return any(namespace in prologue for namespace in _INLINE_NAMESPACE_MARKERS)
+
+    def _parse_parallel(self, payload: bytes | memoryview, *, source: str) -> XBRLParseResult:
+        from app.services.parallel_parser import parse_parallel
+
+        return parse_parallel(self, payload, source=source)
 
     # ------------------------------------------------------------------
     # Optional py-xbrl parsing path (best effort, falls back to XML otherwise)
     # ------------------------------------------------------------------
 
+    def _parse_pyxbrl_payload(self, payload: bytes | memoryview, *, source: str) -> XBRLParseResult:  # pragma: no cover
+        xbrl = PyXBRLParser().parse(bytes(payload))
+        return self._parse_with_pyxbrl(xbrl, source=source)
+
     def _parse_with_pyxbrl(self, xbrl: object, *, source: str) -> XBRLParseResult:  # pragma: no cover
         contexts = {}
         for context in getattr(xbrl, "contexts", []):
@@ -262,21 +483,24 @@ class XBRLParserService:
             end = self._coerce_date(getattr(getattr(context, "period", None), "end_date", None))
             instant = self._coerce_date(getattr(getattr(context, "period", None), "instant", None))
             entity = getattr(getattr(context, "entity", None), "identifier", None)
+            members = []
+            for segment in getattr(context, "segments", None) or ():
+                axis = getattr(getattr(segment, "dimension", None), "name", None)
+                member = getattr(getattr(segment, "member", None), "name", None)
+                if axis and member:
+                    members.append((axis, member))
             contexts[context_id] = ContextInfo(
                 id=context_id,
                 entity=entity,
                 start_date=start,
                 end_date=end,
                 instant=instant,
+                dimensions=dimension_set(members),
             )
 
-        statements: Dict[str, DefaultDict[str, Dict[str, Decimal]]] = {
-            "income_statement": defaultdict(dict),
-            "balance_sheet": defaultdict(dict),
-            "cash_flow": defaultdict(dict),
-        }
-        audit_trail: List[AuditRecord] = []
-        unmapped: List[UnmappedFact] = []
+        options = self.options
+        facts = FactTable(audit=options.collect_audit)
+        unmapped = UnmappedFacts(memory_budget=self.unmapped_memory_budget)
         entities: set[str] = set()
         used_units: set[str] = set()
 
@@ -290,18 +514,19 @@ class XBRLParserService:
             concept_name = getattr(fact, "name", "")
             mapping = resolve_concept(concept_name)
             if mapping is None:
+                if not options.collect_unmapped:
+                    continue
                 value = getattr(fact, "value", None)
-                raw_value = str(value) if value is not None else ""
-                unmapped.append(
-                    UnmappedFact(
-                        concept=concept_name,
-                        raw_tag=concept_name,
-                        context_ref=getattr(fact, "context_id", None),
-                        unit=getattr(fact, "unit_id", None),
-                        raw_value=raw_value,
-                    )
+                unmapped.add(
+                    concept_name,
+                    concept_name,
+                    getattr(fact, "context_id", None),
+                    getattr(fact, "unit_id", None),
+                    str(value) if value is not None else None,
                 )
                 continue
+            if not options.wants(mapping.statement, mapping.field):
+                continue
             context_ref = getattr(fact, "context_id", None)
             if not context_ref or context_ref not in contexts:
                 continue
@@ -311,53 +536,39 @@ class XBRLParserService:
             value = getattr(fact, "value", None)
             try:
                 decimal_value = normalize_to_abs(value, normalized_unit)
+                if decimal_value is None:
+                    continue
+                paise = decimal_to_paise(decimal_value)
             except (ValueError, TypeError):
                 continue
-            if decimal_value is None:
-                continue
 
             context = contexts[context_ref]
-            period_label = context.label
-            statements[mapping.statement][mapping.field][period_label] = decimal_value
-            audit_trail.append(
-                AuditRecord(
-                    statement=mapping.statement,
-                    field=mapping.field,
-                    concept=concept_name,
-                    context_ref=context_ref,
-                    period=period_label,
-                    unit=unit,
-                    value=decimal_value,
-                )
+            facts.append(
+                mapping.statement,
+                mapping.field,
+                concept_name,
+                context_ref,
+                context.label,
+                unit,
+                paise,
+                dimensions=context.dimension_key,
             )
             if context.entity:
                 entities.add(context.entity)
             if unit:
                 used_units.add(unit)
 
-        metadata = {
-            "source": source,
-            "entities": sorted(entities),
-            "periods": {
-                ctx_id: {
-                    "label": ctx.label,
-                    "start_date": ctx.start_date.isoformat() if ctx.start_date else None,
-                    "end_date": ctx.end_date.isoformat() if ctx.end_date else None,
-                    "instant": ctx.instant.isoformat() if ctx.instant else None,
-                    "financial_year": ctx.financial_year,
-                }
-                for ctx_id, ctx in contexts.items()
-            },
-            "units": sorted(used_units),
-            "unmapped_count": len(unmapped),
-        }
-        normalized_statements: StatementMatrix = {
-            name: {field: dict(periods) for field, periods in bucket.items()}
-            for name, bucket in statements.items()
-        }
+        metadata = _result_metadata(
+            options,
+            source=source,
+            contexts=contexts,
+            entities=entities,
+            units=used_units,
+            unmapped=unmapped,
+            facts=facts,
+        )
         return XBRLParseResult(
-            statements=normalized_statements,
-            audit_trail=audit_trail,
+            facts=facts,
             contexts=contexts,
             metadata=metadata,
             unmapped_facts=unmapped,
@@ -384,25 +595,45 @@ class XBRLParserService:
                 return None
         return None
 
-    def _extract_contexts_xml(self, root: ET.Element) -> Dict[str, ContextInfo]:
-        contexts: Dict[str, ContextInfo] = {}
-        for context in root.findall(".//{*}context"):
-            context_id = context.attrib.get("id")
-            if not context_id:
-                continue
-            entity_ident = context.findtext("{*}entity/{*}identifier")
-            period = context.find("{*}period")
-            start_date = self._coerce_date(period.findtext("{*}startDate") if period is not None else None)
-            end_date = self._coerce_date(period.findtext("{*}endDate") if period is not None else None)
-            instant = self._coerce_date(period.findtext("{*}instant") if period is not None else None)
-            contexts[context_id] = ContextInfo(
-                id=context_id,
-                entity=entity_ident,
-                start_date=start_date,
-                end_date=end_date,
-                instant=instant,
-            )
-        return contexts
+    def _context_from_element(self, context: ET.Element) -> Optional[ContextInfo]:
+        context_id = context.attrib.get("id")
+        if not context_id:
+            return None
+        entity_ident = context.findtext("{*}entity/{*}identifier")
+        period = context.find("{*}period")
+        start_date = self._coerce_date(period.findtext("{*}startDate") if period is not None else None)
+        end_date = self._coerce_date(period.findtext("{*}endDate") if period is not None else None)
+        instant = self._coerce_date(period.findtext("{*}instant") if period is not None else None)
+        return ContextInfo(
+            id=context_id,
+            entity=entity_ident,
+            start_date=start_date,
+            end_date=end_date,
+            instant=instant,
+            dimensions=self._context_dimensions(context),
+        )
+
+    @staticmethod
+    def _context_dimensions(context: ET.Element) -> Dimensions:
+        """Collect ``xbrldi:explicitMember`` / ``typedMember`` values from segment and scenario.
+
+        Axes and explicit members are reduced to their local names, so filings using different
+        prefixes for the same taxonomy index alike; typed members keep their text value.
+        """
+
+        members: List[tuple[str, str]] = []
+        for container in context.iterfind("{*}entity/{*}segment"), context.iterfind("{*}scenario"):
+            for holder in container:
+                for member in holder:
+                    axis = member.attrib.get("dimension") if isinstance(member.tag, str) else None
+                    if not axis:
+                        continue
+                    if _local_name(member.tag) == "explicitMember":
+                        value = (member.text or "").strip().rpartition(":")[2]
+                    else:
+                        value = "".join(member.itertext()).strip()
+                    members.append((axis.strip().rpartition(":")[2], value))
+        return dimension_set(members)
 
     def _extract_units_xml(self, root: ET.Element) -> Dict[str, Optional[str]]:
         units: Dict[str, Optional[str]] = {}
@@ -410,17 +641,20 @@ class XBRLParserService:
             unit_id = unit.attrib.get("id")
             if not unit_id:
                 continue
-            measure = unit.findtext("{*}measure")
-            if not measure:
-                # Handle <divide> / <unitNumerator> style units by taking the first measure.
-                divide = unit.find("{*}divide/{*}unitNumerator/{*}measure")
-                measure = divide.text if divide is not None else None
-            units[unit_id] = measure
+            units[unit_id] = self._unit_measure(unit)
         return units
 
     @staticmethod
-    def _concept_name(element: ET.Element) -> str:
-        tag = element.tag
+    def _unit_measure(unit: ET.Element) -> Optional[str]:
+        measure = unit.findtext("{*}measure")
+        if not measure:
+            # Handle <divide> / <unitNumerator> style units by taking the first measure.
+            divide = unit.find("{*}divide/{*}unitNumerator/{*}measure")
+            measure = divide.text if divide is not None else None
+        return measure
+
+    @staticmethod
+    def _concept_name(tag: str) -> str:
         if tag.startswith("{") and "}" in tag:
             _, local = tag[1:].split("}", 1)
             return local
@@ -433,9 +667,574 @@ class XBRLParserService:
         return self.UNIT_ALIASES.get(unit.lower(), self.UNIT_ALIASES.get(normalized, None))
 
 
+class _SymbolTable:
+    """Per-parse string interning.
+
+    Concept names, context refs and unit refs repeat across thousands of facts; routing them
+    through one table means a filing holds each distinct string once. Tag resolution is cached
+    here as well, so mapping lookups and namespace stripping happen once per distinct tag.
+    """
+
+    __slots__ = ("_strings", "_concepts", "_registry", "_options")
+
+    def __init__(self, options: ParseOptions = FULL_PARSE) -> None:
+        self._registry = get_registry()
+        self._options = options
+        self._strings: Dict[str, str] = {}
+        self._concepts: Dict[str, tuple[str, Optional[ConceptMapping], bool]] = {}
+
+    def intern(self, value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return None
+        return self._strings.setdefault(value, value)
+
+    def concept(self, tag: str) -> tuple[str, Optional[ConceptMapping], bool]:
+        """Return ``(concept name, mapping, wanted)``; ``wanted`` applies the parse projection."""
+
+        cached = self._concepts.get(tag)
+        if cached is None:
+            concept_name = self.intern(XBRLParserService._concept_name(tag))
+            mapping = self._registry.resolve(tag)
+            options = self._options
+            if mapping is None:
+                wanted = options.collect_unmapped
+            else:
+                wanted = options.wants(mapping.statement, mapping.field)
+            cached = (concept_name, mapping, wanted)
+            self._concepts[tag] = cached
+        return cached
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+
+class _FactAccumulator:
+    """Fold individual facts into statements, audit records and unmapped entries.
+
+    Shared by the DOM and streaming engines so both apply identical mapping, unit and
+    duplicate-resolution rules. ``contexts`` and ``units`` are read at ``add`` time, which lets
+    the streaming engine keep filling them while facts are being emitted.
+    """
+
+    CONVERSION_BATCH_SIZE = 4096
+
+    def __init__(
+        self,
+        service: XBRLParserService,
+        contexts: Dict[str, ContextInfo],
+        units: Dict[str, Optional[str]],
+        meter: Optional[BudgetMeter] = None,
+    ) -> None:
+        self._service = service
+        self.meter = meter or BudgetMeter(service.budget)
+        self.contexts = contexts
+        self.units = units
+        self.facts = FactTable(audit=service.options.collect_audit)
+        self.unmapped = UnmappedFacts(memory_budget=service.unmapped_memory_budget)
+        self.entities: set[str] = set()
+        self.used_units: set[str] = set()
+        self.symbols = _SymbolTable(service.options)
+        self._unit_multipliers: Dict[Optional[str], Optional[str]] = {}
+        # Mapped facts awaiting batch numeric conversion, as parallel columns.
+        self._mapped: List[tuple[ConceptMapping, str, str, ContextInfo, Optional[str], Optional[str], int]] = []
+        self._raw_values: List[str] = []
+        self._value_units: List[Optional[str]] = []
+        self.meter.track(self._held_bytes)
+
+    def _held_bytes(self) -> int:
+        return (
+            self.facts.nbytes
+            + self.unmapped.nbytes
+            + len(self.contexts) * CONTEXT_BYTES
+            + len(self.symbols) * POOL_ENTRY_BYTES
+            + len(self._mapped) * PENDING_FACT_BYTES
+        )
+
+    def add_context(self, info: ContextInfo) -> None:
+        self.meter.add_context()
+        self.contexts[info.id] = info
+
+    def wants(self, tag: str) -> bool:
+        return self.symbols.concept(tag)[2]
+
+    def add(self, tag: str, attrib: Mapping[str, str], text: Optional[str]) -> None:
+        """Fold one fact; every engine calls this (or ``meter.add_fact``) once per fact element
+        in document order, so the meter's count doubles as the fact's source position."""
+
+        self.meter.add_fact()
+        symbols = self.symbols
+        concept_name, concept, wanted = symbols.concept(tag)
+        if not wanted:
+            # Outside the projection: dropped before the value is stripped or converted.
+            return
+        context_ref = attrib.get("contextRef")
+        if concept is None:
+            # Classified before any stripping: text blocks are only ever sliced for a preview.
+            self._add_unmapped(concept_name, tag, context_ref, attrib.get("unitRef"), text)
+            return
+        context = self.contexts.get(context_ref) if context_ref else None
+        if context is None:
+            return
+        raw_value = (text or "").strip()
+        if not raw_value or attrib.get("{http://www.xbrl.org/2003/instance}nil") == "true":
+            return
+        unit_ref = attrib.get("unitRef")
+        unit = self.units.get(unit_ref) if unit_ref else None
+        try:
+            normalized_unit = self._unit_multipliers[unit]
+        except KeyError:
+            normalized_unit = self._unit_multipliers[unit] = self._service._normalize_unit(unit)
+        # Amounts are converted in batches; bounding the batch keeps raw strings short-lived.
+        self._mapped.append((concept, concept_name, tag, context, unit_ref, unit, self.meter.facts - 1))
+        self._raw_values.append(raw_value)
+        self._value_units.append(normalized_unit)
+        if len(self._mapped) >= self.CONVERSION_BATCH_SIZE:
+            self._fold_mapped()
+
+    def _fold_mapped(self) -> None:
+        values = to_paise_batch(self._raw_values, self._value_units, strict=False)
+        collect_unmapped = self._service.options.collect_unmapped
+        for (concept, concept_name, tag, context, unit_ref, unit, source_fact), raw_value, paise in zip(
+            self._mapped, self._raw_values, values
+        ):
+            if paise is None:
+                # Not a usable amount (malformed, or beyond 64-bit paise): keep it for review.
+                if collect_unmapped:
+                    self._add_unmapped(concept_name, tag, context.id, unit_ref, raw_value)
+                continue
+            # Duplicates are all kept; statement views let the most recent value win.
+            self.facts.append(
+                concept.statement,
+                concept.field,
+                concept_name,
+                context.id,
+                context.label,
+                unit,
+                paise,
+                source_fact,
+                context.dimension_key,
+            )
+            if context.entity:
+                self.entities.add(context.entity)
+            if unit:
+                self.used_units.add(unit)
+        self._mapped.clear()
+        self._raw_values.clear()
+        self._value_units.clear()
+
+    def _add_unmapped(
+        self,
+        concept_name: str,
+        tag: str,
+        context_ref: Optional[str],
+        unit_ref: Optional[str],
+        text: Optional[str],
+    ) -> None:
+        symbols = self.symbols
+        self.unmapped.add(concept_name, symbols.intern(tag), symbols.intern(context_ref), symbols.intern(unit_ref), text)
+
+    def result(self, *, source: str) -> XBRLParseResult:
+        self._fold_mapped()
+        # Small documents never reach a sample point; the finished tables are charged here.
+        self.meter.check()
+        metadata = _result_metadata(
+            self._service.options,
+            source=source,
+            contexts=self.contexts,
+            entities=self.entities,
+            units=self.used_units,
+            unmapped=self.unmapped,
+            facts=self.facts,
+        )
+        return XBRLParseResult(
+            facts=self.facts,
+            contexts=self.contexts,
+            metadata=metadata,
+            unmapped_facts=self.unmapped,
+        )
+
+
+class IncrementalParse:
+    """Feed-driven parse returned by :meth:`XBRLParserService.incremental`.
+
+    The payload is hashed while it is parsed. :meth:`close` looks the digest up in the service's
+    parse cache before finalising, so a repeat upload skips finalisation entirely; otherwise the
+    finished result is stored without a second pass.
+    """
+
+    def __init__(self, service: XBRLParserService, name: str) -> None:
+        self.name = name
+        self.size = 0
+        self._elapsed = 0.0
+        self._service = service
+        # Picked on the first chunk, once it is known whether this is an inline (XHTML) filing.
+        self._engine: Optional[_StreamingXMLEngine | _InlineXBRLEngine] = None
+        self._digest = hashlib.sha256() if service.cache is not None else None
+
+    def feed(self, chunk: bytes | memoryview) -> None:
+        self.size += len(chunk)
+        if self._digest is not None:
+            self._digest.update(chunk)
+        if self._engine is None:
+            self._engine = self._service._engine_for(self.name, chunk)
+        started = time.perf_counter()
+        # Only time spent parsing counts against the budget, not waiting for the next chunk.
+        self._engine.meter.resume()
+        try:
+            self._engine.feed(chunk)
+        except ParseBudgetExceeded:
+            self._record(self._engine, time.perf_counter() - started, aborted=True)
+            raise
+        finally:
+            self._engine.meter.pause()
+        self._elapsed += time.perf_counter() - started
+
+    def close(self) -> XBRLParseResult:
+        cache = self._service.cache
+        key: Optional[str] = None
+        if cache is not None and self._digest is not None:
+            # The body is complete, so its digest is final: a cached result replaces finalisation.
+            key = cache.key(self._digest.hexdigest(), self._service.cache_namespace)
+            cached = cache.get(key)
+            if cached is not None:
+                self._engine = None
+                return self._service._with_source(cached, self.name)
+        engine = self._engine or _StreamingXMLEngine(self._service)
+        started = time.perf_counter()
+        engine.meter.resume()
+        try:
+            result = engine.close(source=self.name)
+        except ParseBudgetExceeded:
+            self._record(engine, time.perf_counter() - started, aborted=True)
+            raise
+        self._record(engine, time.perf_counter() - started)
+        if cache is not None and key is not None:
+            cache.put(key, result)
+        return result
+
+    def _record(self, engine: "_StreamingXMLEngine | _InlineXBRLEngine", seconds: float, *, aborted: bool = False) -> None:
+        name = "inline" if isinstance(engine, _InlineXBRLEngine) else "streaming"
+        PARSER_ENGINES.record(name, self._elapsed + seconds, self.size, failed=aborted, aborted=aborted)
+
+
+class _StreamingXMLEngine:
+    """Incremental instance parser built on :class:`xml.etree.ElementTree.XMLPullParser`.
+
+    Contexts and units are resolved as soon as their subtree closes and facts are emitted
+    straight into the accumulator, after which the elements are cleared and detached from the
+    root. A fact that references a context or unit not seen yet (legal, if unusual, in XBRL)
+    switches the engine to deferring every later fact until the document ends, which keeps the
+    document-order semantics of the DOM engine intact.
+    """
+
+    def __init__(
+        self,
+        service: XBRLParserService,
+        *,
+        contexts: Optional[Dict[str, ContextInfo]] = None,
+        units: Optional[Dict[str, Optional[str]]] = None,
+    ) -> None:
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        # Seeded when the definitions were resolved up front (parallel byte-range parsing).
+        self._contexts: Dict[str, ContextInfo] = contexts if contexts is not None else {}
+        self._units: Dict[str, Optional[str]] = units if units is not None else {}
+        self._service = service
+        self._facts = _FactAccumulator(service, self._contexts, self._units)
+        self.meter = self._facts.meter
+        self._pending: List[ET.Element] = []
+        self.meter.track(lambda: len(self._pending) * PENDING_FACT_BYTES)
+        self._root: Optional[ET.Element] = None
+        self._depth = 0
+        # Depth at which the currently open <context>/<unit> started; its children must survive
+        # until the definition closes.
+        self._definition_depth = 0
+
+    def feed(self, chunk: bytes | memoryview) -> None:
+        self._parser.feed(chunk)
+        self._drain()
+
+    def close(self, *, source: str) -> XBRLParseResult:
+        self._parser.close()
+        self._drain()
+        for element in self._pending:
+            self._facts.add(element.tag, element.attrib, element.text)
+        self._pending.clear()
+        return self._facts.result(source=source)
+
+    def _drain(self) -> None:
+        for event, element in self._parser.read_events():
+            if event == "start":
+                self._depth += 1
+                self.meter.enter(self._depth)
+                if self._root is None:
+                    self._root = element
+                elif not self._definition_depth and _local_name(element.tag) in {"context", "unit"}:
+                    self._definition_depth = self._depth
+                continue
+
+            depth = self._depth
+            self._depth -= 1
+            if self._definition_depth:
+                if depth != self._definition_depth:
+                    continue
+                self._definition_depth = 0
+                self._consume_definition(element)
+            elif "contextRef" in element.attrib:
+                self._consume_fact(element)
+            if depth == 2 and self._root is not None:
+                # Everything under the root that has closed has been consumed by now.
+                self._root.clear()
+
+    def _consume_definition(self, element: ET.Element) -> None:
+        if _local_name(element.tag) == "context":
+            info = self._service._context_from_element(element)
+            if info is not None:
+                self._facts.add_context(info)
+        else:
+            unit_id = element.attrib.get("id")
+            if unit_id:
+                self._units[unit_id] = self._service._unit_measure(element)
+        element.clear()
+
+    def _consume_fact(self, element: ET.Element) -> None:
+        attrib = element.attrib
+        unit_ref = attrib.get("unitRef")
+        if (
+            self._pending
+            or attrib["contextRef"] not in self._contexts
+            or (unit_ref and unit_ref not in self._units)
+        ):
+            self._pending.append(element)
+            return
+        self._facts.add(element.tag, attrib, element.text)
+        element.clear()
+
+
+class _InlineXBRLEngine:
+    """Streaming Inline XBRL (XHTML) engine driven by expat through an ``XMLParser`` target.
+
+    Only ``ix:resources`` definitions (contexts, units) are built into elements, and only the
+    text of ``ix:nonFraction`` facts is collected; every other XHTML element, including large
+    narrative sections, passes through the callbacks without being materialised. Facts are
+    transformed (``format``, ``scale``, ``sign``) into instance-style values and folded by the
+    shared accumulator, so the result matches the equivalent plain instance document.
+    """
+
+    def __init__(self, service: XBRLParserService) -> None:
+        self._service = service
+        self._contexts: Dict[str, ContextInfo] = {}
+        self._units: Dict[str, Optional[str]] = {}
+        self._facts = _FactAccumulator(service, self._contexts, self._units)
+        self.meter = self._facts.meter
+        self._depth = 0
+        self._pending: List[tuple[str, Dict[str, str], str]] = []
+        self.meter.track(lambda: len(self._pending) * PENDING_FACT_BYTES)
+        # prefix -> stack of namespace URIs in scope, for resolving ``name="prefix:Local"``
+        self._prefixes: Dict[str, List[str]] = {}
+        # Open ix:nonFraction facts (they may nest): (tag, attrib, text parts); parts is None for
+        # facts outside the parse projection, whose text is never collected.
+        self._open_facts: List[tuple[str, Dict[str, str], Optional[List[str]]]] = []
+        self._definition: Optional[ET.TreeBuilder] = None
+        self._definition_depth = 0
+        self._parser = ET.XMLParser(target=_InlineTarget(self))
+        self._parser.entity.update(HTML_ENTITIES)
+
+    def feed(self, chunk: bytes | memoryview) -> None:
+        self._parser.feed(chunk)
+
+    def close(self, *, source: str) -> XBRLParseResult:
+        self._parser.close()
+        for tag, attrib, value in self._pending:
+            self._facts.add(tag, attrib, value)
+        self._pending.clear()
+        return self._facts.result(source=source)
+
+    # -- parser callbacks (via _InlineTarget) ----------------------------------
+
+    def start_ns(self, prefix: str, uri: str) -> None:
+        self._prefixes.setdefault(prefix, []).append(uri)
+
+    def end_ns(self, prefix: str) -> None:
+        self._prefixes[prefix].pop()
+
+    def start(self, tag: str, attrib: Dict[str, str]) -> None:
+        self._depth += 1
+        self.meter.enter(self._depth)
+        if self._definition is not None:
+            self._definition_depth += 1
+            self._definition.start(tag, attrib)
+        elif tag in _NONFRACTION_TAGS:
+            concept_tag = self._concept_tag(attrib.get("name", ""))
+            self._open_facts.append((concept_tag, attrib, [] if self._facts.wants(concept_tag) else None))
+        elif tag in _DEFINITION_TAGS:
+            self._definition = ET.TreeBuilder()
+            self._definition_depth = 1
+            self._definition.start(tag, attrib)
+
+    def data(self, text: str) -> None:
+        if self._definition is not None:
+            self._definition.data(text)
+        elif self._open_facts:
+            for _, _, parts in self._open_facts:
+                if parts is not None:
+                    parts.append(text)
+
+    def end(self, tag: str) -> None:
+        self._depth -= 1
+        if self._definition is not None:
+            self._definition.end(tag)
+            self._definition_depth -= 1
+            if not self._definition_depth:
+                element = self._definition.close()
+                self._definition = None
+                self._consume_definition(element)
+        elif tag in _NONFRACTION_TAGS and self._open_facts:
+            self._consume_fact(*self._open_facts.pop())
+
+    # -- helpers ----------------------------------------------------------------
+
+    def _concept_tag(self, name: str) -> str:
+        prefix, _, local = name.rpartition(":")
+        uris = self._prefixes.get(prefix)
+        if prefix and uris:
+            return f"{{{uris[-1]}}}{local}"
+        return name
+
+    def _consume_definition(self, element: ET.Element) -> None:
+        if _local_name(element.tag) == "context":
+            info = self._service._context_from_element(element)
+            if info is not None:
+                self._facts.add_context(info)
+        else:
+            unit_id = element.attrib.get("id")
+            if unit_id:
+                self._units[unit_id] = self._service._unit_measure(element)
+
+    def _consume_fact(self, tag: str, attrib: Dict[str, str], parts: Optional[List[str]]) -> None:
+        if parts is None:
+            # Outside the projection, but still numbered in close order: while earlier facts wait
+            # for their definitions, this one queues behind them so source positions stay aligned.
+            if self._pending:
+                self._pending.append((tag, {}, ""))
+            else:
+                self.meter.add_fact()
+            return
+        fact_attrib = {"contextRef": attrib.get("contextRef", "")}
+        unit_ref = attrib.get("unitRef")
+        if unit_ref:
+            fact_attrib["unitRef"] = unit_ref
+        if attrib.get(XSI_NIL) == "true":
+            value = ""
+        else:
+            value = nonfraction_value(
+                "".join(parts),
+                fmt=attrib.get("format"),
+                scale=attrib.get("scale"),
+                sign=attrib.get("sign"),
+            ) or ""
+        if (
+            self._pending
+            or fact_attrib["contextRef"] not in self._contexts
+            or (unit_ref and unit_ref not in self._units)
+        ):
+            self._pending.append((tag, fact_attrib, value))
+            return
+        self._facts.add(tag, fact_attrib, value)
+
+
+class _InlineTarget:
+    """``XMLParser`` target forwarding callbacks to an engine; ``close`` is the parser's, not ours."""
+
+    __slots__ = ("start", "end", "data", "start_ns", "end_ns")
+
+    def __init__(self, engine: _InlineXBRLEngine) -> None:
+        self.start = engine.start
+        self.end = engine.end
+        self.data = engine.data
+        self.start_ns = engine.start_ns
+        self.end_ns = engine.end_ns
+
+    def close(self) -> None:
+        return None
+
+
+_NONFRACTION_TAGS = frozenset(f"{{{namespace}}}nonFraction" for namespace in IX_NAMESPACES)
+_DEFINITION_TAGS = frozenset(
+    {
+        "{http://www.xbrl.org/2003/instance}context",
+        "{http://www.xbrl.org/2003/instance}unit",
+    }
+)
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _detect_kind(label: str, head: bytes) -> str:
+    suffix = Path(label).suffix.lower()
+    if suffix in XBRLParserService.INLINE_EXTENSIONS or any(marker in head for marker in _INLINE_NAMESPACE_MARKERS):
+        return INLINE
+    return INSTANCE
+
+
+# Up to this size a DOM build is ~1.3-1.6x faster than the pull parser (see
+# scripts/bench_xbrl_parser.py) and its memory cost stays modest; above it the streaming engine
+# keeps peak memory flat.
+DOM_MAX_BYTES = 2 * 1024 * 1024
+
+PARSER_ENGINES: EngineRegistry[XBRLParseResult] = EngineRegistry(
+    size_policy(
+        dom_max_bytes=DOM_MAX_BYTES,
+        dom_engines=("lxml", "etree"),
+        streaming_engines=("streaming",),
+        inline_engines=("inline",),
+    ),
+    detect_kind=_detect_kind,
+)
+PARSER_ENGINES.register(
+    ParserEngine("streaming", lambda service, chunks, label: service._parse_streaming(chunks, source=label), streaming=True)
+)
+PARSER_ENGINES.register(
+    ParserEngine(
+        "inline",
+        lambda service, chunks, label: service._parse_inline(chunks, source=label),
+        kinds=frozenset({INLINE}),
+        streaming=True,
+    )
+)
+PARSER_ENGINES.register(
+    ParserEngine("etree", lambda service, payload, label: service._parse_with_xml(payload, source=label))
+)
+PARSER_ENGINES.register(
+    ParserEngine(
+        "lxml",
+        lambda service, payload, label: service._parse_with_lxml(payload, source=label),
+        available=lxml_etree is not None,
+    )
+)
+PARSER_ENGINES.register(
+    # Opt-in (engine="parallel"): worth it for instances of tens of MB on multi-core hosts only.
+    ParserEngine("parallel", lambda service, payload, label: service._parse_parallel(payload, source=label))
+)
+PARSER_ENGINES.register(
+    ParserEngine(
+        "pyxbrl",
+        lambda service, payload, label: service._parse_pyxbrl_payload(payload, source=label),
+        available=PyXBRLParser is not None,
+        fallible=True,
+    )
+)
+
+
 __all__ = [
+    "DOM_MAX_BYTES",
+    "IncrementalParse",
+    "PARSER_ENGINES",
     "XBRLParserService",
     "XBRLParseResult",
     "ContextInfo",
     "AuditRecord",
+    "FactIndex",
+    "ResultMetadata",
 ]
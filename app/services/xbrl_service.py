@@ -1,10 +1,17 @@
 from __future__ import annotations
 
+import hashlib
+from dataclasses import replace
 from pathlib import Path
 from typing import Optional
 
 from app.parsers import IndASXBRLParser, ParsedStatementBundle
+from app.parsers.indas_mapping import MAPPING_VERSION
+from app.services.parse_cache import ParseCache
 from app.services.validation_service import AccountingValidationError, ValidationService
+from app.utils.xbrl_source import XBRLSource, as_buffer, is_path, rewindable, source_name
+
+CACHE_NAMESPACE = f"indas-bundle:{MAPPING_VERSION}"
 
 
 class XBRLExtractionService:
@@ -14,16 +21,91 @@ class XBRLExtractionService:
         self,
         parser: Optional[IndASXBRLParser] = None,
         validator: Optional[ValidationService] = None,
+        cache: Optional[ParseCache] = None,
     ) -> None:
         self.parser = parser or IndASXBRLParser()
         self.validator = validator or ValidationService()
+        self.cache = cache
+
+    @property
+    def cache_namespace(self) -> str:
+        """Cache namespace of this service's bundles; projections never share entries."""
+
+        return f"{CACHE_NAMESPACE}:{self.parser.options.cache_key}"
+
+    def extract(self, source: XBRLSource, *, name: Optional[str] = None) -> ParsedStatementBundle:
+        label = source_name(source, name)
+        return self._validate(self._parse(source, label), label)
 
-    def extract(self, file_path: str | Path) -> ParsedStatementBundle:
-        bundle = self.parser.parse_document(file_path)
+    def incremental(self, *, name: Optional[str] = None) -> "IncrementalExtraction":
+        """Feed-style :meth:`extract` for uploads that are still arriving."""
+
+        return IncrementalExtraction(self, name or "<upload>")
+
+    def _validate(self, bundle: ParsedStatementBundle, label: str) -> ParsedStatementBundle:
         try:
             self.validator.validate_balance_sheet(bundle.balance_sheet)
         except AccountingValidationError as exc:
             raise AccountingValidationError(
-                f"Validation failed for {file_path}: {exc}", difference=exc.difference
+                f"Validation failed for {label}: {exc}", difference=exc.difference
             ) from exc
         return bundle
+
+    @staticmethod
+    def _with_source(bundle: ParsedStatementBundle, label: str) -> ParsedStatementBundle:
+        if bundle.metadata.get("source") == label:
+            return bundle
+        return replace(bundle, metadata={**bundle.metadata, "source": label})
+
+    def _parse(self, source: XBRLSource, label: str) -> ParsedStatementBundle:
+        if self.cache is None:
+            return self.parser.parse_document(source, name=label)
+        buffer = as_buffer(source)
+        if buffer is not None:
+            source, digest = buffer, self.cache.digest_bytes(buffer)
+        elif is_path(source):
+            if not Path(source).exists():
+                raise FileNotFoundError(source)
+            digest = self.cache.digest_file(source)  # type: ignore[arg-type]
+        else:
+            source = rewindable(source)  # type: ignore[arg-type]
+            digest = self.cache.digest_stream(source)
+        bundle = self.cache.get_or_compute(
+            digest,
+            self.cache_namespace,
+            lambda: self.parser.parse_document(source, name=label),
+        )
+        return self._with_source(bundle, label)
+
+
+class IncrementalExtraction:
+    """Feed-driven extraction returned by :meth:`XBRLExtractionService.incremental`."""
+
+    def __init__(self, service: XBRLExtractionService, name: str) -> None:
+        self.name = name
+        self._service = service
+        self._document = service.parser.incremental(name=name)
+        self._digest = hashlib.sha256() if service.cache is not None else None
+
+    @property
+    def digest(self) -> Optional[str]:
+        """SHA-256 of the chunks fed so far, or ``None`` when the service has no cache."""
+
+        return self._digest.hexdigest() if self._digest is not None else None
+
+    def feed(self, chunk: bytes | memoryview) -> None:
+        if self._digest is not None:
+            self._digest.update(chunk)
+        self._document.feed(chunk)
+
+    def close(self) -> ParsedStatementBundle:
+        bundle = self._document.close()
+        cache = self._service.cache
+        if cache is not None and self._digest is not None:
+            key = cache.key(self._digest.hexdigest(), self._service.cache_namespace)
+            cached = cache.get(key)
+            if cached is None:
+                cache.put(key, bundle)
+            else:
+                bundle = self._service._with_source(cached, self.name)
+        return self._service._validate(bundle, self.name)
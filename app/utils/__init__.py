@@ -1,10 +1,21 @@
-from app.utils.currency import format_in_crores, format_in_lakhs, normalize_to_abs, parse_indian_currency
+from app.utils.currency import (
+    decimal_to_paise,
+    format_in_crores,
+    format_in_lakhs,
+    normalize_to_abs,
+    paise_to_decimal,
+    parse_indian_currency,
+    to_paise_batch,
+)
 from app.utils.date import financial_year_for
 
 __all__ = [
+    "decimal_to_paise",
     "format_in_crores",
     "format_in_lakhs",
     "normalize_to_abs",
+    "paise_to_decimal",
     "parse_indian_currency",
+    "to_paise_batch",
     "financial_year_for",
 ]
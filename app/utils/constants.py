@@ -2,3 +2,11 @@ from decimal import Decimal
 
 # Absolute tolerance applied when relative tolerance cannot be derived (e.g., base amount is zero).
 ACCOUNTING_TOLERANCE = Decimal("0")
+
+# Largest XBRL upload accepted by the API; enforced while the body streams in.
+MAX_UPLOAD_BYTES = 15 * 1024 * 1024
+
+# Unmapped facts keep this many leading characters in memory; longer text blocks are truncated.
+UNMAPPED_PREVIEW_CHARS = 256
+# Per-parse memory for unmapped text (previews plus spooled full values) before spilling to disk.
+UNMAPPED_MEMORY_BUDGET = 1024 * 1024
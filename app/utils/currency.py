@@ -1,10 +1,19 @@
 """Helpers for Indian currency formats (Lakhs, Crores) and conversions."""
 
-from decimal import Decimal, InvalidOperation
-from typing import Optional, Union
+from array import array
+from decimal import ROUND_HALF_EVEN, Decimal, InvalidOperation
+from typing import Dict, List, Optional, Sequence, Union
 
 Number = Union[int, float, Decimal, str]
 
+# Scaled-integer amounts are expressed in paise so every rupee amount with up to two decimals
+# is represented exactly.
+PAISE_PER_RUPEE = 100
+_PAISE = Decimal(PAISE_PER_RUPEE)
+# Scaled amounts are stored in signed 64-bit columns (about ±92 thousand lakh crore rupees).
+MIN_PAISE = -(2**63)
+MAX_PAISE = 2**63 - 1
+
 UNIT_MULTIPLIERS = {
     "INR": Decimal(1),
     "RUPEES": Decimal(1),
@@ -53,3 +62,100 @@ def normalize_to_abs(value: Optional[Number], unit: Optional[str]) -> Optional[D
     if value is None:
         return None
     return parse_indian_currency(value, unit)
+
+
+def _unit_rupees(unit: Optional[str]) -> int:
+    if unit is None:
+        return 1
+    multiplier = UNIT_MULTIPLIERS.get(unit.upper())
+    if multiplier is None:
+        raise ValueError(f"Unknown unit '{unit}'. Supported units: {', '.join(UNIT_MULTIPLIERS)}")
+    return int(multiplier)
+
+
+def _scaled(value: str, rupees_per_unit: int) -> int:
+    text = value.replace(",", "").strip()
+    whole, _, fraction = text.partition(".")
+    paise: Optional[int] = None
+    # Fast path: plain amounts with at most two decimals are exact integer paise once the
+    # decimal point is dropped. Anything else (exponents, more precision) goes through Decimal.
+    if len(fraction) <= 2 and "_" not in text and (fraction or whole.lstrip("+-")):
+        try:
+            paise = int(whole + fraction.ljust(2, "0")) * rupees_per_unit
+        except ValueError:
+            pass
+    if paise is None:
+        try:
+            scaled = _to_decimal(text) * _PAISE * rupees_per_unit
+            paise = int(scaled.to_integral_value(rounding=ROUND_HALF_EVEN))
+        except (InvalidOperation, OverflowError) as exc:
+            raise ValueError(f"Unable to parse numeric value from '{value}'") from exc
+    if not MIN_PAISE <= paise <= MAX_PAISE:
+        raise ValueError(f"Amount '{value}' is out of range for 64-bit paise")
+    return paise
+
+
+def to_paise_batch(
+    values: Sequence[Optional[str]],
+    units: Union[Sequence[Optional[str]], str, None] = None,
+    *,
+    as_array: bool = False,
+    strict: bool = True,
+) -> Union[List[Optional[int]], "array[int]"]:
+    """Convert a column of raw amounts into exact integer paise in one pass.
+
+    ``units`` is either one unit name for the whole column or a sequence aligned with
+    ``values`` (``None`` meaning rupees). Amounts outside the signed 64-bit paise range count as
+    unparseable. With ``strict=False`` unparseable entries become ``None`` instead of raising. ``as_array=True`` returns a compact signed 64-bit
+    :class:`array.array`; it requires every entry to be valid.
+    """
+
+    if isinstance(units, str) or units is None:
+        unit_column: Sequence[Optional[str]] = [units] * len(values)
+    else:
+        unit_column = units
+        if len(unit_column) != len(values):
+            raise ValueError("values and units must have the same length")
+    if as_array and not strict:
+        raise ValueError("as_array requires strict conversion")
+
+    multipliers: Dict[Optional[str], int] = {}
+    converted: List[Optional[int]] = []
+    append = converted.append
+    for value, unit in zip(values, unit_column):
+        try:
+            if value is None:
+                raise ValueError("Missing numeric value")
+            try:
+                rupees_per_unit = multipliers[unit]
+            except KeyError:
+                rupees_per_unit = multipliers[unit] = _unit_rupees(unit)
+            append(_scaled(value, rupees_per_unit))
+        except (ValueError, TypeError):
+            if strict:
+                raise
+            append(None)
+    if as_array:
+        return array("q", converted)
+    return converted
+
+
+def paise_to_decimal(paise: int) -> Decimal:
+    """Convert scaled paise back into a rupee ``Decimal`` at the API boundary."""
+
+    return Decimal(paise) / _PAISE
+
+
+def decimal_to_paise(value: Decimal) -> int:
+    """Scale a rupee ``Decimal`` to integer paise (half-even for finer fractions).
+
+    Raises :class:`ValueError` when the result does not fit 64-bit paise.
+    """
+
+    try:
+        paise = int((value * _PAISE).to_integral_value(rounding=ROUND_HALF_EVEN))
+    except (InvalidOperation, OverflowError) as exc:
+        raise ValueError(f"Amount {value} is not a finite number") from exc
+    if not MIN_PAISE <= paise <= MAX_PAISE:
+        raise ValueError(f"Amount {value} is out of range for 64-bit paise")
+    return paise
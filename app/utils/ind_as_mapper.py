@@ -1,9 +1,43 @@
-"""Mapping utilities for Ind AS taxonomy concepts."""
+"""Mapping utilities for Ind AS taxonomy concepts.
+
+Concepts are declared once in ``data/ind_as_concepts.csv`` and compiled into a
+:class:`ConceptRegistry` keyed on (namespace URI, local name). ``python -m
+app.utils.ind_as_mapper`` is the build step that writes the compiled form next to the source
+table; the artifact is committed, so process start-up only has to unmarshal it. It carries the
+digest of the source it was compiled from: when the table is edited without re-running the
+build step, the table is compiled in memory instead (and the test suite fails until the
+artifact is rebuilt). Nothing is written at runtime. Fact lookups are a single dict hit on the
+element's Clark-notation tag.
+"""
 
 from __future__ import annotations
 
+import csv
+import hashlib
+import io
+import logging
+import marshal
+import os
+import tempfile
 from dataclasses import dataclass
-from typing import Dict, Iterable, Optional
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+CONCEPTS_SOURCE = DATA_DIR / "ind_as_concepts.csv"
+REGISTRY_ARTIFACT = DATA_DIR / "ind_as_concepts.registry"
+
+# Namespaces under which the Ind AS concepts are published, keyed by conventional prefix.
+IND_AS_NAMESPACES: Dict[str, str] = {
+    "ind-as": "http://mca.gov.in/indas/2016",
+}
+
+_ARTIFACT_FORMAT = 1
+# Upper bound on memoised lookups for tags outside the known namespaces.
+_MAX_MEMOISED_TAGS = 65_536
 
 
 @dataclass(frozen=True)
@@ -13,78 +47,182 @@ class ConceptMapping:
     description: Optional[str] = None
 
 
-# Core mapping dictionary for frequently used Ind AS concepts. Keys are stored in lowercase
-# to allow case-insensitive lookups and cover both prefixed (e.g., ind-as:Revenue) and
-# plain concept names (e.g., Revenue).
-_IND_AS_MAPPING: Dict[str, ConceptMapping] = {
-    # Income Statement
-    "ind-as:revenuefromoperations": ConceptMapping("income_statement", "operating_revenue", "Revenue from operations"),
-    "revenuefromoperations": ConceptMapping("income_statement", "operating_revenue"),
-    "ind-as:otherincome": ConceptMapping("income_statement", "other_income", "Other income"),
-    "otherincome": ConceptMapping("income_statement", "other_income"),
-    "ind-as:revenue": ConceptMapping("income_statement", "total_revenue", "Total revenue"),
-    "revenue": ConceptMapping("income_statement", "total_revenue"),
-    "ind-as:totalincome": ConceptMapping("income_statement", "total_income", "Total income"),
-    "totalincome": ConceptMapping("income_statement", "total_income"),
-    "ind-as:profitbeforetax": ConceptMapping("income_statement", "profit_before_tax"),
-    "profitbeforetax": ConceptMapping("income_statement", "profit_before_tax"),
-    "ind-as:taxexpense": ConceptMapping("income_statement", "tax_expense"),
-    "taxexpense": ConceptMapping("income_statement", "tax_expense"),
-    "ind-as:profitaftertax": ConceptMapping("income_statement", "profit_after_tax"),
-    "profitaftertax": ConceptMapping("income_statement", "profit_after_tax"),
-    "ind-as:totalexpenses": ConceptMapping("income_statement", "total_expenses"),
-    "totalexpenses": ConceptMapping("income_statement", "total_expenses"),
-
-    # Balance Sheet
-    "ind-as:totalassets": ConceptMapping("balance_sheet", "total_assets"),
-    "totalassets": ConceptMapping("balance_sheet", "total_assets"),
-    "ind-as:currentassets": ConceptMapping("balance_sheet", "current_assets"),
-    "currentassets": ConceptMapping("balance_sheet", "current_assets"),
-    "ind-as:noncurrentassets": ConceptMapping("balance_sheet", "non_current_assets"),
-    "noncurrentassets": ConceptMapping("balance_sheet", "non_current_assets"),
-    "ind-as:totalliabilities": ConceptMapping("balance_sheet", "total_liabilities"),
-    "totalliabilities": ConceptMapping("balance_sheet", "total_liabilities"),
-    "ind-as:currentliabilities": ConceptMapping("balance_sheet", "current_liabilities"),
-    "currentliabilities": ConceptMapping("balance_sheet", "current_liabilities"),
-    "ind-as:shareholdersequity": ConceptMapping("balance_sheet", "shareholders_equity"),
-    "shareholdersequity": ConceptMapping("balance_sheet", "shareholders_equity"),
-    "ind-as:totalequity": ConceptMapping("balance_sheet", "total_equity"),
-    "totalequity": ConceptMapping("balance_sheet", "total_equity"),
-
-    # Cash Flow
-    "ind-as:netcashflowfromoperatingactivities": ConceptMapping("cash_flow", "net_cash_from_operations"),
-    "netcashflowfromoperatingactivities": ConceptMapping("cash_flow", "net_cash_from_operations"),
-    "ind-as:netcashflowfrominvestingactivities": ConceptMapping("cash_flow", "net_cash_from_investing"),
-    "netcashflowfrominvestingactivities": ConceptMapping("cash_flow", "net_cash_from_investing"),
-    "ind-as:netcashflowfromfinancingactivities": ConceptMapping("cash_flow", "net_cash_from_financing"),
-    "netcashflowfromfinancingactivities": ConceptMapping("cash_flow", "net_cash_from_financing"),
-    "ind-as:cashandcashequivalents": ConceptMapping("cash_flow", "cash_and_cash_equivalents"),
-    "cashandcashequivalents": ConceptMapping("cash_flow", "cash_and_cash_equivalents"),
-}
+class ConceptRegistry:
+    """Compiled lookup from taxonomy concepts to standardized statement fields."""
+
+    def __init__(
+        self,
+        concepts: Iterable[Tuple[str, ConceptMapping]],
+        *,
+        namespaces: Dict[str, str],
+        version: str,
+    ) -> None:
+        self.version = version
+        self.namespaces = dict(namespaces)
+        self._by_local: Dict[str, ConceptMapping] = {}
+        self._by_lower: Dict[str, ConceptMapping] = {}
+        # Hot-path table: every spelling a fact tag or concept name can take maps straight to
+        # its mapping. Misses resolved by the slow path are memoised here too.
+        self._by_tag: Dict[str, Optional[ConceptMapping]] = {}
+        for local, mapping in concepts:
+            self._by_local[local] = mapping
+            self._by_lower.setdefault(local.lower(), mapping)
+            self._by_tag[local] = mapping
+            for prefix, uri in self.namespaces.items():
+                self._by_tag[f"{{{uri}}}{local}"] = mapping
+                self._by_tag[f"{prefix}:{local}"] = mapping
+        self._memo_budget = _MAX_MEMOISED_TAGS
+
+    def __len__(self) -> int:
+        return len(self._by_local)
+
+    def resolve(self, name: str) -> Optional[ConceptMapping]:
+        """Resolve a Clark tag, ``prefix:Local`` name or bare local name."""
+
+        try:
+            return self._by_tag[name]
+        except KeyError:
+            pass
+        if not name:
+            return None
+        local = name.rsplit("}", 1)[-1].rsplit(":", 1)[-1]
+        mapping = self._by_lower.get(local.lower())
+        if self._memo_budget > 0:
+            self._memo_budget -= 1
+            self._by_tag[name] = mapping
+        return mapping
+
+    def concepts(self) -> Iterable[str]:
+        return self._by_local.keys()
+
+    def section(self, statement: str) -> Dict[str, str]:
+        """Return ``{concept: field}`` for every concept that maps into ``statement``."""
+
+        return {local: item.field for local, item in self._by_local.items() if item.statement == statement}
+
+    # ------------------------------------------------------------------
+    # Compilation
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def compile_source(cls, source: bytes, *, namespaces: Dict[str, str]) -> "ConceptRegistry":
+        rows = _read_source_rows(source)
+        return cls(
+            ((row[0], ConceptMapping(row[1], row[2], row[3])) for row in rows),
+            namespaces=namespaces,
+            version=_source_digest(source, namespaces),
+        )
+
+    def to_artifact(self) -> bytes:
+        statements: List[str] = []
+        fields: List[str] = []
+        rows = []
+        for local, mapping in self._by_local.items():
+            if mapping.statement not in statements:
+                statements.append(mapping.statement)
+            if mapping.field not in fields:
+                fields.append(mapping.field)
+            rows.append(
+                (local, statements.index(mapping.statement), fields.index(mapping.field), mapping.description)
+            )
+        return marshal.dumps(
+            (_ARTIFACT_FORMAT, self.version, self.namespaces, tuple(statements), tuple(fields), tuple(rows))
+        )
+
+    @classmethod
+    def from_artifact(cls, payload: bytes) -> "ConceptRegistry":
+        artifact_format, version, namespaces, statements, fields, rows = marshal.loads(payload)
+        if artifact_format != _ARTIFACT_FORMAT:
+            raise ValueError(f"Unsupported concept registry artifact format {artifact_format!r}")
+        return cls(
+            ((local, ConceptMapping(statements[stmt], fields[fld], description)) for local, stmt, fld, description in rows),
+            namespaces=namespaces,
+            version=version,
+        )
+
+
+def _read_source_rows(source: bytes) -> List[Tuple[str, str, str, Optional[str]]]:
+    rows: List[Tuple[str, str, str, Optional[str]]] = []
+    seen: Dict[str, int] = {}
+    for line_no, record in enumerate(csv.DictReader(io.StringIO(source.decode("utf-8"))), start=2):
+        concept = (record.get("concept") or "").strip()
+        statement = (record.get("statement") or "").strip()
+        field = (record.get("field") or "").strip()
+        if not concept or not statement or not field:
+            raise ValueError(f"Incomplete concept mapping on line {line_no}")
+        if concept in seen:
+            raise ValueError(f"Concept {concept!r} declared twice (lines {seen[concept]} and {line_no})")
+        seen[concept] = line_no
+        rows.append((concept, statement, field, (record.get("description") or "").strip() or None))
+    return rows
+
+
+def _source_digest(source: bytes, namespaces: Dict[str, str]) -> str:
+    digest = hashlib.sha256(source)
+    digest.update(repr(sorted(namespaces.items())).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def load_registry(
+    source_path: Path = CONCEPTS_SOURCE,
+    artifact_path: Optional[Path] = REGISTRY_ARTIFACT,
+) -> ConceptRegistry:
+    """Load the compiled registry, compiling the source in memory when the artifact is stale.
+
+    The artifact is only read here; the package directory may be read-only once installed.
+    """
+
+    source = source_path.read_bytes()
+    version = _source_digest(source, IND_AS_NAMESPACES)
+    if artifact_path is not None:
+        try:
+            registry = ConceptRegistry.from_artifact(artifact_path.read_bytes())
+            if registry.version == version:
+                return registry
+            logger.info("Concept registry artifact %s is stale; compiling %s in memory", artifact_path, source_path)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, EOFError, TypeError):
+            logger.warning("Ignoring unreadable concept registry artifact %s", artifact_path)
+    return ConceptRegistry.compile_source(source, namespaces=IND_AS_NAMESPACES)
+
+
+def write_artifact(registry: ConceptRegistry, artifact_path: Path = REGISTRY_ARTIFACT) -> None:
+    """Write ``registry`` atomically; part of the build step, so errors propagate."""
+
+    with tempfile.NamedTemporaryFile(dir=artifact_path.parent, suffix=".tmp", delete=False) as tmp:
+        tmp.write(registry.to_artifact())
+        temp_path = Path(tmp.name)
+    os.replace(temp_path, artifact_path)
+
+
+@lru_cache()
+def get_registry() -> ConceptRegistry:
+    return load_registry()
+
+
+MAPPING_VERSION = get_registry().version
 
 
 def resolve_concept(concept_name: str) -> Optional[ConceptMapping]:
     """Return the mapping metadata for a given concept name.
 
-    The lookup is case-insensitive and handles both prefixed (e.g. ``ind-as:Revenue``)
-    and plain names (``Revenue``). When the concept is not recognised, ``None`` is
-    returned so the caller can ignore the fact gracefully.
+    Accepts Clark-notation tags (``{namespace}TotalAssets``), prefixed names
+    (``ind-as:TotalAssets``) and plain names (``TotalAssets``); unknown namespaces and case
+    variants fall back to a case-insensitive local-name match. When the concept is not
+    recognised, ``None`` is returned so the caller can ignore the fact gracefully.
     """
 
-    if not concept_name:
-        return None
-    key = concept_name.lower()
-    if key in _IND_AS_MAPPING:
-        return _IND_AS_MAPPING[key]
-    # Attempt to remove namespace URI markers such as ``{namespace}TotalAssets``
-    if key.startswith("{") and "}" in key:
-        _, remainder = key.split("}", 1)
-        remainder_key = remainder.lower()
-        return _IND_AS_MAPPING.get(remainder_key)
-    return None
+    return get_registry().resolve(concept_name)
 
 
 def all_supported_concepts() -> Iterable[str]:
-    """Return all concept keys supported by the mapper."""
+    """Return all concept names supported by the mapper."""
+
+    return get_registry().concepts()
+
 
-    return _IND_AS_MAPPING.keys()
+if __name__ == "__main__":  # pragma: no cover - build step
+    compiled = ConceptRegistry.compile_source(CONCEPTS_SOURCE.read_bytes(), namespaces=IND_AS_NAMESPACES)
+    write_artifact(compiled)
+    print(f"Compiled {len(compiled)} concepts into {REGISTRY_ARTIFACT} (version {compiled.version})")
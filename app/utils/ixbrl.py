@@ -0,0 +1,86 @@
+"""Inline XBRL (iXBRL) helpers: namespaces and numeric value transformation.
+
+``ix:nonFraction`` facts carry a display string plus ``format``/``scale``/``sign`` attributes;
+:func:`nonfraction_value` turns them into the plain decimal string an instance document would
+hold, so the rest of the pipeline treats inline and plain facts identically.
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal, InvalidOperation
+from html.entities import name2codepoint
+from typing import Dict, Optional
+
+IX_NAMESPACES = frozenset(
+    {
+        "http://www.xbrl.org/2013/inlineXBRL",
+        "http://www.xbrl.org/2008/inlineXBRL",
+    }
+)
+XSI_NIL = "{http://www.w3.org/2001/XMLSchema-instance}nil"
+
+# XHTML filings that declare the XHTML DTD may use named entities; expat does not load DTDs.
+HTML_ENTITIES: Dict[str, str] = {name: chr(code) for name, code in name2codepoint.items()}
+
+_ZERO_FORMATS = frozenset({"zerodash", "fixed-zero", "fixedzero", "zero-dash"})
+_COMMA_DECIMAL_FORMATS = frozenset({"num-comma-decimal", "numcommadecimal", "numdotcomma", "numspacecomma"})
+_IGNORED_CHARACTERS = str.maketrans("", "", " \u00a0\u202f\t\r\n\'")
+
+
+def is_inline_namespace(uri: str) -> bool:
+    return uri in IX_NAMESPACES
+
+
+def nonfraction_value(
+    text: str,
+    *,
+    fmt: Optional[str] = None,
+    scale: Optional[str] = None,
+    sign: Optional[str] = None,
+) -> Optional[str]:
+    """Return the fact value as a plain decimal string, or ``None`` if it cannot be read.
+
+    ``fmt`` is the ``format`` attribute, a transformation QName of which only the local part
+    matters; ``scale`` is the power of ten the displayed number is expressed in, and
+    ``sign="-"`` negates the value.
+    """
+
+    transform = fmt.rsplit(":", 1)[-1].lower() if fmt else "num-dot-decimal"
+    if transform in _ZERO_FORMATS:
+        digits = "0"
+    else:
+        digits = text.translate(_IGNORED_CHARACTERS)
+        if transform in _COMMA_DECIMAL_FORMATS:
+            digits = digits.replace(".", "").replace(",", ".")
+        else:
+            digits = digits.replace(",", "")
+        if not digits:
+            return None
+
+    if scale and scale != "0":
+        try:
+            digits = format_decimal(Decimal(digits).scaleb(int(scale)))
+        except (InvalidOperation, ValueError):
+            return None
+    if sign == "-":
+        digits = digits[1:] if digits.startswith("-") else f"-{digits}"
+    return digits
+
+
+def format_decimal(value: Decimal) -> str:
+    """Render ``value`` in plain (non-exponent) notation without superfluous trailing zeros."""
+
+    text = format(value, "f")
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    return text or "0"
+
+
+__all__ = [
+    "HTML_ENTITIES",
+    "IX_NAMESPACES",
+    "XSI_NIL",
+    "format_decimal",
+    "is_inline_namespace",
+    "nonfraction_value",
+]
@@ -0,0 +1,257 @@
+"""Size-limited upload reading.
+
+Limits are enforced chunk by chunk: a body is rejected as soon as the first chunk over the limit
+arrives instead of after it has been buffered in full. :class:`MultipartFileStream` hands the
+file to an incremental parser while the request body is still arriving.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    MutableMapping,
+    Optional,
+    Protocol,
+    TypeVar,
+)
+
+from app.utils.constants import MAX_UPLOAD_BYTES
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # pragma: no cover - python-multipart < 0.0.13 ships the ``multipart`` package
+    from multipart.multipart import MultipartParser, parse_options_header  # type: ignore[no-redef]
+
+# Room for multipart boundaries and part headers on top of the file itself.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# OpenAPI request body for handlers that read the ``file`` form field from the raw request stream.
+UPLOAD_REQUEST_BODY: Dict[str, Any] = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when a payload exceeds the configured size limit."""
+
+    def __init__(self, limit: int) -> None:
+        super().__init__(f"File exceeds maximum size of {limit // (1024 * 1024)} MB")
+        self.limit = limit
+
+
+class FeedSink(Protocol):
+    def feed(self, chunk: bytes | memoryview) -> None: ...
+
+
+SinkT = TypeVar("SinkT", bound=FeedSink)
+
+
+class MultipartFileStream:
+    """Pull one file field out of a ``multipart/form-data`` body while it is being received.
+
+    Feed raw body chunks to :meth:`iter_file` (typically ``request.stream()``); it yields the
+    file's bytes as zero-copy slices as soon as each body chunk has been tokenised, and fills in
+    :attr:`filename` once the part headers have been read.
+    """
+
+    def __init__(self, content_type: str, *, field_name: str = "file", limit: int = MAX_UPLOAD_BYTES) -> None:
+        media_type, options = parse_options_header(content_type)
+        boundary = options.get(b"boundary")
+        if media_type != b"multipart/form-data" or not boundary:
+            raise ValueError("Expected a multipart/form-data upload")
+        self.field_name = field_name
+        self.limit = limit
+        self.filename: Optional[str] = None
+        self.size = 0
+        self.found = False
+        self._in_field = False
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._headers: Dict[bytes, bytes] = {}
+        self._ready: List[memoryview] = []
+        self._parser = MultipartParser(
+            boundary,
+            {
+                "on_part_begin": self._on_part_begin,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+            },
+        )
+
+    async def iter_file(self, body: AsyncIterator[bytes]) -> AsyncIterator[memoryview]:
+        async for chunk in body:
+            if not chunk:
+                continue
+            self._parser.write(chunk)
+            ready, self._ready = self._ready, []
+            for data in ready:
+                yield data
+        self._parser.finalize()
+        for data in self._ready:
+            yield data
+        self._ready = []
+
+    async def feed_into(
+        self, body: AsyncIterator[bytes], open_sink: Callable[[Optional[str]], SinkT]
+    ) -> Optional[SinkT]:
+        """Stream the file into ``open_sink(filename)``; returns ``None`` if the file was empty.
+
+        ``sink.feed`` runs in a worker thread so parsing never blocks the event loop, and the next
+        body chunk is only pulled once the previous one has been consumed.
+        """
+
+        sink: Optional[SinkT] = None
+        async for chunk in self.iter_file(body):
+            if sink is None:
+                sink = open_sink(self.filename)
+            await asyncio.to_thread(sink.feed, chunk)
+        return sink
+
+    # -- parser callbacks ------------------------------------------------
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[bytes(self._header_field).lower()] = bytes(self._header_value)
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        self._in_field = name == self.field_name and not self.found
+        if self._in_field:
+            self.found = True
+            filename = options.get(b"filename")
+            self.filename = filename.decode("utf-8", "replace") if filename is not None else None
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if not self._in_field or start == end:
+            return
+        self.size += end - start
+        if self.size > self.limit:
+            raise UploadTooLargeError(self.limit)
+        self._ready.append(memoryview(data)[start:end])
+
+    def _on_part_end(self) -> None:
+        self._in_field = False
+
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+
+class RequestSizeLimitMiddleware:
+    """ASGI middleware answering ``413`` for request bodies larger than ``max_body_bytes``.
+
+    A declared ``Content-Length`` is rejected before any body is read; chunked bodies are counted
+    as they arrive, so the framework never spools an oversized multipart upload.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_bytes: int = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES) -> None:
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        declared = self._content_length(scope)
+        if declared is not None and declared > self.max_body_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    raise UploadTooLargeError(MAX_UPLOAD_BYTES)
+            return message
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except UploadTooLargeError:
+            if response_started:
+                raise
+            await self._reject(send)
+
+    @staticmethod
+    def _content_length(scope: Scope) -> Optional[int]:
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    return int(value)
+                except ValueError:
+                    return None
+        return None
+
+    @staticmethod
+    async def _reject(send: Send) -> None:
+        body: Dict[str, str] = {"detail": str(UploadTooLargeError(MAX_UPLOAD_BYTES))}
+        payload = json.dumps(body).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(payload)).encode("ascii")),
+                    (b"connection", b"close"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": payload})
+
+
+__all__ = [
+    "FeedSink",
+    "MULTIPART_OVERHEAD_BYTES",
+    "MultipartFileStream",
+    "RequestSizeLimitMiddleware",
+    "UPLOAD_REQUEST_BODY",
+    "UploadTooLargeError",
+]
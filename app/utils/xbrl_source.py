@@ -0,0 +1,105 @@
+"""Normalise the different inputs the XBRL parsers accept.
+
+A source is either a filesystem path, an in-memory buffer (``bytes``/``bytearray``/``memoryview``)
+or a binary file-like object such as an upload's spool. Buffers are consumed through
+``memoryview`` slices so the payload is never copied on its way into the XML parser.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Union
+
+XBRLSource = Union[str, "os.PathLike[str]", bytes, bytearray, memoryview, BinaryIO]
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# Non-seekable streams are spooled so they can be hashed and then parsed; small ones stay in memory.
+SPOOL_MAX_MEMORY = 4 * 1024 * 1024
+
+
+def is_path(source: XBRLSource) -> bool:
+    return isinstance(source, (str, os.PathLike))
+
+
+def as_buffer(source: XBRLSource) -> Optional[memoryview]:
+    """Return a byte-addressed view of in-memory sources, ``None`` for paths and streams."""
+
+    if isinstance(source, memoryview):
+        return source.cast("B") if source.format != "B" or source.ndim != 1 else source
+    if isinstance(source, (bytes, bytearray)):
+        return memoryview(source)
+    return None
+
+
+def source_name(source: XBRLSource, name: Optional[str] = None) -> str:
+    if name is not None:
+        return name
+    if is_path(source):
+        return str(Path(source))
+    stream_name = getattr(source, "name", None)
+    if isinstance(stream_name, str):
+        return stream_name
+    return "<memory>"
+
+
+def iter_chunks(source: XBRLSource, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes | memoryview]:
+    """Yield the payload in chunks; buffers yield zero-copy slices."""
+
+    buffer = as_buffer(source)
+    if buffer is not None:
+        for offset in range(0, len(buffer), chunk_size):
+            yield buffer[offset : offset + chunk_size]
+        return
+    if is_path(source):
+        with Path(source).open("rb") as handle:
+            yield from _read_chunks(handle, chunk_size)
+        return
+    yield from _read_chunks(source, chunk_size)  # type: ignore[arg-type]
+
+
+def read_payload(source: XBRLSource) -> bytes | memoryview:
+    """Return the whole payload for parsers that need it at once (DOM engines)."""
+
+    buffer = as_buffer(source)
+    if buffer is not None:
+        return buffer
+    if is_path(source):
+        return Path(source).read_bytes()
+    return source.read()  # type: ignore[union-attr]
+
+
+def rewindable(stream: BinaryIO) -> BinaryIO:
+    """Return ``stream`` if it can seek back, otherwise a spooled copy positioned at the start."""
+
+    try:
+        if stream.seekable():
+            return stream
+    except (AttributeError, ValueError):
+        pass
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    for chunk in _read_chunks(stream, DEFAULT_CHUNK_SIZE):
+        spool.write(chunk)
+    spool.seek(0)
+    return spool  # type: ignore[return-value]
+
+
+def _read_chunks(stream: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+__all__ = [
+    "DEFAULT_CHUNK_SIZE",
+    "XBRLSource",
+    "as_buffer",
+    "is_path",
+    "iter_chunks",
+    "read_payload",
+    "rewindable",
+    "source_name",
+]
@@ -0,0 +1,124 @@
+"""Micro-benchmark for the XBRL parser engines on synthetic AOC-4 style instances.
+
+Usage::
+
+    python scripts/bench_xbrl_parser.py 500 5000 50000
+"""
+
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.xbrl_parser import PARSER_ENGINES, XBRLParserService  # noqa: E402
+
+INSTANCE_ENGINES = [name for name in ("etree", "lxml", "streaming") if name in PARSER_ENGINES.available()]
+
+CONCEPTS = [
+    "TotalAssets",
+    "TotalLiabilities",
+    "ShareholdersEquity",
+    "RevenueFromOperations",
+    "OtherIncome",
+    "Revenue",
+    "ProfitBeforeTax",
+    "TaxExpense",
+    "ProfitAfterTax",
+    "UnknownMetric",
+]
+
+
+def build_instance(fact_count: int, context_count: int = 10) -> bytes:
+    parts = [
+        '<xbrl xmlns="http://www.xbrl.org/2003/instance" xmlns:ind-as="http://mca.gov.in/indas/2016">',
+    ]
+    for idx in range(context_count):
+        year = 2010 + idx
+        parts.append(
+            f'<context id="C{idx}"><entity><identifier scheme="http://www.mca.gov.in/CIN">'
+            f"L12345MH1956PLC012345</identifier></entity><period><startDate>{year}-04-01</startDate>"
+            f"<endDate>{year + 1}-03-31</endDate></period></context>"
+        )
+    parts.append('<unit id="U1"><measure>iso4217:INR</measure></unit>')
+    for idx in range(fact_count):
+        concept = CONCEPTS[idx % len(CONCEPTS)]
+        context = idx % context_count
+        parts.append(f'<ind-as:{concept} contextRef="C{context}" unitRef="U1">{1000 + idx}.50</ind-as:{concept}>')
+    parts.append("</xbrl>")
+    return "\n".join(parts).encode("utf-8")
+
+
+def build_inline_instance(fact_count: int, context_count: int = 10, narrative_every: int = 50) -> bytes:
+    """The same facts as :func:`build_instance`, laid out as an iXBRL (XHTML) filing with narrative."""
+
+    parts = [
+        '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:ix="http://www.xbrl.org/2013/inlineXBRL"'
+        ' xmlns:xbrli="http://www.xbrl.org/2003/instance" xmlns:ind-as="http://mca.gov.in/indas/2016"'
+        ' xmlns:ixt="http://www.xbrl.org/inlineXBRL/transformation/2015-02-26"><body>',
+        '<div style="display:none"><ix:header><ix:resources>',
+    ]
+    for idx in range(context_count):
+        year = 2010 + idx
+        parts.append(
+            f'<xbrli:context id="C{idx}"><xbrli:entity><xbrli:identifier scheme="http://www.mca.gov.in/CIN">'
+            f"L12345MH1956PLC012345</xbrli:identifier></xbrli:entity><xbrli:period>"
+            f"<xbrli:startDate>{year}-04-01</xbrli:startDate><xbrli:endDate>{year + 1}-03-31</xbrli:endDate>"
+            f"</xbrli:period></xbrli:context>"
+        )
+    parts.append('<xbrli:unit id="U1"><xbrli:measure>iso4217:INR</xbrli:measure></xbrli:unit>')
+    parts.append("</ix:resources></ix:header></div><table>")
+    narrative = "<p>" + "The Board reviewed the operations of the Company in detail. " * 40 + "</p>"
+    for idx in range(fact_count):
+        if idx % narrative_every == 0:
+            parts.append(f"</table><div class=\"note\">{narrative}</div><table>")
+        concept = CONCEPTS[idx % len(CONCEPTS)]
+        context = idx % context_count
+        parts.append(
+            f'<tr><td>{concept}</td><td><ix:nonFraction name="ind-as:{concept}" contextRef="C{context}" unitRef="U1"'
+            f' format="ixt:num-dot-decimal" decimals="2">{1000 + idx:,}.50</ix:nonFraction></td></tr>'
+        )
+    parts.append("</table></body></html>")
+    return "\n".join(parts).encode("utf-8")
+
+
+def measure(path: Path, *, engine: str | None) -> tuple[float, float, int]:
+    """Return wall time, traced peak memory and the number of blocks the result keeps alive."""
+
+    parser = XBRLParserService(engine=engine)
+    started = time.perf_counter()
+    parser.parse(path)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    result = parser.parse(path)
+    _, peak = tracemalloc.get_traced_memory()
+    retained = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    del result
+    return elapsed, peak / (1024 * 1024), retained
+
+
+def main(sizes: list[int]) -> None:
+    print(f"{'facts':>10} {'bytes':>12} {'engine':>10} {'seconds':>9} {'peak MiB':>9} {'blocks':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = Path(tmp) / f"bench-{size}.xbrl"
+            path.write_bytes(build_instance(size))
+            # Process start-up dominates below a few MB; parallel parsing is measured on big inputs only.
+            parallel = ["parallel"] if path.stat().st_size >= 8 * 1024 * 1024 else []
+            for engine in [*INSTANCE_ENGINES, *parallel, None]:
+                elapsed, peak, retained = measure(path, engine=engine)
+                label = engine or "auto"
+                print(f"{size:>10} {path.stat().st_size:>12} {label:>10} {elapsed:>9.3f} {peak:>9.1f} {retained:>10}")
+            inline_path = Path(tmp) / f"bench-{size}.html"
+            inline_path.write_bytes(build_inline_instance(size))
+            elapsed, peak, retained = measure(inline_path, engine=None)
+            print(f"{size:>10} {inline_path.stat().st_size:>12} {'inline':>10} {elapsed:>9.3f} {peak:>9.1f} {retained:>10}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [500, 5_000, 50_000])
@@ -0,0 +1,88 @@
+from decimal import Decimal
+
+from app.services.batch_validation import stack_results, validate_batch
+from app.services.validation_service import ValidationService
+from app.services.xbrl_parser import XBRLParserService
+
+
+def _filing(years: dict) -> bytes:
+    contexts = []
+    facts = []
+    for year, values in years.items():
+        contexts.append(
+            f'<context id="D{year}"><entity><identifier scheme="x">L1</identifier></entity>'
+            f"<period><startDate>{year - 1}-04-01</startDate><endDate>{year}-03-31</endDate></period></context>"
+        )
+        contexts.append(
+            f'<context id="I{year}"><entity><identifier scheme="x">L1</identifier></entity>'
+            f"<period><instant>{year}-03-31</instant></period></context>"
+        )
+        for concept, value in values.items():
+            context = f"I{year}" if concept in {"TotalAssets", "TotalLiabilities", "TotalEquity", "CurrentAssets"} else f"D{year}"
+            facts.append(f'<ind-as:{concept} contextRef="{context}" unitRef="U1">{value}</ind-as:{concept}>')
+    return (
+        '<xbrl xmlns="http://www.xbrl.org/2003/instance" xmlns:ind-as="http://mca.gov.in/indas/2016">'
+        + "".join(contexts)
+        + '<unit id="U1"><measure>iso4217:INR</measure></unit>'
+        + "".join(facts)
+        + "</xbrl>"
+    ).encode()
+
+
+BALANCED = {"TotalAssets": "1000", "TotalLiabilities": "600", "TotalEquity": "400"}
+INCOME = {
+    "RevenueFromOperations": "900",
+    "OtherIncome": "100",
+    "Revenue": "1000",
+    "ProfitBeforeTax": "150",
+    "TaxExpense": "30",
+    "ProfitAfterTax": "120",
+}
+
+FILINGS = {
+    "ALPHA": {2023: {**BALANCED, **INCOME}, 2024: {**BALANCED, "TotalAssets": "1100", **INCOME, "Revenue": "1020"}},
+    "BETA": {2024: {"TotalAssets": "1000.50", "TotalLiabilities": "500", "TotalEquity": "500", "ProfitAfterTax": "7"}},
+    # A zero total revenue skips the revenue check, exactly as the per-filing checks read it.
+    "GAMMA": {2024: {**INCOME, "Revenue": "0", "CurrentAssets": "5"}},
+}
+
+
+def _results():
+    parser = XBRLParserService()
+    return [(company, parser.parse(_filing(years))) for company, years in FILINGS.items()]
+
+
+def test_batch_matches_per_filing_validation():
+    results = _results()
+    service = ValidationService(absolute_tolerance=Decimal("0.50"))
+
+    batch = service.validate_batch(results)
+
+    for company, result in results:
+        assert batch.messages(company) == service.validate_fact_table(result.facts)
+    assert batch.failed_companies() == ["ALPHA"]
+    assert batch.failures == 2
+
+
+def test_stack_lays_out_one_cell_per_company_period():
+    stack = stack_results(_results())
+
+    assert stack.companies == ["ALPHA", "BETA", "GAMMA"]
+    assert list(stack.company_starts) == [0, 4, 6, 8]
+    assert [stack.companies[company] for company in stack.cell_companies] == ["ALPHA"] * 4 + ["BETA"] * 2 + ["GAMMA"] * 2
+    assert list(stack.values["total_assets"][:4]) == [100000, 0, 110000, 0]
+    assert list(stack.present["total_equity"][:4]) == [1, 0, 1, 0]
+    assert list(stack.balance_sheet) == [1, 0, 1, 0, 1, 0, 0, 1]
+
+
+def test_relative_tolerance_boundary_is_exact():
+    service = ValidationService(relative_tolerance=Decimal("0.01"))
+    on_boundary = _filing({2024: {"TotalAssets": "1000", "TotalLiabilities": "590", "TotalEquity": "400"}})
+    past_boundary = _filing({2024: {"TotalAssets": "1000", "TotalLiabilities": "589.99", "TotalEquity": "400"}})
+    parser = XBRLParserService()
+
+    batch = validate_batch([("ON", parser.parse(on_boundary)), ("PAST", parser.parse(past_boundary))], service)
+
+    check = batch.checks["balance_sheet_identity"]
+    assert bytes(check.passed) == b"\x01\x00"
+    assert [batch.messages(company)[0].difference for company in ("ON", "PAST")] == [Decimal("10"), Decimal("10.01")]
@@ -0,0 +1,101 @@
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+
+from app.services.calculation_linkbase import CalculationLinkbaseError, CalculationMatrix, concept_values, load_calculations
+from app.services.validation_service import ValidationService
+from app.services.xbrl_parser import XBRLParserService
+
+SUMMATION = "http://www.xbrl.org/2003/arcrole/summation-item"
+
+
+def _link(role: str, arcs: str, concepts=("TotalAssets", "CurrentAssets", "NonCurrentAssets", "Inventories", "TradeReceivables", "ProfitAfterTax", "ProfitBeforeTax", "TaxExpense")) -> str:
+    locs = "".join(f'<link:loc xlink:type="locator" xlink:href="ind-as.xsd#ind-as_{name}" xlink:label="{name}"/>' for name in concepts)
+    return f'<link:calculationLink xlink:type="extended" xlink:role="http://example.com/role/{role}">{locs}{arcs}</link:calculationLink>'
+
+
+def _arc(total: str, item: str, weight: str = "1.0", **extra: str) -> str:
+    attributes = "".join(f' {key}="{value}"' for key, value in extra.items())
+    return f'<link:calculationArc xlink:type="arc" xlink:arcrole="{SUMMATION}" xlink:from="{total}" xlink:to="{item}" weight="{weight}"{attributes}/>'
+
+
+LINKBASE = (
+    '<link:linkbase xmlns:link="http://www.xbrl.org/2003/linkbase" xmlns:xlink="http://www.w3.org/1999/xlink">'
+    + _link(
+        "BalanceSheet",
+        _arc("TotalAssets", "CurrentAssets")
+        + _arc("TotalAssets", "NonCurrentAssets")
+        + _arc("CurrentAssets", "Inventories")
+        + _arc("CurrentAssets", "TradeReceivables")
+        # Overridden by a prohibiting arc of higher priority.
+        + _arc("TotalAssets", "Inventories")
+        + _arc("TotalAssets", "Inventories", use="prohibited", priority="1"),
+    )
+    + _link("ProfitAndLoss", _arc("ProfitAfterTax", "ProfitBeforeTax") + _arc("ProfitAfterTax", "TaxExpense", "-1"))
+    # The same summation under another role is checked once.
+    + _link("Summary", _arc("ProfitAfterTax", "ProfitBeforeTax") + _arc("ProfitAfterTax", "TaxExpense", "-1"))
+    + "</link:linkbase>"
+).encode()
+
+
+def _filing() -> bytes:
+    contexts = "".join(
+        f'<context id="{context}"><entity><identifier scheme="x">L1</identifier>{segment}</entity>'
+        f"<period>{period}</period></context>"
+        for context, period, segment in (
+            ("I24", "<instant>2024-03-31</instant>", ""),
+            ("D24", "<startDate>2023-04-01</startDate><endDate>2024-03-31</endDate>", ""),
+            (
+                "I24Retail",
+                "<instant>2024-03-31</instant>",
+                '<segment><xbrldi:explicitMember dimension="ind-as:SegmentsAxis">ind-as:RetailMember</xbrldi:explicitMember></segment>',
+            ),
+        )
+    )
+    facts = [
+        ("TotalAssets", "I24", "1000"),
+        ("CurrentAssets", "I24", "400"),
+        ("NonCurrentAssets", "I24", "600"),
+        # Unmapped items: 250 + 100 does not make the 400 of current assets.
+        ("Inventories", "I24", "250"),
+        ("TradeReceivables", "I24", "100"),
+        # A segment figure must not stand in for the entity-level one.
+        ("Inventories", "I24Retail", "300"),
+        ("ProfitBeforeTax", "D24", "150"),
+        ("TaxExpense", "D24", "30"),
+        ("ProfitAfterTax", "D24", "120"),
+    ]
+    return (
+        '<xbrl xmlns="http://www.xbrl.org/2003/instance" xmlns:ind-as="http://mca.gov.in/indas/2016"'
+        ' xmlns:xbrldi="http://xbrl.org/2006/xbrldi">'
+        + contexts
+        + '<unit id="U1"><measure>iso4217:INR</measure></unit>'
+        + "".join(f'<ind-as:{concept} contextRef="{context}" unitRef="U1">{value}</ind-as:{concept}>' for concept, context, value in facts)
+        + "</xbrl>"
+    ).encode()
+
+
+def test_linkbase_compiles_to_deduplicated_sparse_rows():
+    matrix = CalculationMatrix.compile([LINKBASE])
+
+    assert [matrix.total(row) for row in range(len(matrix))] == ["TotalAssets", "CurrentAssets", "ProfitAfterTax"]
+    assert list(matrix.indptr) == [0, 2, 4, 6]
+    assert matrix.items(2) == [("ProfitBeforeTax", Fraction(1)), ("TaxExpense", Fraction(-1))]
+    assert matrix.role(2).endswith("ProfitAndLoss")
+    assert load_calculations(LINKBASE) is load_calculations(bytes(LINKBASE))
+    with pytest.raises(CalculationLinkbaseError):
+        CalculationMatrix.compile([b"<link:linkbase"])
+
+
+def test_summation_failures_become_validation_messages():
+    result = XBRLParserService().parse(_filing())
+
+    messages = ValidationService().validate_calculations(result, load_calculations(LINKBASE))
+
+    assert concept_values(result)["As of 2024-03-31"]["Inventories"] == 25000
+    assert [(message.statement, message.field, message.difference) for message in messages] == [
+        ("balance_sheet", "current_assets", Decimal("50"))
+    ]
+    assert messages[0].message == "CurrentAssets does not equal the sum of its calculation items (Inventories, TradeReceivables)"
+    assert not messages[0].passed
@@ -0,0 +1,40 @@
+import asyncio
+from io import BytesIO
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+from app.services.conversion_pool import ConversionPool
+from app.services.xbrl_parser import XBRLParserService
+
+SAMPLE_PAYLOAD = (Path(__file__).resolve().parents[1] / "sample_data" / "sample.xbrl").read_bytes()
+
+
+def _sheet_names(workbook_bytes: bytes) -> list[str]:
+    return load_workbook(BytesIO(workbook_bytes)).sheetnames
+
+
+def _parse():
+    return XBRLParserService().parse(SAMPLE_PAYLOAD, name="sample.xbrl")
+
+
+def test_in_process_pool_renders_without_workers():
+    pool = ConversionPool(0)
+
+    rendered = asyncio.run(pool.render(_parse()))
+
+    assert "Balance Sheet" in _sheet_names(rendered.workbook)
+
+
+def test_process_pool_renders_in_warm_worker_and_returns_metrics():
+    result = _parse()
+    pool = ConversionPool(1)
+    try:
+        pool.warm_up()
+        rendered = asyncio.run(pool.render(result, source_url="http://testserver/filings/abc/facts"))
+    finally:
+        pool.shutdown()
+
+    assert _sheet_names(rendered.workbook)[:3] == ["Income Statement", "Balance Sheet", "Cash Flow"]
+    assert rendered.metrics
+    assert set(rendered.metrics) <= {metric.name for metric in result.metrics.metrics}
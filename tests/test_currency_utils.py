@@ -2,7 +2,14 @@ from decimal import Decimal
 
 import pytest
 
-from app.utils.currency import format_in_crores, format_in_lakhs, parse_indian_currency
+from app.utils.currency import (
+    decimal_to_paise,
+    format_in_crores,
+    format_in_lakhs,
+    paise_to_decimal,
+    parse_indian_currency,
+    to_paise_batch,
+)
 
 
 def test_parse_indian_currency_lakhs():
@@ -18,3 +25,34 @@ def test_format_in_crores():
 def test_unknown_unit_raises():
     with pytest.raises(ValueError):
         parse_indian_currency(10, "Million")
+
+
+def test_to_paise_batch_scales_exactly_per_unit():
+    values = ["1,234.5", "-0.015", "2.5", "1e3", "not-a-number"]
+    units = ["LAKHS", None, "CRORES", "INR", None]
+
+    result = to_paise_batch(values, units, strict=False)
+
+    assert result == [12_345_000_000, -2, 2_500_000_000, 100_000, None]
+    assert paise_to_decimal(result[0]) == parse_indian_currency("1,234.5", "Lakhs")
+
+
+def test_to_paise_batch_array_output_and_strict_errors():
+    column = to_paise_batch(["10", "20.25"], "INR", as_array=True)
+
+    assert column.typecode == "q"
+    assert list(column) == [1000, 2025]
+    with pytest.raises(ValueError):
+        to_paise_batch(["10", "bad"], "INR")
+
+
+def test_amounts_beyond_64_bit_paise_are_unparseable():
+    assert to_paise_batch(["1e30", "92233720368547758.07", "-92233720368547758.08"], strict=False) == [
+        None,
+        2**63 - 1,
+        -(2**63),
+    ]
+    with pytest.raises(ValueError):
+        to_paise_batch(["92233720368547758.08"])
+    with pytest.raises(ValueError):
+        decimal_to_paise(Decimal("1e30"))
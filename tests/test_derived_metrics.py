@@ -0,0 +1,147 @@
+from decimal import Decimal
+from io import BytesIO
+
+import pytest
+from openpyxl import load_workbook
+
+from app.services.derived_metrics import Metric, MetricEngine, get_metric_engine, metrics_json, ratio, statement_ratios
+from app.services.excel_generator import ExcelGenerator
+from app.services.filing_store import FilingStore
+from app.services.xbrl_parser import XBRLParserService
+
+INSTANT = {"TotalAssets", "TotalLiabilities", "TotalEquity", "CurrentAssets", "CurrentLiabilities"}
+
+
+def _filing(years: dict) -> bytes:
+    contexts = []
+    facts = []
+    for year, values in years.items():
+        contexts.append(
+            f'<context id="D{year}"><entity><identifier scheme="x">L1</identifier></entity>'
+            f"<period><startDate>{year - 1}-04-01</startDate><endDate>{year}-03-31</endDate></period></context>"
+        )
+        contexts.append(
+            f'<context id="I{year}"><entity><identifier scheme="x">L1</identifier></entity>'
+            f"<period><instant>{year}-03-31</instant></period></context>"
+        )
+        for concept, value in values.items():
+            context = f"I{year}" if concept in INSTANT else f"D{year}"
+            facts.append(f'<ind-as:{concept} contextRef="{context}" unitRef="U1">{value}</ind-as:{concept}>')
+    return (
+        '<xbrl xmlns="http://www.xbrl.org/2003/instance" xmlns:ind-as="http://mca.gov.in/indas/2016">'
+        + "".join(contexts)
+        + '<unit id="U1"><measure>iso4217:INR</measure></unit>'
+        + "".join(facts)
+        + "</xbrl>"
+    ).encode()
+
+
+# Listed newest first; the metrics must still run oldest to newest.
+YEARS = {
+    2024: {"TotalAssets": "1200", "TotalLiabilities": "700", "TotalEquity": "500", "CurrentAssets": "300",
+           "CurrentLiabilities": "200", "RevenueFromOperations": "1100", "ProfitBeforeTax": "120",
+           "TaxExpense": "30", "ProfitAfterTax": "90"},
+    2023: {"TotalAssets": "1000", "TotalLiabilities": "600", "TotalEquity": "400", "RevenueFromOperations": "1000",
+           "ProfitAfterTax": "80"},
+}
+FY23 = "FY2022-23 (2022-04-01 to 2023-03-31)"
+FY24 = "FY2023-24 (2023-04-01 to 2024-03-31)"
+
+
+def test_ratios_read_balance_sheet_fields_at_the_closing_instant():
+    result = XBRLParserService().parse(_filing(YEARS))
+
+    metrics = result.metrics.for_company()
+
+    assert list(result.metrics.frame.periods) == [FY23, FY24]
+    assert metrics["current_ratio"] == {FY24: Decimal("1.5")}
+    assert metrics["return_on_equity"] == {FY23: Decimal("0.2"), FY24: Decimal("0.18")}
+    assert metrics["revenue_growth"] == {FY24: Decimal("0.1")}
+    assert metrics["profit_growth"] == {FY24: Decimal("0.125")}
+    assert "equity" not in metrics
+    assert result.metrics is result.metrics
+
+
+def test_engine_evaluates_each_intermediate_once_across_companies():
+    calls = []
+
+    def counted(*values):
+        calls.append(values)
+        return values[0]
+
+    base = Metric("base", "", ("profit_after_tax",), counted)
+    engine = MetricEngine(
+        [
+            Metric("double", "Double", ("base",), lambda value: value * 2 if value is not None else None),
+            Metric("margin", "Margin", ("base", "operating_revenue"), ratio),
+            base,
+        ]
+    )
+    table = engine.evaluate_results(
+        [
+            ("ALPHA", {FY24: {"profit_after_tax": Decimal("10"), "operating_revenue": Decimal("40")}}),
+            ("BETA", {FY23: {"profit_after_tax": Decimal("3")}, FY24: {"profit_after_tax": Decimal("6")}}),
+        ]
+    )
+
+    assert len(calls) == 3  # one per cell, although two metrics read ``base``
+    assert set(engine.fields) == {"profit_after_tax", "operating_revenue"}
+    assert table.by_company() == {
+        "ALPHA": {"double": {FY24: Decimal("20")}, "margin": {FY24: Decimal("0.25")}},
+        "BETA": {"double": {FY23: Decimal("6"), FY24: Decimal("12")}, "margin": {}},
+    }
+    with pytest.raises(ValueError, match="cycle"):
+        MetricEngine([Metric("a", "A", ("b",), ratio), Metric("b", "B", ("a",), ratio)])
+
+
+def test_metrics_reach_the_workbook_preview_and_filing_store(tmp_path):
+    payload = _filing(YEARS)
+    result = XBRLParserService().parse(payload)
+
+    workbook = load_workbook(BytesIO(ExcelGenerator().generate(result, []).getvalue()))
+    sheet = workbook["Ratios"]
+    assert [cell.value for cell in sheet[1]] == ["Metric", FY23, FY24]
+    assert sheet["A4"].value == "Return on equity"
+    assert (sheet["C4"].value, sheet["C4"].number_format) == (0.18, "0.00%")
+
+    preview = statement_ratios({"total_assets": Decimal("200")}, {"profit_after_tax": Decimal("20")})
+    assert preview == {"return_on_assets": Decimal("0.1")}
+
+    store = FilingStore(tmp_path)
+    writer = store.writer()
+    writer.feed(payload)
+    digest = writer.commit("filing.xml")
+    version = get_metric_engine().version
+    store.save_metrics(digest, metrics_json(result.metrics), version=version)
+    assert store.metrics(digest, version=version)["return_on_equity"] == {FY23: 0.2, FY24: 0.18}
+    assert store.metrics(digest, version="stale") is None
+
+
+def test_stale_or_unwritable_metrics_are_recomputed_from_the_stored_filing(tmp_path, monkeypatch):
+    payload = _filing(YEARS)
+    store = FilingStore(tmp_path)
+    writer = store.writer()
+    writer.feed(payload)
+    digest = writer.commit("filing.xml")
+    store.save_metrics(digest, {"old_ratio": {FY24: 1.0}}, version="old")
+    computed = []
+
+    def compute(path):
+        computed.append(path)
+        return metrics_json(XBRLParserService().parse(path).metrics)
+
+    version = get_metric_engine().version
+    metrics = store.metrics(digest, version=version, compute=compute)
+    assert metrics["return_on_equity"] == {FY23: 0.2, FY24: 0.18}
+    # Filed again under the current version, so the next read does not recompute.
+    assert store.metrics(digest, version=version, compute=compute) == metrics
+    assert computed == [store.path(digest)]
+    assert store.metrics("0" * 64, version=version, compute=compute) is None
+
+    def fail(path, payload):
+        raise PermissionError("read-only")
+
+    monkeypatch.setattr("app.services.filing_store._write_atomically", fail)
+    store.save_metrics(digest, metrics, version="newer")  # logged, not raised
+    assert store.metrics(digest, version="newer", compute=compute) == metrics
+    assert len(computed) == 2
@@ -0,0 +1,134 @@
+from decimal import Decimal
+from textwrap import dedent
+
+import pytest
+
+from app.services.parallel_parser import ParallelParsePool, parse_parallel
+from app.services.xbrl_parser import XBRLParseResult, XBRLParserService
+
+
+def _context(context_id: str, members: str = "", scenario: str = "") -> str:
+    segment = f"<segment>{members}</segment>" if members else ""
+    scenario = f"<scenario>{scenario}</scenario>" if scenario else ""
+    return (
+        f'<context id="{context_id}"><entity><identifier scheme="http://www.mca.gov.in/CIN">L1</identifier>'
+        f"{segment}</entity><period><startDate>2023-04-01</startDate><endDate>2024-03-31</endDate></period>"
+        f"{scenario}</context>"
+    )
+
+
+def _member(axis: str, member: str) -> str:
+    return f'<xbrldi:explicitMember dimension="{axis}">{member}</xbrldi:explicitMember>'
+
+
+PAYLOAD = dedent(
+    """
+    <xbrl xmlns="http://www.xbrl.org/2003/instance" xmlns:ind-as="http://mca.gov.in/indas/2016"
+          xmlns:xbrldi="http://xbrl.org/2006/xbrldi" xmlns:co="http://example.com/co">
+        {contexts}
+        <unit id="U1"><measure>iso4217:INR</measure></unit>
+        <ind-as:Revenue contextRef="C1" unitRef="U1">1000</ind-as:Revenue>
+        <ind-as:Revenue contextRef="RETAIL" unitRef="U1">600</ind-as:Revenue>
+        <ind-as:Revenue contextRef="POWER" unitRef="U1">400</ind-as:Revenue>
+        <ind-as:ProfitAfterTax contextRef="RETAIL" unitRef="U1">60</ind-as:ProfitAfterTax>
+        <ind-as:Revenue contextRef="RETAIL_INDIA" unitRef="U1">450</ind-as:Revenue>
+        <ind-as:Revenue contextRef="PLANT" unitRef="U1">75</ind-as:Revenue>
+    </xbrl>
+    """
+).format(
+    contexts="\n".join(
+        [
+            _context("C1"),
+            _context("RETAIL", _member("ind-as:SegmentsAxis", "co:RetailMember")),
+            _context("POWER", _member("ind-as:SegmentsAxis", "co:PowerMember")),
+            _context(
+                "RETAIL_INDIA",
+                _member("ind-as:SegmentsAxis", "co:RetailMember") + _member("ind-as:GeographicalAreasAxis", "co:IndiaMember"),
+            ),
+            _context(
+                "PLANT",
+                scenario='<xbrldi:typedMember dimension="co:PlantAxis"><co:PlantDomain> Jamnagar </co:PlantDomain></xbrldi:typedMember>',
+            ),
+        ]
+    )
+)
+
+PERIOD = "FY2023-24 (2023-04-01 to 2024-03-31)"
+
+
+def _parse(engine: str) -> XBRLParseResult:
+    service = XBRLParserService(engine=engine)
+    if engine == "parallel":
+        return parse_parallel(service, PAYLOAD.encode(), source="filing.xbrl", pool=ParallelParsePool(0))
+    return service.parse(PAYLOAD.encode(), name="filing.xbrl")
+
+
+@pytest.mark.parametrize("engine", ["etree", "streaming", "parallel"])
+def test_filing_with_only_dimensional_contexts_reads_its_dimension_set(engine):
+    consolidated = _member("ind-as:ConsolidatedAndSeparateFinancialStatementsAxis", "ind-as:ConsolidatedMember")
+    payload = PAYLOAD.replace(_context("C1"), _context("C1", consolidated))
+    payload = payload.split('<ind-as:Revenue contextRef="RETAIL"')[0] + "</xbrl>"
+    service = XBRLParserService(engine=engine)
+    if engine == "parallel":
+        result = parse_parallel(service, payload.encode(), source="filing.xbrl", pool=ParallelParsePool(0))
+    else:
+        result = service.parse(payload.encode(), name="filing.xbrl")
+
+    assert result.statement("income_statement") == {"total_revenue": {PERIOD: Decimal("1000.00")}}
+    assert result.metadata["dimensional_periods"] == {
+        PERIOD: "ConsolidatedAndSeparateFinancialStatementsAxis=ConsolidatedMember"
+    }
+
+
+@pytest.mark.parametrize("engine", ["etree", "streaming", "parallel"])
+def test_dimensional_facts_stay_out_of_the_primary_statements(engine):
+    result = _parse(engine)
+
+    assert result.contexts["RETAIL_INDIA"].dimensions == (
+        ("GeographicalAreasAxis", "IndiaMember"),
+        ("SegmentsAxis", "RetailMember"),
+    )
+    assert result.contexts["PLANT"].dimensions == (("PlantAxis", "Jamnagar"),)
+    assert result.contexts["C1"].dimensions == ()
+    # Segment facts no longer overwrite the entity-level figure for the same period.
+    assert result.statement("income_statement") == {"total_revenue": {PERIOD: Decimal("1000.00")}}
+    assert len(result.audit_trail) == 6
+
+
+@pytest.mark.parametrize("engine", ["etree", "streaming", "parallel"])
+def test_index_lookups_and_segment_statements(engine):
+    index = _parse(engine).index
+
+    assert index.value("total_revenue", PERIOD) == Decimal("1000.00")
+    assert index.value("total_revenue", PERIOD, {"SegmentsAxis": "PowerMember"}) == Decimal("400.00")
+    assert index.value(
+        "total_revenue", PERIOD, [("SegmentsAxis", "RetailMember"), ("GeographicalAreasAxis", "IndiaMember")]
+    ) == Decimal("450.00")
+    assert index.value("total_revenue", PERIOD, {"SegmentsAxis": "MiningMember"}) is None
+    assert index.value("profit_after_tax", PERIOD) is None
+    assert index.concept_value("Revenue", PERIOD, {"PlantAxis": "Jamnagar"}) == Decimal("75.00")
+
+    assert index.members("SegmentsAxis") == ["RetailMember", "PowerMember"]
+    segments = index.by_member("SegmentsAxis")
+    assert list(segments) == ["RetailMember", "PowerMember"]
+    assert segments["RetailMember"]["income_statement"] == {
+        "total_revenue": {PERIOD: Decimal("600.00")},
+        "profit_after_tax": {PERIOD: Decimal("60.00")},
+    }
+    assert segments["PowerMember"] == {
+        "income_statement": {"total_revenue": {PERIOD: Decimal("400.00")}},
+        "balance_sheet": {},
+        "cash_flow": {},
+    }
+    assert index.statements() == _parse(engine).statements
+    assert index.slice("SegmentsAxis", "RetailMember") == [1, 3, 4]
+    assert list(index.rows({"GeographicalAreasAxis": "IndiaMember"})) == []
+
+
+def test_dimensions_survive_the_binary_encoding():
+    result = _parse("etree")
+    decoded = XBRLParseResult.from_buffer(result.to_bytes())
+
+    assert decoded.contexts == result.contexts
+    assert decoded.statements == result.statements
+    assert decoded.index.by_member("SegmentsAxis") == result.index.by_member("SegmentsAxis")
@@ -0,0 +1,82 @@
+import pickle
+from decimal import Decimal
+
+from app.services.fact_table import AuditRecord, AuditTrailView, FactTable
+from app.services.validation_service import ValidationService
+
+
+def _table() -> FactTable:
+    table = FactTable()
+    table.append("balance_sheet", "total_assets", "TotalAssets", "C1", "FY2023-24", "iso4217:INR", 100_000)
+    table.append("balance_sheet", "total_liabilities", "TotalLiabilities", "C1", "FY2023-24", "iso4217:INR", 60_000)
+    table.append("balance_sheet", "shareholders_equity", "ShareholdersEquity", "C1", "FY2023-24", None, 40_000)
+    # Same period through a second context; the later value wins in statement views.
+    table.append("balance_sheet", "total_assets", "TotalAssets", "C2", "FY2023-24", "iso4217:INR", 100_050)
+    return table
+
+
+def test_statement_matrix_keeps_latest_value_per_period():
+    matrix = _table().statement_matrix()
+
+    assert matrix["balance_sheet"]["total_assets"] == {"FY2023-24": Decimal("1000.50")}
+    assert list(matrix["balance_sheet"]) == ["total_assets", "total_liabilities", "shareholders_equity"]
+    assert matrix["income_statement"] == {}
+
+
+def test_audit_trail_view_materialises_records_lazily():
+    table = _table()
+    trail = AuditTrailView(table)
+
+    assert len(trail) == 4
+    assert trail[-1] == AuditRecord(
+        statement="balance_sheet",
+        field="total_assets",
+        concept="TotalAssets",
+        context_ref="C2",
+        period="FY2023-24",
+        unit="iso4217:INR",
+        value=Decimal("1000.50"),
+    )
+    assert trail[2].unit is None
+    assert list(trail) == trail[:]
+
+
+def test_fact_table_round_trips_through_pickle():
+    table = _table()
+    restored = pickle.loads(pickle.dumps(table))
+
+    assert list(restored.rows()) == list(table.rows())
+    assert restored.contexts.code("C3") == 2
+
+
+def test_validate_fact_table_matches_statement_validation():
+    table = _table()
+    service = ValidationService()
+
+    from_table = service.validate_fact_table(table)
+    from_statements = service.validate_statements(table.statement_matrix())
+
+    assert from_table == from_statements
+    assert [message.passed for message in from_table] == [True]
+
+
+def test_period_without_plain_contexts_reads_its_single_dimension_set():
+    table = FactTable()
+    consolidated = "ConsolidatedAxis=ConsolidatedMember"
+    table.append("balance_sheet", "total_assets", "TotalAssets", "C1", "FY2023-24", None, 100_000, dimensions=consolidated)
+    table.append("balance_sheet", "total_assets", "TotalAssets", "C2", "FY2022-23", None, 90_000)
+    table.append("balance_sheet", "total_assets", "TotalAssets", "C3", "FY2022-23", None, 5_000, dimensions=consolidated)
+
+    matrix = table.statement_matrix()
+
+    assert matrix["balance_sheet"]["total_assets"] == {"FY2023-24": Decimal("1000"), "FY2022-23": Decimal("900")}
+    assert table.dimensional_periods() == {"FY2023-24": consolidated}
+
+
+def test_period_with_several_dimension_sets_is_left_out():
+    table = FactTable()
+    table.append("balance_sheet", "total_assets", "TotalAssets", "C1", "FY2023-24", None, 60_000, dimensions="SegmentsAxis=RetailMember")
+    table.append("balance_sheet", "total_assets", "TotalAssets", "C2", "FY2023-24", None, 40_000, dimensions="SegmentsAxis=EnergyMember")
+
+    assert table.statement_matrix()["balance_sheet"] == {}
+    assert table.dimensional_periods() == {"FY2023-24": None}
@@ -0,0 +1,155 @@
+import os
+from io import BytesIO
+from textwrap import dedent
+
+import pytest
+from openpyxl import load_workbook
+
+from app.services.excel_generator import ExcelGenerator
+from app.services.filing_store import FilingStore
+from app.services.parallel_parser import ParallelParsePool, parse_parallel
+from app.services.parse_options import ParseOptions
+from app.services.xbrl_parser import XBRLParserService
+
+INSTANCE = dedent(
+    """
+    <xbrl xmlns="http://www.xbrl.org/2003/instance" xmlns:ind-as="http://mca.gov.in/indas/2016">
+        <context id="C1">
+            <entity><identifier scheme="http://www.mca.gov.in/CIN">L12345MH1956PLC012345</identifier></entity>
+            <period><startDate>2023-04-01</startDate><endDate>2024-03-31</endDate></period>
+        </context>
+        <unit id="U1"><measure>iso4217:INR</measure></unit>
+        <!-- <ind-as:TotalAssets contextRef="C1" unitRef="U1">1</ind-as:TotalAssets> -->
+        <ind-as:NotesTextBlock contextRef="C1"><![CDATA[<p>See </ind-as:Other> note</p>]]></ind-as:NotesTextBlock>
+        <ind-as:TotalAssets contextRef="C1" unitRef="U1">1000</ind-as:TotalAssets>
+        <ind-as:OtherIncome contextRef="C1" unitRef="U1" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:nil="true"/>
+        <ind-as:TotalLiabilities
+            unitRef="U1" contextRef="C1">600</ind-as:TotalLiabilities>
+        <ind-as:Revenue contextRef="C1" unitRef="U1">900</ind-as:Revenue>
+    </xbrl>
+    """
+).encode()
+
+INLINE = dedent(
+    """
+    <html xmlns="http://www.w3.org/1999/xhtml" xmlns:ix="http://www.xbrl.org/2013/inlineXBRL"
+          xmlns:xbrli="http://www.xbrl.org/2003/instance" xmlns:ind-as="http://mca.gov.in/indas/2016"><body>
+        <div style="display:none"><ix:header><ix:resources>
+            <xbrli:context id="C1"><xbrli:entity><xbrli:identifier scheme="x">L1</xbrli:identifier></xbrli:entity>
+            <xbrli:period><xbrli:instant>2024-03-31</xbrli:instant></xbrli:period></xbrli:context>
+            <xbrli:unit id="U1"><xbrli:measure>iso4217:INR</xbrli:measure></xbrli:unit>
+        </ix:resources></ix:header></div>
+        <p><ix:nonFraction name="ind-as:TotalAssets" contextRef="C1" unitRef="U1">1,000</ix:nonFraction></p>
+        <p><ix:nonFraction name="ind-as:Revenue" contextRef="C1" unitRef="U1">900</ix:nonFraction></p>
+    </body></html>
+    """
+).encode()
+
+
+def _store(tmp_path, payload: bytes, name: str):
+    store = FilingStore(tmp_path / "filings")
+    writer = store.writer()
+    for start in range(0, len(payload), 100):
+        writer.feed(memoryview(payload)[start : start + 100])
+    return store, writer.commit(name)
+
+
+@pytest.mark.parametrize("engine", ["etree", "streaming", "parallel"])
+def test_audit_records_resolve_to_their_source_xml(tmp_path, engine):
+    store, digest = _store(tmp_path, INSTANCE, "filing.xbrl")
+    service = XBRLParserService(engine=engine)
+    if engine == "parallel":
+        result = parse_parallel(service, INSTANCE, source="filing.xbrl", pool=ParallelParsePool(0))
+    else:
+        result = service.parse(INSTANCE, name="filing.xbrl")
+
+    excerpts = {record.field: store.excerpt(digest, record.source_fact) for record in result.audit_trail}
+
+    assert excerpts["total_assets"] == b'<ind-as:TotalAssets contextRef="C1" unitRef="U1">1000</ind-as:TotalAssets>'
+    assert excerpts["total_liabilities"].startswith(b"<ind-as:TotalLiabilities\n")
+    assert excerpts["total_liabilities"].endswith(b">600</ind-as:TotalLiabilities>")
+    assert excerpts["total_revenue"] == b'<ind-as:Revenue contextRef="C1" unitRef="U1">900</ind-as:Revenue>'
+    assert store.excerpt(digest, 0).endswith(b"]]></ind-as:NotesTextBlock>")
+    assert store.excerpt(digest, 5) is None
+    assert store.excerpt("0" * 64, 0) is None
+    assert store.excerpt("../etc/passwd", 0) is None
+
+
+def test_inline_facts_and_audit_sheet_links(tmp_path):
+    store, digest = _store(tmp_path, INLINE, "filing.html")
+    result = XBRLParserService().parse(INLINE, name="filing.html")
+
+    records = list(result.audit_trail)
+    assert [store.excerpt(digest, record.source_fact) for record in records] == [
+        b'<ix:nonFraction name="ind-as:TotalAssets" contextRef="C1" unitRef="U1">1,000</ix:nonFraction>',
+        b'<ix:nonFraction name="ind-as:Revenue" contextRef="C1" unitRef="U1">900</ix:nonFraction>',
+    ]
+
+    workbook = ExcelGenerator().generate(result, [], source_url=f"http://testserver/filings/{digest}/facts")
+    sheet = load_workbook(BytesIO(workbook.getvalue()))["Audit Trail"]
+    assert sheet.cell(row=1, column=8).value == "Source"
+    assert sheet.cell(row=2, column=8).hyperlink.target == f"http://testserver/filings/{digest}/facts/{records[0].source_fact}"
+
+
+def test_discarded_uploads_leave_nothing_behind(tmp_path):
+    store = FilingStore(tmp_path / "filings")
+    writer = store.writer()
+    writer.feed(b"<xbrl/>")
+    writer.discard()
+    writer.discard()
+
+    assert list((tmp_path / "filings").iterdir()) == []
+    assert store.writer().commit("empty.xbrl") is None
+
+
+def test_store_prunes_least_recently_used_filings_with_their_sidecars(tmp_path):
+    store = FilingStore(tmp_path / "filings", max_bytes=2500)
+    digests = []
+    for position, payload in enumerate((b"a" * 800, b"b" * 800, b"c" * 800)):
+        writer = store.writer()
+        writer.feed(payload)
+        digest = writer.commit("filing.xbrl")
+        # Distinct ages without sleeping.
+        os.utime(store.path(digest), (1000 + position, 1000 + position))
+        digests.append(digest)
+    store.save_metrics(digests[0], {"current_ratio": {"2024": 1.5}}, version="1")
+    assert store.metrics(digests[0], version="1") == {"current_ratio": {"2024": 1.5}}
+
+    writer = store.writer()
+    writer.feed(b"d" * 800)
+    newest = writer.commit("filing.xbrl")
+
+    assert store.path(digests[1]) is None
+    assert store.path(digests[0]) is not None
+    assert store.path(newest) is not None
+    assert not list((tmp_path / "filings").glob(f"*/{digests[1]}*"))
+
+
+def test_projected_inline_facts_keep_positions_while_definitions_are_pending(tmp_path):
+    # The first fact closes before its context is defined, so it waits; the projected-out
+    # Revenue fact after it must still be numbered after it.
+    payload = dedent(
+        """
+        <html xmlns="http://www.w3.org/1999/xhtml" xmlns:ix="http://www.xbrl.org/2013/inlineXBRL"
+              xmlns:xbrli="http://www.xbrl.org/2003/instance" xmlns:ind-as="http://mca.gov.in/indas/2016"><body>
+            <p><ix:nonFraction name="ind-as:TotalAssets" contextRef="C1" unitRef="U1">1,000</ix:nonFraction></p>
+            <p><ix:nonFraction name="ind-as:Revenue" contextRef="C1" unitRef="U1">900</ix:nonFraction></p>
+            <div style="display:none"><ix:header><ix:resources>
+                <xbrli:context id="C1"><xbrli:entity><xbrli:identifier scheme="x">L1</xbrli:identifier></xbrli:entity>
+                <xbrli:period><xbrli:instant>2024-03-31</xbrli:instant></xbrli:period></xbrli:context>
+                <xbrli:unit id="U1"><xbrli:measure>iso4217:INR</xbrli:measure></xbrli:unit>
+            </ix:resources></ix:header></div>
+            <p><ix:nonFraction name="ind-as:TotalLiabilities" contextRef="C1" unitRef="U1">600</ix:nonFraction></p>
+        </body></html>
+        """
+    ).encode()
+    store, digest = _store(tmp_path, payload, "filing.html")
+    options = ParseOptions(fields={"total_assets", "total_liabilities"})
+    result = XBRLParserService(options=options).parse(payload, name="filing.html")
+
+    excerpts = {record.field: store.excerpt(digest, record.source_fact) for record in result.audit_trail}
+
+    assert excerpts == {
+        "total_assets": b'<ix:nonFraction name="ind-as:TotalAssets" contextRef="C1" unitRef="U1">1,000</ix:nonFraction>',
+        "total_liabilities": b'<ix:nonFraction name="ind-as:TotalLiabilities" contextRef="C1" unitRef="U1">600</ix:nonFraction>',
+    }
@@ -1,4 +1,14 @@
-from app.utils.ind_as_mapper import ConceptMapping, resolve_concept
+from app.utils.ind_as_mapper import (
+    CONCEPTS_SOURCE,
+    IND_AS_NAMESPACES,
+    REGISTRY_ARTIFACT,
+    ConceptMapping,
+    ConceptRegistry,
+    get_registry,
+    load_registry,
+    resolve_concept,
+    write_artifact,
+)
 
 
 def test_resolve_concept_with_prefix():
@@ -13,3 +23,44 @@ def test_resolve_concept_without_prefix():
     assert mapping is not None
     assert mapping.statement == "income_statement"
     assert mapping.field == "operating_revenue"
+
+
+def test_registry_resolves_namespaced_tags_and_unknown_namespaces():
+    registry = get_registry()
+
+    assert registry.resolve(f"{{{IND_AS_NAMESPACES['ind-as']}}}TotalAssets").field == "total_assets"
+    assert registry.resolve("{http://mca.gov.in/indas/2016}CashAndCashEquivalents").statement == "cash_flow"
+    assert registry.resolve("{http://example.com/other}profitaftertax").field == "profit_after_tax"
+    assert registry.resolve("{http://example.com/other}NotAConcept") is None
+
+
+def test_registry_artifact_round_trip_and_in_memory_compile_when_stale(tmp_path):
+    source_path = tmp_path / "concepts.csv"
+    artifact_path = tmp_path / "concepts.registry"
+    source_path.write_text("concept,statement,field,description\nFooBar,balance_sheet,foo_bar,Foo\n")
+
+    compiled = load_registry(source_path, artifact_path)
+    assert not artifact_path.exists()
+    write_artifact(compiled, artifact_path)
+    loaded = load_registry(source_path, artifact_path)
+    assert loaded.version == compiled.version
+    assert loaded.resolve("FooBar") == ConceptMapping("balance_sheet", "foo_bar", "Foo")
+
+    source_path.write_text("concept,statement,field,description\nFooBar,cash_flow,foo_bar,\n")
+    written = artifact_path.read_bytes()
+    refreshed = load_registry(source_path, artifact_path)
+    assert refreshed.version != compiled.version
+    assert refreshed.resolve("FooBar").statement == "cash_flow"
+    # Runtime loads never write; only the build step refreshes the artifact.
+    assert artifact_path.read_bytes() == written
+
+
+def test_committed_artifact_matches_concept_table():
+    # Rebuild with ``python -m app.utils.ind_as_mapper`` after editing the concept table.
+    artifact = ConceptRegistry.from_artifact(REGISTRY_ARTIFACT.read_bytes())
+    compiled = ConceptRegistry.compile_source(CONCEPTS_SOURCE.read_bytes(), namespaces=IND_AS_NAMESPACES)
+
+    assert artifact.version == compiled.version == get_registry().version
+    assert {name: artifact.resolve(name) for name in artifact.concepts()} == {
+        name: compiled.resolve(name) for name in compiled.concepts()
+    }
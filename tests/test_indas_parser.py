@@ -0,0 +1,124 @@
+from dataclasses import replace
+from datetime import date
+from decimal import Decimal
+from textwrap import dedent
+from types import SimpleNamespace
+from xml.etree import ElementTree as ET
+
+from app.parsers.xbrl_parser import IndASXBRLParser
+from app.services.parse_options import STATEMENTS_ONLY, ParseOptions
+from app.services.xbrl_service import XBRLExtractionService
+
+
+MULTI_CONTEXT_XBRL = dedent(
+    """
+    <xbrl xmlns="http://www.xbrl.org/2003/instance" xmlns:in-gaap="http://example.com/in-gaap">
+        <context id="FY24">
+            <period>
+                <startDate>2023-04-01</startDate>
+                <endDate>2024-03-31</endDate>
+            </period>
+        </context>
+        <context id="FY23">
+            <period>
+                <startDate>2022-04-01</startDate>
+                <endDate>2023-03-31</endDate>
+            </period>
+        </context>
+        <context id="I24">
+            <period>
+                <instant>2024-03-31</instant>
+            </period>
+        </context>
+        <unit id="U1">
+            <measure>iso4217:INR</measure>
+        </unit>
+        <in-gaap:Revenue contextRef="FY23" unitRef="U1">800</in-gaap:Revenue>
+        <in-gaap:Revenue contextRef="FY24" unitRef="U1">900</in-gaap:Revenue>
+        <in-gaap:TotalAssets contextRef="FY23" unitRef="U1">1500</in-gaap:TotalAssets>
+        <in-gaap:TotalAssets contextRef="I24" unitRef="U1">2000</in-gaap:TotalAssets>
+    </xbrl>
+    """
+)
+
+
+def test_fact_index_picks_facts_by_primary_context():
+    index = IndASXBRLParser._build_fact_index(ET.fromstring(MULTI_CONTEXT_XBRL))
+    context_id, (start, end) = IndASXBRLParser._primary_context(index)
+
+    assert context_id == "FY24"
+    assert (start.isoformat(), end.isoformat()) == ("2023-04-01", "2024-03-31")
+    assert index.units == {"U1": "INR"}
+    revenue_facts = index.facts["income_statement"]["total_revenue"]
+    assert len(revenue_facts) == 2
+    assert IndASXBRLParser._select_fact(index, revenue_facts, context_id).text == "900"
+    assert IndASXBRLParser._select_fact(index, index.facts["balance_sheet"]["total_assets"], context_id).text == "2000"
+    assert "total_equity" not in index.facts["balance_sheet"]
+
+
+def test_parse_document_maps_registry_concepts(tmp_path):
+    sample_path = tmp_path / "multi.xbrl"
+    sample_path.write_text(MULTI_CONTEXT_XBRL)
+
+    bundle = IndASXBRLParser().parse_document(sample_path)
+
+    assert bundle.income_statement == {"total_revenue": Decimal("900")}
+    assert bundle.balance_sheet == {"total_assets": Decimal("2000")}
+    assert bundle.metadata["financial_year"] == "FY2023-24"
+
+
+def test_parse_document_projects_onto_requested_statements():
+    options = ParseOptions(statements=frozenset({"balance_sheet"}))
+
+    bundle = IndASXBRLParser(options=options).parse_document(MULTI_CONTEXT_XBRL.encode("utf-8"))
+
+    assert bundle.income_statement == {}
+    assert bundle.balance_sheet == {"total_assets": Decimal("2000")}
+
+
+def test_extraction_cache_namespace_separates_projections():
+    full = XBRLExtractionService(parser=IndASXBRLParser())
+    lean = XBRLExtractionService(parser=IndASXBRLParser(options=STATEMENTS_ONLY))
+
+    assert full.cache_namespace != lean.cache_namespace
+
+
+def test_incremental_document_matches_parse_document():
+    payload = MULTI_CONTEXT_XBRL.encode("utf-8")
+    document = IndASXBRLParser().incremental(name="upload.xbrl")
+    for offset in range(0, len(payload), 16):
+        document.feed(payload[offset : offset + 16])
+
+    bundle = document.close()
+
+    assert bundle == IndASXBRLParser().parse_document(payload, name="upload.xbrl")
+    assert bundle.metadata["source"] == "upload.xbrl"
+
+
+def test_pyxbrl_engine_maps_registry_concepts(monkeypatch):
+    from app.parsers import xbrl_parser
+
+    class Fact:
+        def __init__(self, name, value, unit_id="U1"):
+            self.name, self.value, self.unit_id = name, value, unit_id
+
+    class Document:
+        facts = [Fact("in-gaap:Revenue", "900"), Fact("ind-as:TotalAssets", "2000"), Fact("Unmapped", "1")]
+        units = [SimpleNamespace(id="U1", measures=["INR"])]
+        contexts = [SimpleNamespace(period=SimpleNamespace(start_date=date(2023, 4, 1), end_date=date(2024, 3, 31)))]
+
+    class StubParser:
+        def parse(self, payload):
+            assert payload == b"<xbrl/>"
+            return Document()
+
+    engine = xbrl_parser.INDAS_ENGINES.engine("pyxbrl")
+    monkeypatch.setattr(xbrl_parser, "XBRLParser", StubParser)
+    monkeypatch.setitem(xbrl_parser.INDAS_ENGINES._engines, "pyxbrl", replace(engine, available=True))
+
+    bundle = IndASXBRLParser().parse_document(b"<xbrl/>", name="stub.xbrl")
+
+    assert bundle.income_statement == {"total_revenue": Decimal("900")}
+    assert bundle.balance_sheet == {"total_assets": Decimal("2000")}
+    assert bundle.metadata["period_end"] == "2024-03-31"
+    assert bundle.metadata["financial_year"] == "FY2023-24"
@@ -0,0 +1,94 @@
+import re
+
+import pytest
+
+from app.services import parallel_parser
+from app.services.parallel_parser import ParallelParsePool, PartitionError, parse_parallel, partition
+from app.services.parse_budget import ParseBudget, ParseBudgetExceeded
+from app.services.xbrl_parser import PARSER_ENGINES, XBRLParserService
+
+HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<xbrli:xbrl xmlns:xbrli="http://www.xbrl.org/2003/instance" xmlns:ind-as="http://mca.gov.in/indas/2016">'
+)
+
+
+def _context(index: int) -> str:
+    return (
+        f'<xbrli:context id="C{index}"><xbrli:entity><xbrli:identifier scheme="x">L{index}</xbrli:identifier>'
+        f"</xbrli:entity><xbrli:period><xbrli:instant>{2015 + index}-03-31</xbrli:instant></xbrli:period></xbrli:context>"
+    )
+
+
+def _instance(facts: int) -> bytes:
+    parts = [HEADER, _context(0), '<xbrli:unit id="U1"><xbrli:measure>iso4217:INR</xbrli:measure></xbrli:unit>']
+    parts.append("<!-- <xbrli:context id=\"Ghost\"> is not a definition -->")
+    for index in range(facts):
+        if index == facts // 2:
+            # Defined mid-document, after facts that already use other contexts.
+            parts.append(_context(1))
+        concept = ("TotalAssets", "Revenue", "UnknownMetric")[index % 3]
+        parts.append(f'<ind-as:{concept} contextRef="C{index % 2}" unitRef="U1">{index}</ind-as:{concept}>')
+    parts.append("</xbrli:xbrl>")
+    return "\n".join(parts).encode()
+
+
+@pytest.fixture
+def small_ranges(monkeypatch):
+    monkeypatch.setattr(parallel_parser, "MIN_RANGE_BYTES", 1024)
+
+
+def test_partition_finds_definitions_and_cuts_at_facts(small_ranges):
+    payload = _instance(2000)
+    layout = partition(payload, 8)
+
+    assert layout.root_open.startswith(b'<?xml version="1.0" encoding="UTF-8"?><xbrli:xbrl ')
+    assert layout.definitions.count(b"<xbrli:context ") == 2
+    assert b"Ghost" not in layout.definitions
+    assert len(layout.ranges) == 8
+    for left, right in layout.ranges[1:]:
+        assert payload[left:].startswith(b"<ind-as:")
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_parallel_parse_matches_sequential_parse(small_ranges, workers):
+    payload = _instance(3000)
+    expected = XBRLParserService(engine="streaming").parse(payload)
+    pool = ParallelParsePool(max_workers=workers)
+    try:
+        result = parse_parallel(XBRLParserService(), memoryview(payload), source="<memory>", pool=pool)
+    finally:
+        pool.shutdown()
+
+    assert result.statements == expected.statements
+    assert result.audit_trail == expected.audit_trail
+    assert result.unmapped_facts == expected.unmapped_facts
+    assert result.metadata == expected.metadata
+    assert result.contexts == expected.contexts
+
+
+def test_unpartitionable_documents_fall_back_to_streaming(small_ranges, monkeypatch):
+    monkeypatch.setattr(parallel_parser, "get_parallel_pool", lambda: ParallelParsePool(max_workers=0))
+    # Facts nested in tuples: every cut lands inside one and the ranges are not well-formed.
+    payload = re.sub(rb"(<ind-as:\w+ contextRef.*?</ind-as:\w+>)", rb"<ind-as:Group>\1</ind-as:Group>", _instance(2000))
+    with pytest.raises(PartitionError):
+        parse_parallel(XBRLParserService(), payload, source="<memory>", pool=ParallelParsePool(max_workers=0))
+
+    before = PARSER_ENGINES.stats()["parallel"]["fallbacks"]
+    result = XBRLParserService(engine="parallel").parse(payload)
+    assert result.statements == XBRLParserService(engine="streaming").parse(payload).statements
+    assert PARSER_ENGINES.stats()["parallel"]["fallbacks"] == before + 1
+
+
+def test_worker_budget_abort_reaches_caller_and_pool_stays_usable(small_ranges):
+    payload = _instance(3000)
+    pool = ParallelParsePool(max_workers=2)
+    try:
+        with pytest.raises(ParseBudgetExceeded) as excinfo:
+            parse_parallel(XBRLParserService(budget=ParseBudget(max_facts=100)), payload, source="<memory>", pool=pool)
+        assert excinfo.value.limit == "max_facts"
+
+        result = parse_parallel(XBRLParserService(), payload, source="<memory>", pool=pool)
+    finally:
+        pool.shutdown()
+    assert result.statements == XBRLParserService(engine="streaming").parse(payload).statements
@@ -0,0 +1,119 @@
+import pickle
+import time
+
+import pytest
+
+from app.parsers.xbrl_parser import IndASXBRLParser
+from app.services.parse_budget import UPLOAD_BUDGET, BudgetMeter, ParseBudget, ParseBudgetExceeded
+from app.services.xbrl_parser import PARSER_ENGINES, XBRLParserService
+
+
+def _instance(contexts: int, facts: int, nesting: int = 0) -> bytes:
+    parts = ['<xbrl xmlns="http://www.xbrl.org/2003/instance" xmlns:ind-as="http://mca.gov.in/indas/2016">']
+    for index in range(contexts):
+        parts.append(
+            f'<context id="C{index}"><entity><identifier scheme="x">L1</identifier></entity>'
+            f"<period><instant>2024-03-31</instant></period></context>"
+        )
+    parts.append('<unit id="U1"><measure>iso4217:INR</measure></unit>')
+    parts.extend(f'<ind-as:Revenue contextRef="C0" unitRef="U1">{index}</ind-as:Revenue>' for index in range(facts))
+    parts.append("<a>" * nesting + "</a>" * nesting)
+    parts.append("</xbrl>")
+    return "".join(parts).encode()
+
+
+@pytest.mark.parametrize("engine", ["etree", "streaming", "lxml"])
+@pytest.mark.parametrize(
+    ("budget", "payload", "limit"),
+    [
+        (ParseBudget(max_facts=50), _instance(1, 51), "max_facts"),
+        (ParseBudget(max_contexts=10), _instance(11, 1), "max_contexts"),
+        (ParseBudget(max_depth=64), _instance(1, 1, nesting=100), "max_depth"),
+    ],
+)
+def test_engines_abort_when_budget_is_exceeded(engine, budget, payload, limit):
+    if engine not in PARSER_ENGINES.available():
+        pytest.skip(f"{engine} engine is not installed")
+    before = PARSER_ENGINES.stats()[engine]["budget_aborts"]
+
+    with pytest.raises(ParseBudgetExceeded) as excinfo:
+        XBRLParserService(engine=engine, budget=budget).parse(payload)
+
+    assert excinfo.value.limit == limit
+    assert PARSER_ENGINES.stats()[engine]["budget_aborts"] == before + 1
+    # The same payload parses within a budget that covers it.
+    XBRLParserService(engine=engine, budget=ParseBudget(max_facts=51, max_contexts=11, max_depth=128)).parse(payload)
+
+
+def test_incremental_parse_aborts_mid_upload():
+    parse = XBRLParserService(budget=ParseBudget(max_facts=100)).incremental(name="huge.xbrl")
+    payload = _instance(1, 5000)
+
+    with pytest.raises(ParseBudgetExceeded):
+        for offset in range(0, len(payload), 4096):
+            parse.feed(payload[offset : offset + 4096])
+    assert parse.size < len(payload)
+
+
+def test_meter_only_charges_time_while_running():
+    meter = BudgetMeter(ParseBudget(max_seconds=0.05))
+    meter.pause()
+    time.sleep(0.08)
+    meter.check()
+
+    meter.resume()
+    time.sleep(0.08)
+    with pytest.raises(ParseBudgetExceeded) as excinfo:
+        meter.check()
+    assert excinfo.value.limit == "max_seconds"
+
+
+def test_budget_exceeded_survives_pickling():
+    error = pickle.loads(pickle.dumps(ParseBudgetExceeded("max_facts", 10, 11)))
+
+    assert isinstance(error, ParseBudgetExceeded)
+    assert (error.limit, error.allowed, error.observed) == ("max_facts", 10, 11)
+    assert str(error) == "Parse budget exceeded: max_facts is limited to 10, reached 11"
+
+
+def test_upload_budget_does_not_meter_shared_process_memory():
+    # Uploads parse in API threads; a process-wide peak would charge one request for another's.
+    assert UPLOAD_BUDGET.max_memory_growth is None
+
+
+@pytest.mark.parametrize("engine", ["etree", "streaming"])
+def test_parse_memory_is_metered_per_parse(engine):
+    payload = _instance(2000, 20000)
+    held = []
+
+    class RecordingMeter(BudgetMeter):
+        __slots__ = ()
+
+        def check(self):
+            held.append(self.memory)
+            super().check()
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr("app.services.xbrl_parser.BudgetMeter", RecordingMeter)
+        XBRLParserService(engine=engine).parse(payload)
+    # Fact columns and 2,000 contexts alone are well over a megabyte; a DOM tree reserves more.
+    assert max(held) > 1024 * 1024
+
+    with pytest.raises(ParseBudgetExceeded) as excinfo:
+        XBRLParserService(engine=engine, budget=ParseBudget(max_memory=256 * 1024)).parse(payload)
+    assert excinfo.value.limit == "max_memory"
+
+
+def test_indas_preview_parser_applies_its_budget():
+    payload = _instance(20, 200, nesting=100)
+
+    with pytest.raises(ParseBudgetExceeded) as excinfo:
+        IndASXBRLParser(budget=ParseBudget(max_depth=64)).parse_document(payload)
+    assert excinfo.value.limit == "max_depth"
+    with pytest.raises(ParseBudgetExceeded) as excinfo:
+        IndASXBRLParser(budget=ParseBudget(max_facts=100)).parse_document(_instance(1, 101))
+    assert excinfo.value.limit == "max_facts"
+    with pytest.raises(ParseBudgetExceeded) as excinfo:
+        IndASXBRLParser(budget=ParseBudget(max_memory=len(payload))).parse_document(payload)
+    assert excinfo.value.limit == "max_memory"
+    assert UPLOAD_BUDGET.max_memory is not None
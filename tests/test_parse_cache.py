@@ -0,0 +1,121 @@
+import io
+import os
+from decimal import Decimal
+from pathlib import Path
+
+from app.services import xbrl_parser
+from app.services.parse_cache import ParseCache
+from app.services.xbrl_parser import XBRLParserService
+
+SAMPLE_XBRL = (Path(__file__).resolve().parents[1] / "sample_data" / "sample.xbrl").read_text()
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ParseCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["memory_hits"] == 2
+    assert stats["misses"] == 1
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    first = ParseCache(tmp_path, max_entries=4)
+    calls = []
+    first.get_or_compute("digest", "ns", lambda: calls.append(1) or {"value": 1})
+
+    second = ParseCache(tmp_path, max_entries=4)
+    value = second.get_or_compute("digest", "ns", lambda: calls.append(2) or {"value": 2})
+
+    assert value == {"value": 1}
+    assert calls == [1]
+    assert second.stats()["disk_hits"] == 1
+    assert second.get(ParseCache.key("digest", "other-version")) is None
+
+
+def test_disk_tier_evicts_least_recently_used_entries_by_size(tmp_path):
+    cache = ParseCache(tmp_path, max_entries=0, max_disk_bytes=2500)
+    for name in ("a", "b", "c"):
+        cache.put(name, b"x" * 800)
+        path = cache._path_for(name)
+        # Distinct ages without sleeping; "a" is read back below and becomes the newest.
+        os.utime(path, (1000 + ord(name), 1000 + ord(name)))
+    assert cache.get("a") == b"x" * 800
+
+    cache.put("d", b"x" * 800)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"x" * 800
+    assert cache.get("d") == b"x" * 800
+    assert cache.stats()["disk_evictions"] >= 1
+    assert sum(path.stat().st_size for path in tmp_path.glob("*/*.pickle")) <= 2500
+
+
+def test_parser_reuses_cached_result_for_identical_payload(tmp_path):
+    cache = ParseCache(tmp_path / "cache")
+    parser = XBRLParserService(cache=cache)
+    first_path = tmp_path / "first.xbrl"
+    second_path = tmp_path / "second.xbrl"
+    first_path.write_text(SAMPLE_XBRL)
+    second_path.write_text(SAMPLE_XBRL)
+
+    first = parser.parse(first_path)
+    second = parser.parse(second_path)
+
+    assert cache.stats()["memory_hits"] == 1
+    assert second.facts is first.facts
+    assert second.metadata["source"] == str(second_path)
+    assert first.metadata["source"] == str(first_path)
+    period = next(iter(second.statements["balance_sheet"]["total_assets"]))
+    assert second.statements["balance_sheet"]["total_assets"][period] == Decimal("1000")
+
+
+def test_repeat_incremental_upload_skips_finalisation(tmp_path, monkeypatch):
+    parser = XBRLParserService(cache=ParseCache(tmp_path / "cache"))
+    payload = SAMPLE_XBRL.encode("utf-8")
+
+    def upload(name):
+        parse = parser.incremental(name=name)
+        for start in range(0, len(payload), 64):
+            parse.feed(payload[start : start + 64])
+        return parse.close()
+
+    first = upload("first.xbrl")
+
+    def finalise(self, *, source):
+        raise AssertionError("finalised although the upload was cached")
+
+    monkeypatch.setattr(xbrl_parser._StreamingXMLEngine, "close", finalise)
+    second = upload("second.xbrl")
+
+    assert second.facts is first.facts
+    assert second.metadata["source"] == "second.xbrl"
+
+
+def test_cached_parse_of_non_seekable_stream(tmp_path):
+    class OneShotStream(io.RawIOBase):
+        def __init__(self, payload: bytes) -> None:
+            self._inner = io.BytesIO(payload)
+
+        def readable(self) -> bool:
+            return True
+
+        def readinto(self, buffer) -> int:
+            chunk = self._inner.read(len(buffer))
+            buffer[: len(chunk)] = chunk
+            return len(chunk)
+
+    parser = XBRLParserService(cache=ParseCache(max_entries=4))
+    payload = SAMPLE_XBRL.encode("utf-8")
+
+    first = parser.parse(OneShotStream(payload), name="first.xbrl")
+    second = parser.parse(payload, name="second.xbrl")
+
+    assert second.facts is first.facts
+    assert second.metadata["source"] == "second.xbrl"
@@ -0,0 +1,131 @@
+import io
+from pathlib import Path
+from xml.etree import ElementTree as ET
+
+import pytest
+
+from app.services.parser_engines import INLINE, INSTANCE, EngineRegistry, ParserEngine, Workload, size_policy
+from app.services.xbrl_parser import PARSER_ENGINES, XBRLParserService
+
+SAMPLE_PATH = Path(__file__).resolve().parents[1] / "sample_data" / "sample.xbrl"
+
+
+def _registry(calls):
+    registry = EngineRegistry(
+        size_policy(dom_max_bytes=100, dom_engines=("dom",), streaming_engines=("stream",), inline_engines=("ix",)),
+        detect_kind=lambda label, head: INLINE if label.endswith(".html") else INSTANCE,
+    )
+
+    def engine(name):
+        def run(owner, payload, label):
+            calls.append(name)
+            return name
+
+        return run
+
+    registry.register(ParserEngine("dom", engine("dom")))
+    registry.register(ParserEngine("stream", engine("stream"), streaming=True))
+    registry.register(ParserEngine("ix", engine("ix"), kinds=frozenset({INLINE}), streaming=True))
+    return registry
+
+
+def test_policy_selects_engine_by_size_and_kind():
+    calls = []
+    registry = _registry(calls)
+
+    assert registry.parse(None, b"x" * 50, "small.xbrl") == "dom"
+    assert registry.parse(None, b"x" * 500, "large.xbrl") == "stream"
+    assert registry.parse(None, b"x" * 50, "filing.html", prefer=("dom",)) == "ix"
+    assert registry.available() == ["dom", "stream", "ix"]
+    assert registry.stats()["stream"]["bytes"] == 500
+
+
+def test_fallible_engine_falls_back_once_and_is_counted():
+    calls = []
+    registry = _registry(calls)
+
+    def broken(owner, payload, label):
+        calls.append("broken")
+        raise RuntimeError("third-party parser crashed")
+
+    registry.register(ParserEngine("broken", broken, fallible=True))
+    assert registry.parse(None, b"x" * 50, "a.xbrl", prefer=("broken", "dom")) == "dom"
+
+    stats = registry.stats()
+    assert calls == ["broken", "dom"]
+    assert stats["broken"]["fallbacks"] == 1
+    assert stats["broken"]["failures"] == 1
+    assert stats["dom"]["calls"] == 1
+
+
+def test_payload_errors_do_not_trigger_fallbacks():
+    registry = _registry([])
+
+    def strict(owner, payload, label):
+        raise ET.ParseError("not well-formed")
+
+    registry.register(ParserEngine("strict", strict))
+    with pytest.raises(ET.ParseError):
+        registry.parse(None, b"<xbrl", "a.xbrl", prefer=("strict", "dom"))
+    assert registry.stats()["strict"]["fallbacks"] == 0
+
+
+def test_engines_produce_identical_results():
+    expected = XBRLParserService(engine="etree").parse(SAMPLE_PATH)
+    for name in PARSER_ENGINES.available():
+        if name in {"inline", "pyxbrl"}:
+            continue
+        result = XBRLParserService(engine=name).parse(SAMPLE_PATH)
+        assert result.statements == expected.statements, name
+        assert result.audit_trail == expected.audit_trail, name
+
+    assert PARSER_ENGINES.candidates(Workload(INSTANCE, 1024))[0].name in {"lxml", "etree"}
+    assert PARSER_ENGINES.candidates(Workload(INSTANCE, None))[0].name == "streaming"
+    with pytest.raises(ValueError):
+        XBRLParserService(engine="nope")
+
+
+def test_streaming_engine_runs_off_the_source_and_dom_fallback_buffers_lazily(tmp_path, monkeypatch):
+    from app.services import parser_engines
+
+    calls = []
+    registry = _registry(calls)
+    path = tmp_path / "large.xbrl"
+    path.write_bytes(b"x" * 500)
+
+    def unbuffered(source):
+        raise AssertionError("payload buffered although only the streaming engine ran")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(parser_engines, "read_payload", unbuffered)
+        assert registry.parse(None, path, "large.xbrl") == "stream"
+
+    received = []
+
+    def broken_stream(owner, chunks, label):
+        received.append(b"".join(chunks))
+        raise RuntimeError("streaming engine crashed")
+
+    def dom(owner, payload, label):
+        received.append(bytes(payload))
+        return "dom"
+
+    registry.register(ParserEngine("stream", broken_stream, streaming=True, fallible=True))
+    registry.register(ParserEngine("dom", dom))
+
+    class OneShotStream(io.RawIOBase):
+        def __init__(self, payload):
+            self._inner = io.BytesIO(payload)
+
+        def readable(self):
+            return True
+
+        def readinto(self, buffer):
+            chunk = self._inner.read(len(buffer))
+            buffer[: len(chunk)] = chunk
+            return len(chunk)
+
+    for source in (path, OneShotStream(b"x" * 500)):
+        received.clear()
+        assert registry.parse(None, source, "large.xbrl") == "dom"
+        assert received == [b"x" * 500, b"x" * 500]
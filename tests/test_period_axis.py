@@ -0,0 +1,112 @@
+from decimal import Decimal
+
+from openpyxl import load_workbook
+
+from app.services.excel_generator import ExcelGenerator
+from app.services.period_axis import Period, PeriodAxis
+from app.services.validation_service import ValidationService
+from app.services.xbrl_parser import XBRLParserService
+
+
+def _filing(cash: dict, flows: dict) -> bytes:
+    contexts = []
+    facts = []
+    for day, amount in cash.items():
+        contexts.append(
+            f'<context id="I{day}"><entity><identifier scheme="x">L1</identifier></entity>'
+            f"<period><instant>{day}</instant></period></context>"
+        )
+        facts.append(f'<ind-as:CashAndCashEquivalents contextRef="I{day}" unitRef="U1">{amount}</ind-as:CashAndCashEquivalents>')
+    for year, (operating, investing, financing) in flows.items():
+        contexts.append(
+            f'<context id="D{year}"><entity><identifier scheme="x">L1</identifier></entity>'
+            f"<period><startDate>{year - 1}-04-01</startDate><endDate>{year}-03-31</endDate></period></context>"
+        )
+        for concept, amount in (
+            ("NetCashFlowFromOperatingActivities", operating),
+            ("NetCashFlowFromInvestingActivities", investing),
+            ("NetCashFlowFromFinancingActivities", financing),
+        ):
+            facts.append(f'<ind-as:{concept} contextRef="D{year}" unitRef="U1">{amount}</ind-as:{concept}>')
+    return (
+        '<xbrl xmlns="http://www.xbrl.org/2003/instance" xmlns:ind-as="http://mca.gov.in/indas/2016">'
+        + "".join(contexts)
+        + '<unit id="U1"><measure>iso4217:INR</measure></unit>'
+        + "".join(facts)
+        + "</xbrl>"
+    ).encode()
+
+
+# Durations listed newest first, instants after them: the axis must not depend on document order.
+FLOWS = {2024: ("300", "-150", "-50"), 2023: ("200", "-100", "-60"), 2022: ("150", "-50", "-40")}
+CASH = {"2024-03-31": "600", "2023-03-31": "500", "2022-03-31": "460", "2021-03-31": "400"}
+
+
+def _cash_messages(result):
+    messages = ValidationService().validate_fact_table(result.facts, axis=result.period_axis)
+    return [(message.period[:9], message.passed) for message in messages if message.statement == "cash_flow"]
+
+
+def test_axis_sorts_periods_and_aligns_instants_by_date():
+    axis = XBRLParserService().parse(_filing(CASH, FLOWS)).period_axis
+
+    assert [period.label[:9] for period in axis.periods] == [
+        "As of 202",
+        "As of 202",
+        "FY2021-22",
+        "As of 202",
+        "FY2022-23",
+        "As of 202",
+        "FY2023-24",
+    ]
+    fy24 = axis.position("FY2023-24 (2023-04-01 to 2024-03-31)")
+    assert axis.periods[axis.opening(fy24)].label == "As of 2023-03-31"
+    assert axis.periods[axis.closing(fy24)].label == "As of 2024-03-31"
+    assert axis.periods[axis.previous(fy24)].label.startswith("FY2022-23")
+    assert axis.previous(axis.position("FY2021-22 (2021-04-01 to 2022-03-31)")) is None
+
+
+def test_cash_flows_reconcile_across_consecutive_instants():
+    parser = XBRLParserService()
+
+    assert _cash_messages(parser.parse(_filing(CASH, FLOWS))) == [
+        ("FY2023-24", True),
+        ("FY2022-23", True),
+        ("FY2021-22", True),
+    ]
+    restated = _cash_messages(parser.parse(_filing({**CASH, "2023-03-31": "520"}, FLOWS)))
+    assert restated == [("FY2023-24", False), ("FY2022-23", False), ("FY2021-22", True)]
+
+
+def test_opening_balance_reported_at_the_start_date_must_carry_forward():
+    axis = PeriodAxis.from_labels(
+        ["FY2023-24 (2023-04-01 to 2024-03-31)", "FY2022-23 (2022-04-01 to 2023-03-31)", "As of 2023-04-01", "As of 2023-03-31"]
+    )
+    aligned = axis.align(
+        {
+            "FY2023-24 (2023-04-01 to 2024-03-31)": {},
+            "As of 2023-04-01": {"cash_and_cash_equivalents": Decimal("480")},
+            "As of 2023-03-31": {"cash_and_cash_equivalents": Decimal("500")},
+        }
+    )
+
+    assert aligned["FY2023-24 (2023-04-01 to 2024-03-31)"] == {
+        "opening_cash_and_cash_equivalents": Decimal("480"),
+        "previous_closing_cash_and_cash_equivalents": Decimal("500"),
+    }
+    cash = {"As of 2023-04-01": Decimal("480"), "As of 2023-03-31": Decimal("500")}
+    operations = {"FY2023-24 (2023-04-01 to 2024-03-31)": Decimal("1")}
+    statements = {"cash_flow": {"cash_and_cash_equivalents": cash, "net_cash_from_operations": operations}}
+    messages = ValidationService().run(statements, axis=axis).messages
+    assert [message.message for message in messages] == ["Opening cash does not match the previous period's closing cash"]
+
+
+def test_undated_labels_sort_after_dated_ones_and_workbook_columns_are_chronological():
+    axis = PeriodAxis([Period("custom"), Period.from_label("As of 2024-03-31"), Period.from_label("As of 2023-03-31")])
+    assert axis.labels == ["As of 2023-03-31", "As of 2024-03-31", "custom"]
+    assert axis.sort(["custom", "unknown", "As of 2024-03-31", "custom"]) == ["As of 2024-03-31", "custom", "unknown"]
+
+    result = XBRLParserService().parse(_filing(CASH, FLOWS))
+    workbook = load_workbook(ExcelGenerator().generate(result, []))
+    header = [cell.value for cell in workbook["Cash Flow"][1][1:]]
+    assert header == result.period_axis.labels
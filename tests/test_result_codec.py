@@ -0,0 +1,105 @@
+import mmap
+import pickle
+from textwrap import dedent
+
+import pytest
+
+from app.services.parse_options import STATEMENTS_ONLY
+from app.services.result_codec import MAGIC, ResultCodecError
+from app.services.xbrl_parser import XBRLParseResult, XBRLParserService
+
+PAYLOAD = dedent(
+    """
+    <xbrl xmlns="http://www.xbrl.org/2003/instance" xmlns:ind-as="http://mca.gov.in/indas/2016">
+        <context id="C1">
+            <entity><identifier scheme="http://www.mca.gov.in/CIN">L12345MH1956PLC012345</identifier></entity>
+            <period><startDate>2023-04-01</startDate><endDate>2024-03-31</endDate></period>
+        </context>
+        <context id="I0">
+            <entity><identifier scheme="http://www.mca.gov.in/CIN">L12345MH1956PLC012345</identifier></entity>
+            <period><instant>2023-03-31</instant></period>
+        </context>
+        <unit id="U1"><measure>iso4217:INR</measure></unit>
+        <ind-as:TotalAssets contextRef="C1" unitRef="U1">1000.25</ind-as:TotalAssets>
+        <ind-as:TotalAssets contextRef="I0" unitRef="U1">-750</ind-as:TotalAssets>
+        <ind-as:Revenue contextRef="C1" unitRef="U1">1000</ind-as:Revenue>
+        <ind-as:UnknownMetric contextRef="C1" unitRef="U1">42</ind-as:UnknownMetric>
+        <ind-as:DirectorsReportTextBlock contextRef="C1">{narrative}</ind-as:DirectorsReportTextBlock>
+    </xbrl>
+    """
+).format(narrative="Résumé of the year ₹ crore. " * 40)
+
+
+def _assert_same(decoded: XBRLParseResult, original: XBRLParseResult) -> None:
+    assert decoded.statements == original.statements
+    assert decoded.contexts == original.contexts
+    assert dict(decoded.metadata) == dict(original.metadata)
+    assert list(decoded.metadata) == list(original.metadata)
+    assert decoded.unmapped_facts == original.unmapped_facts
+    assert decoded.unmapped_facts.concept_counts == original.unmapped_facts.concept_counts
+    assert decoded.unmapped_facts.total_bytes == original.unmapped_facts.total_bytes
+    assert decoded.facts.audit == original.facts.audit
+    if original.facts.audit:
+        assert list(decoded.audit_trail) == list(original.audit_trail)
+
+
+@pytest.mark.parametrize("options", ["full", "lean"])
+def test_binary_encoding_round_trips(options):
+    parser = XBRLParserService() if options == "full" else XBRLParserService(options=STATEMENTS_ONLY)
+    original = parser.parse(PAYLOAD.encode(), name="filing.xbrl")
+
+    encoded = original.to_bytes()
+    assert encoded.startswith(MAGIC)
+    decoded = XBRLParseResult.from_buffer(encoded)
+    _assert_same(decoded, original)
+    # Decoded results encode to the same bytes and pickle through the codec as well.
+    assert decoded.to_bytes() == encoded
+    _assert_same(pickle.loads(pickle.dumps(decoded)), original)
+
+
+def test_decoding_from_mmap_shares_the_mapping(tmp_path):
+    original = XBRLParserService().parse(PAYLOAD.encode(), name="filing.xbrl")
+    path = tmp_path / "result.bin"
+    path.write_bytes(original.to_bytes())
+
+    with path.open("rb") as handle:
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    decoded = XBRLParseResult.from_buffer(mapped)
+
+    assert isinstance(decoded.facts.values, memoryview)
+    assert decoded.facts.values.obj is mapped
+    _assert_same(decoded, original)
+
+
+def test_encoding_is_smaller_than_pickling_the_objects():
+    facts = "\n".join(
+        f'<ind-as:{concept} contextRef="C{index % 40}" unitRef="U1">{index}</ind-as:{concept}>'
+        for index, concept in enumerate(["TotalAssets", "Revenue", "UnknownMetric"] * 2000)
+    )
+    contexts = "".join(
+        f'<context id="C{index}"><entity><identifier scheme="x">L1</identifier></entity>'
+        f"<period><instant>{2000 + index}-03-31</instant></period></context>"
+        for index in range(40)
+    )
+    payload = (
+        '<xbrl xmlns="http://www.xbrl.org/2003/instance" xmlns:ind-as="http://mca.gov.in/indas/2016">'
+        f'{contexts}<unit id="U1"><measure>iso4217:INR</measure></unit>{facts}</xbrl>'
+    ).encode()
+    result = XBRLParserService().parse(payload)
+
+    pickled = pickle.dumps(
+        (result.facts, result.contexts, dict(result.metadata), result.unmapped_facts),
+        protocol=pickle.HIGHEST_PROTOCOL,
+    )
+    assert len(result.to_bytes()) < len(pickled) * 0.6
+
+
+def test_rejects_foreign_and_truncated_buffers():
+    encoded = XBRLParserService().parse(PAYLOAD.encode()).to_bytes()
+
+    with pytest.raises(ResultCodecError):
+        XBRLParseResult.from_buffer(b"not a parse result")
+    with pytest.raises(ResultCodecError):
+        XBRLParseResult.from_buffer(encoded[: len(encoded) // 2])
+    with pytest.raises(ResultCodecError):
+        XBRLParseResult.from_buffer(encoded[:8] + b"\xff\xff" + encoded[10:])
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_computation():
+    flights = SingleFlight()
+    calls = []
+
+    async def compute(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def burst():
+        same = [flights.run("filing-a", lambda: compute(21)) for _ in range(5)]
+        other = flights.run("filing-b", lambda: compute(5))
+        return await asyncio.gather(*same, other)
+
+    assert asyncio.run(burst()) == [42, 42, 42, 42, 42, 10]
+    assert calls == [21, 5]
+    assert flights.stats() == {"started": 2, "joined": 4, "failed": 0, "in_flight": 0}
+
+
+def test_failures_reach_every_waiter_and_release_the_key():
+    flights = SingleFlight()
+    attempts = []
+
+    async def compute():
+        attempts.append(None)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise ValueError("malformed filing")
+        return "workbook"
+
+    async def scenario():
+        results = await asyncio.gather(*(flights.run("key", compute) for _ in range(3)), return_exceptions=True)
+        return results, await flights.run("key", compute)
+
+    results, retried = asyncio.run(scenario())
+
+    assert [type(result) for result in results] == [ValueError] * 3
+    assert retried == "workbook"
+    assert len(attempts) == 2
+    assert flights.stats()["failed"] == 1
+
+
+def test_a_cancelled_leader_does_not_cancel_its_followers():
+    flights = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        return "workbook"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flights.run("key", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.run("key", compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == "workbook"
+    assert flights.stats()["started"] == 1
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from app.utils.uploads import MultipartFileStream, RequestSizeLimitMiddleware, UploadTooLargeError
+
+
+def _run_middleware(headers, chunks, limit):
+    sent = []
+    received = []
+
+    async def app(scope, receive, send):
+        while True:
+            message = await receive()
+            received.append(message)
+            if not message.get("more_body"):
+                break
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    messages = iter(
+        {"type": "http.request", "body": chunk, "more_body": index < len(chunks) - 1}
+        for index, chunk in enumerate(chunks)
+    )
+
+    async def receive():
+        return next(messages)
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = RequestSizeLimitMiddleware(app, max_body_bytes=limit)
+    asyncio.run(middleware({"type": "http", "headers": headers}, receive, send))
+    return sent[0]["status"], len(received)
+
+
+def test_middleware_rejects_oversized_bodies_early():
+    assert _run_middleware([(b"content-length", b"500")], [b"x" * 500], 100) == (413, 0)
+    assert _run_middleware([], [b"x" * 60, b"x" * 60, b"x" * 60], 100) == (413, 1)
+    assert _run_middleware([], [b"x" * 60], 100) == (200, 1)
+
+
+def _multipart(filename: bytes, payload: bytes) -> bytes:
+    return (
+        b"--BOUNDARY\r\n"
+        b'Content-Disposition: form-data; name="note"\r\n\r\n'
+        b"ignored\r\n"
+        b"--BOUNDARY\r\n"
+        b'Content-Disposition: form-data; name="file"; filename="' + filename + b'"\r\n'
+        b"Content-Type: application/xml\r\n\r\n" + payload + b"\r\n--BOUNDARY--\r\n"
+    )
+
+
+def _chunks(body: bytes, size: int):
+    async def generate():
+        for offset in range(0, len(body), size):
+            yield body[offset : offset + size]
+
+    return generate()
+
+
+def test_multipart_file_stream_feeds_file_part_as_it_arrives():
+    class Sink:
+        def __init__(self, name):
+            self.name = name
+            self.chunks = []
+
+        def feed(self, chunk):
+            self.chunks.append(bytes(chunk))
+
+    payload = b"<xbrl>" + b"x" * 500 + b"</xbrl>"
+    upload = MultipartFileStream("multipart/form-data; boundary=BOUNDARY")
+    sink = asyncio.run(upload.feed_into(_chunks(_multipart(b"filing.xbrl", payload), 64), Sink))
+
+    assert sink.name == "filing.xbrl"
+    assert b"".join(sink.chunks) == payload
+    assert len(sink.chunks) > 1
+    assert upload.size == len(payload)
+
+
+def test_multipart_file_stream_enforces_limit_mid_upload():
+    upload = MultipartFileStream("multipart/form-data; boundary=BOUNDARY", limit=100)
+
+    async def consume():
+        return [chunk async for chunk in upload.iter_file(_chunks(_multipart(b"big.xbrl", b"x" * 1000), 64))]
+
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(consume())
+    assert upload.size <= 100 + 64
@@ -0,0 +1,79 @@
+from decimal import Decimal
+
+import pytest
+
+from app.services.validation_rules import REVENUE_IDENTITY, ValidationRule, default_rules
+from app.services.validation_service import ValidationService
+
+
+def _statements(**income) -> dict:
+    figures = {
+        "operating_revenue": "900",
+        "other_income": "100",
+        "total_revenue": "1000",
+        "profit_before_tax": "150",
+        "tax_expense": "30",
+        "profit_after_tax": "120",
+        **income,
+    }
+    return {
+        "balance_sheet": {
+            "total_assets": {"FY24": Decimal("1000"), "FY23": Decimal("900")},
+            "total_liabilities": {"FY24": Decimal("600"), "FY23": Decimal("500")},
+            "total_equity": {"FY24": Decimal("400"), "FY23": Decimal("400")},
+        },
+        "income_statement": {
+            field: {"FY24": Decimal(value), "FY23": Decimal("1")} for field, value in figures.items()
+        },
+    }
+
+
+def test_plan_indexes_rules_by_the_fields_they_read():
+    plan = default_rules().plan()
+
+    assert plan.statements == ("balance_sheet", "income_statement", "cash_flow")
+    assert [rule.name for rule in plan.affected("income_statement", ["tax_expense"])] == ["profit_after_tax_identity"]
+    assert [rule.name for rule in plan.affected("income_statement", ["total_revenue", "profit_after_tax"])] == [
+        "revenue_identity",
+        "profit_after_tax_identity",
+    ]
+    with pytest.raises(ValueError):
+        default_rules().rule("related_party_disclosure")
+
+
+def test_amended_field_re_evaluates_only_its_dependent_rules():
+    service = ValidationService()
+    first = service.run(_statements())
+
+    amended = service.run(_statements(tax_expense="45"), previous=first)
+
+    # Only FY24's PAT identity read the amended tax expense; 5 other (rule, period) outcomes are reused.
+    assert (amended.evaluated, amended.reused) == (1, 5)
+    assert amended.messages == service.run(_statements(tax_expense="45")).messages
+    assert [m.field for m in amended.messages if m.period == "FY24" and not m.passed] == ["profit_after_tax"]
+
+
+def test_newly_registered_rule_is_evaluated_against_a_previous_run():
+    service = ValidationService()
+    first = service.run(_statements())
+    service.rules.register(
+        ValidationRule(
+            name="tax_not_above_profit",
+            statement="income_statement",
+            field="tax_expense",
+            inputs=("profit_before_tax", "tax_expense"),
+            evaluate=lambda values: (max(values["tax_expense"] - values["profit_before_tax"], Decimal("0")), Decimal("0")),
+            passed_message="Tax expense within profit before tax",
+            failed_message="Tax expense exceeds profit before tax",
+        )
+    )
+
+    second = service.run(_statements(), previous=first)
+
+    assert second.evaluated == 2
+    assert [message.message for message in second.messages if message.field == "tax_expense"] == [
+        "Tax expense within profit before tax"
+    ] * 2
+
+    service.rules.register(REVENUE_IDENTITY)
+    assert len(service.rules) == 6
@@ -1,6 +1,12 @@
+import pickle
 from decimal import Decimal
 from textwrap import dedent
+from xml.sax.saxutils import escape
 
+import pytest
+
+from app.services.parse_cache import ParseCache
+from app.services.parse_options import STATEMENTS_ONLY, ParseOptions
 from app.services.xbrl_parser import XBRLParserService
 
 
@@ -88,4 +94,256 @@ def test_xbrl_parser_collects_unmapped_concepts(tmp_path):
     assert fact.raw_tag == "{http://mca.gov.in/indas/2016}UnknownMetric"
     assert fact.context_ref == "C1"
     assert fact.unit == "U1"
-    assert fact.raw_value == "123"
\ No newline at end of file
+    assert fact.raw_value == "123"
+
+
+def test_streaming_engine_matches_dom_engine(tmp_path):
+    xbrl_payload = dedent(
+        """
+        <xbrl xmlns="http://www.xbrl.org/2003/instance" xmlns:ind-as="http://mca.gov.in/indas/2016">
+            <context id="C1">
+                <entity>
+                    <identifier scheme="http://www.mca.gov.in/CIN">L12345MH1956PLC012345</identifier>
+                </entity>
+                <period>
+                    <startDate>2023-04-01</startDate>
+                    <endDate>2024-03-31</endDate>
+                </period>
+            </context>
+            <unit id="U1">
+                <measure>iso4217:INR</measure>
+            </unit>
+            <ind-as:TotalAssets contextRef="C1" unitRef="U1">1000</ind-as:TotalAssets>
+            <ind-as:TotalAssets contextRef="C1" unitRef="U1">1100</ind-as:TotalAssets>
+            <ind-as:UnknownMetric contextRef="C1" unitRef="U1">5</ind-as:UnknownMetric>
+            <ind-as:OtherIncome contextRef="C2" unitRef="U2">10</ind-as:OtherIncome>
+            <ind-as:TotalEquity contextRef="C1" unitRef="U1"></ind-as:TotalEquity>
+            <context id="C2">
+                <entity>
+                    <identifier scheme="http://www.mca.gov.in/CIN">L12345MH1956PLC012345</identifier>
+                </entity>
+                <period>
+                    <instant>2023-03-31</instant>
+                </period>
+            </context>
+            <unit id="U2">
+                <measure>INRInLakhs</measure>
+            </unit>
+            <ind-as:TotalLiabilities contextRef="C1" unitRef="U1">600</ind-as:TotalLiabilities>
+        </xbrl>
+        """
+    )
+    sample_path = tmp_path / "ordering.xbrl"
+    sample_path.write_text(xbrl_payload)
+
+    streamed = XBRLParserService(streaming=True).parse(sample_path)
+    loaded = XBRLParserService(streaming=False).parse(sample_path)
+
+    assert streamed.statements == loaded.statements
+    assert streamed.audit_trail == loaded.audit_trail
+    assert streamed.contexts == loaded.contexts
+    assert streamed.metadata == loaded.metadata
+    assert streamed.unmapped_facts == loaded.unmapped_facts
+    assert streamed.statements["income_statement"]["other_income"]["As of 2023-03-31"] == Decimal("1000000")
+    assert streamed.statements["balance_sheet"]["total_assets"]["FY2023-24 (2023-04-01 to 2024-03-31)"] == Decimal("1100")
+
+
+def test_repeated_strings_are_interned_across_facts(tmp_path):
+    facts = "\n".join(
+        f'<ind-as:TotalAssets contextRef="C1" unitRef="U1">{value}</ind-as:TotalAssets>' for value in (1, 2, 3)
+    )
+    sample_path = tmp_path / "repeated.xbrl"
+    sample_path.write_text(SAMPLE_XBRL.replace("</xbrl>", facts + "\n</xbrl>"))
+
+    result = XBRLParserService().parse(sample_path)
+
+    records = [record for record in result.audit_trail if record.field == "total_assets"]
+    assert len(records) == 4
+    assert all(record.concept is records[0].concept for record in records)
+    assert all(record.context_ref is records[0].context_ref for record in records)
+    assert all(record.period is result.contexts["C1"].label for record in records)
+    assert result.contexts["C1"].financial_year == "FY2023-24"
+
+
+def test_parser_accepts_buffers_and_streams(tmp_path):
+    sample_path = tmp_path / "sample.xbrl"
+    sample_path.write_text(SAMPLE_XBRL)
+    payload = sample_path.read_bytes()
+
+    from_path = XBRLParserService().parse(sample_path)
+    from_buffer = XBRLParserService().parse(memoryview(payload), name="upload.xbrl")
+    with sample_path.open("rb") as handle:
+        from_stream = XBRLParserService(streaming=False).parse(handle)
+
+    assert from_buffer.statements == from_path.statements
+    assert from_stream.statements == from_path.statements
+    assert from_buffer.metadata["source"] == "upload.xbrl"
+    assert from_stream.metadata["source"] == str(sample_path)
+
+
+def test_incremental_parse_matches_whole_document_parse(tmp_path):
+    sample_path = tmp_path / "sample.xbrl"
+    sample_path.write_text(SAMPLE_XBRL)
+    payload = sample_path.read_bytes()
+
+    parse = XBRLParserService().incremental(name="upload.xbrl")
+    for offset in range(0, len(payload), 7):
+        parse.feed(payload[offset : offset + 7])
+    result = parse.close()
+
+    expected = XBRLParserService().parse(sample_path)
+    assert result.statements == expected.statements
+    assert result.audit_trail == expected.audit_trail
+    assert result.metadata["source"] == "upload.xbrl"
+    assert parse.size == len(payload)
+
+
+INLINE_XBRL = dedent(
+    """\
+    <?xml version="1.0" encoding="UTF-8"?>
+    <!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+    <html xmlns="http://www.w3.org/1999/xhtml" xmlns:ix="http://www.xbrl.org/2013/inlineXBRL"
+          xmlns:xbrli="http://www.xbrl.org/2003/instance" xmlns:ind-as="http://mca.gov.in/indas/2016"
+          xmlns:ixt="http://www.xbrl.org/inlineXBRL/transformation/2015-02-26">
+    <body>
+        <div style="display:none"><ix:header><ix:resources>
+            <xbrli:context id="C1">
+                <xbrli:entity>
+                    <xbrli:identifier scheme="http://www.mca.gov.in/CIN">L12345MH1956PLC012345</xbrli:identifier>
+                </xbrli:entity>
+                <xbrli:period><xbrli:startDate>2023-04-01</xbrli:startDate><xbrli:endDate>2024-03-31</xbrli:endDate></xbrli:period>
+            </xbrli:context>
+            <xbrli:unit id="U1"><xbrli:measure>iso4217:INR</xbrli:measure></xbrli:unit>
+        </ix:resources></ix:header></div>
+        <p>Directors&rsquo; report&nbsp;&mdash; narrative that is never materialised.</p>
+        <table>
+            <tr><td><ix:nonFraction name="ind-as:TotalAssets" contextRef="C1" unitRef="U1" scale="3" format="ixt:num-dot-decimal">1</ix:nonFraction></td></tr>
+            <tr><td><ix:nonFraction name="ind-as:TotalLiabilities" contextRef="C1" unitRef="U1" format="ixt:num-comma-decimal">600,00</ix:nonFraction></td></tr>
+            <tr><td><ix:nonFraction name="ind-as:ShareholdersEquity" contextRef="C1" unitRef="U1">400</ix:nonFraction></td></tr>
+            <tr><td><ix:nonFraction name="ind-as:RevenueFromOperations" contextRef="C1" unitRef="U1">900</ix:nonFraction></td></tr>
+            <tr><td>(<ix:nonFraction name="ind-as:OtherIncome" contextRef="C1" unitRef="U1" sign="-">100</ix:nonFraction>)</td></tr>
+            <tr><td><ix:nonFraction name="ind-as:Revenue" contextRef="C1" unitRef="U1" format="ixt:numdotdecimal">1,000</ix:nonFraction></td></tr>
+        </table>
+    </body>
+    </html>
+    """
+)
+
+
+def test_inline_xbrl_matches_equivalent_instance(tmp_path):
+    instance_path = tmp_path / "sample.xbrl"
+    instance_path.write_text(SAMPLE_XBRL.replace(">100<", ">-100<"))
+    inline_path = tmp_path / "sample.html"
+    inline_path.write_text(INLINE_XBRL)
+
+    expected = XBRLParserService().parse(instance_path)
+    streamed = XBRLParserService().parse(inline_path)
+    sniffed = XBRLParserService(streaming=False).parse(inline_path.read_bytes())
+
+    assert streamed.statements == expected.statements
+    assert sniffed.statements == expected.statements
+    assert [record.concept for record in streamed.audit_trail] == [record.concept for record in expected.audit_trail]
+    assert streamed.contexts == expected.contexts
+    assert streamed.metadata["entities"] == ["L12345MH1956PLC012345"]
+
+
+def test_unmapped_text_blocks_keep_bounded_previews(tmp_path):
+    narrative = "<p>Significant accounting policies &#8211; revenue recognition.</p>" * 2000
+    xbrl_payload = dedent(
+        f"""
+        <xbrl xmlns="http://www.xbrl.org/2003/instance" xmlns:ind-as="http://mca.gov.in/indas/2016">
+            <context id="C1">
+                <entity><identifier scheme="http://www.mca.gov.in/CIN">L54321MH1956PLC999999</identifier></entity>
+                <period><startDate>2022-04-01</startDate><endDate>2023-03-31</endDate></period>
+            </context>
+            <ind-as:AccountingPoliciesTextBlock contextRef="C1">{escape(narrative)}</ind-as:AccountingPoliciesTextBlock>
+            <ind-as:AccountingPoliciesTextBlock contextRef="C1">{escape(narrative)}</ind-as:AccountingPoliciesTextBlock>
+        </xbrl>
+        """
+    )
+    sample_path = tmp_path / "narrative.xbrl"
+    sample_path.write_text(xbrl_payload)
+
+    for streaming in (False, True):
+        result = XBRLParserService(streaming=streaming, unmapped_memory_budget=1024).parse(sample_path)
+        unmapped = result.unmapped_facts
+
+        assert len(unmapped) == 2
+        assert unmapped.concept_counts == {"AccountingPoliciesTextBlock": 2}
+        first = unmapped[0]
+        assert first.truncated
+        assert first.raw_value == narrative[: len(first.raw_value)]
+        assert 0 < len(first.raw_value) <= 256
+        assert first.byte_length == len(narrative.encode("utf-8"))
+        assert result.metadata["unmapped_bytes"] == 2 * first.byte_length
+        # Both full values outgrow the 1 KiB budget, so the spool has moved to a temp file.
+        assert unmapped.value(0) == unmapped.value(1) == narrative
+        assert unmapped._spill._rolled
+
+        # Only previews survive pickling (cache disk tier, worker processes).
+        restored = pickle.loads(pickle.dumps(unmapped))
+        assert restored == unmapped
+        assert restored.total_bytes == unmapped.total_bytes
+        assert restored.value(0) is None
+        unmapped.close()
+        assert unmapped.value(1) is None
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_amounts_beyond_64_bit_paise_are_kept_as_unmapped(streaming):
+    payload = SAMPLE_XBRL.replace(
+        '<ind-as:TotalAssets contextRef="C1" unitRef="U1">1000</ind-as:TotalAssets>',
+        '<ind-as:TotalAssets contextRef="C1" unitRef="U1">1e30</ind-as:TotalAssets>',
+    ).encode()
+
+    result = XBRLParserService(streaming=streaming).parse(payload)
+
+    assert "total_assets" not in result.statement("balance_sheet")
+    assert result.statement("balance_sheet")["total_liabilities"]
+    assert [(fact.concept, fact.raw_value) for fact in result.unmapped_facts] == [("TotalAssets", "1e30")]
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_parse_options_project_the_result(streaming):
+    payload = SAMPLE_XBRL.encode()
+    full = XBRLParserService(streaming=streaming).parse(payload)
+
+    balance_only = XBRLParserService(
+        streaming=streaming, options=ParseOptions(statements={"balance_sheet"})
+    ).parse(payload)
+    assert balance_only.statement("balance_sheet") == full.statement("balance_sheet")
+    assert balance_only.statement("income_statement") == {}
+    assert {record.statement for record in balance_only.audit_trail} == {"balance_sheet"}
+
+    lean = XBRLParserService(streaming=streaming, options=STATEMENTS_ONLY).parse(payload)
+    assert lean.statements == full.statements
+    assert "periods" not in lean.metadata
+    assert "unmapped_count" not in lean.metadata
+    assert len(lean.unmapped_facts) == 0
+    with pytest.raises(ValueError):
+        lean.audit_trail
+
+    fields = XBRLParserService(streaming=streaming, options=ParseOptions(fields={"total_assets"})).parse(payload)
+    assert set(fields.statement("balance_sheet")) == {"total_assets"}
+
+
+def test_period_metadata_is_built_lazily_and_survives_pickling():
+    result = XBRLParserService().parse(SAMPLE_XBRL.encode())
+    relabelled = XBRLParserService._with_source(result, "renamed.xbrl")
+
+    assert list(result.metadata)[:3] == ["source", "entities", "periods"]
+    assert relabelled.metadata["source"] == "renamed.xbrl"
+    assert relabelled.metadata["periods"] == result.metadata["periods"]
+    assert pickle.loads(pickle.dumps(result)).metadata == result.metadata
+
+
+def test_parse_options_do_not_share_cache_entries(tmp_path):
+    cache = ParseCache(tmp_path)
+    payload = SAMPLE_XBRL.encode()
+
+    lean = XBRLParserService(cache=cache, options=STATEMENTS_ONLY).parse(payload, name="a.xbrl")
+    full = XBRLParserService(cache=cache).parse(payload, name="a.xbrl")
+
+    assert "periods" in full.metadata
+    assert full.audit_trail
+    assert lean.statements == full.statements